@@ -0,0 +1,38 @@
+import asyncio
+import logging
+from hashlib import sha256
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# key -> task computing the response for that key
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def request_key(*parts: Any) -> str:
+    """
+    Builds a stable single-flight key from the inputs that shape an LLM prompt.
+    """
+    digest = sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+async def single_flight(key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Runs ``factory`` once per key across concurrent callers.
+
+    Identical requests that arrive while the first is still running await the
+    same task instead of issuing their own LLM call. The shared task is
+    shielded so one caller disconnecting does not cancel it for the others.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda _task: _inflight.pop(key, None))
+    else:
+        logger.info(f"Coalescing duplicate in-flight request {key[:12]}")
+    return await asyncio.shield(task)
@@ -19,6 +19,11 @@ class Settings(BaseSettings):
     MODEL_NAME: str
     OPENAI_API_BASE: str
 
+    # Prompt Budget
+    PROMPT_TOKEN_BUDGET: int = 6000
+    PROMPT_RAG_TOKEN_CAP: int = 800
+    PROMPT_LITERAL_MAX_CHARS: int = 200
+
     # RAG Settings
     EMBEDDING_MODEL: str
     CHROMA_SERVER_HOST: str
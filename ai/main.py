@@ -20,6 +20,8 @@ from langchain_community.embeddings import HuggingFaceInferenceAPIEmbeddings
 
 # Local imports
 from config import settings
+from coalescing import request_key, single_flight
+from prompt_budget import PromptBudget, Section
 from prompts import (
     HINT_GENERATION_SYSTEM_PROMPT,
     HINT_GENERATION_USER_TEMPLATE,
@@ -104,6 +106,52 @@ class AnalyzeRequest(BaseModel):
     language: str = "python"
 
 
+HINT_PROMPT_BUDGET = PromptBudget(
+    system_prompt=HINT_GENERATION_SYSTEM_PROMPT,
+    user_template=HINT_GENERATION_USER_TEMPLATE,
+    sections=[
+        Section("rag_context", priority=0, max_tokens=settings.PROMPT_RAG_TOKEN_CAP),
+        Section("challenge_description", priority=1),
+        Section("user_code", priority=2, is_code=True),
+    ],
+    budget=settings.PROMPT_TOKEN_BUDGET,
+    literal_max_chars=settings.PROMPT_LITERAL_MAX_CHARS,
+)
+
+CODE_REVIEW_PROMPT_BUDGET = PromptBudget(
+    system_prompt=CODE_REVIEW_SYSTEM_PROMPT,
+    user_template=CODE_REVIEW_USER_TEMPLATE,
+    sections=[
+        Section("rag_context", priority=0, max_tokens=settings.PROMPT_RAG_TOKEN_CAP),
+        Section("test_code", priority=1, is_code=True),
+        Section("initial_code", priority=2, is_code=True),
+        Section("challenge_description", priority=3),
+        Section("user_code", priority=4, is_code=True),
+    ],
+    budget=settings.PROMPT_TOKEN_BUDGET,
+    literal_max_chars=settings.PROMPT_LITERAL_MAX_CHARS,
+)
+
+
+def fit_prompt(budget: PromptBudget, values: dict, mode: str) -> dict:
+    """
+    Compacts prompt inputs to the token budget and records the prompt size.
+    """
+    compacted = budget.fit(values)
+    logger.info(
+        f"Prompt assembled for {mode}: {compacted.prompt_tokens} tokens",
+        extra={
+            "extra_data": {
+                "mode": mode,
+                "prompt_tokens": compacted.prompt_tokens,
+                "original_prompt_tokens": compacted.original_tokens,
+                "compacted_sections": compacted.compacted_sections,
+            }
+        },
+    )
+    return compacted.values
+
+
 CODE_BLOCK_PATTERN = re.compile(r"```[\s\S]*?```", flags=re.MULTILINE)
 CODE_LIKE_LINE_PATTERN = re.compile(
     r"^\s*(def |class |for |while |if |elif |else:|try:|except |return |import |from |\w+\s*=|print\(|\w+\(.*\):)"
@@ -281,6 +329,17 @@ async def generate_hint(
         logger.error("No LLM API Keys configured")
         raise HTTPException(status_code=500, detail="LLM API Key not configured")
 
+    key = request_key(
+        "hint",
+        request.challenge_slug,
+        request.hint_level,
+        request.user_xp,
+        request.user_code,
+    )
+    return await single_flight(key, lambda: _generate_hint(request))
+
+
+async def _generate_hint(request: HintRequest):
     # 1. Fetch Challenge Context from Core Service
     context_data = await fetch_challenge_context(request.challenge_slug)
 
@@ -297,13 +356,25 @@ async def generate_hint(
         challenge_slug=request.challenge_slug,
     )
 
-    # 4. Construct Prompt
+    # 4. Construct Prompt (compacted to the token budget)
     prompt = ChatPromptTemplate.from_messages(
         [
             ("system", HINT_GENERATION_SYSTEM_PROMPT),
             ("user", HINT_GENERATION_USER_TEMPLATE),
         ]
     )
+    prompt_inputs = fit_prompt(
+        HINT_PROMPT_BUDGET,
+        {
+            "challenge_title": challenge_title,
+            "challenge_description": challenge_description,
+            "user_code": request.user_code,
+            "hint_level": request.hint_level,
+            "user_xp": request.user_xp,
+            "rag_context": rag_context,
+        },
+        mode="hint",
+    )
 
     # 5. Call LLM
     try:
@@ -314,30 +385,12 @@ async def generate_hint(
         try:
             llm = LLMFactory.get_llm()
             chain = prompt | llm | StrOutputParser()
-            hint = await chain.ainvoke(
-                {
-                    "challenge_title": challenge_title,
-                    "challenge_description": challenge_description,
-                    "user_code": request.user_code,
-                    "hint_level": request.hint_level,
-                    "user_xp": request.user_xp,
-                    "rag_context": rag_context,
-                }
-            )
+            hint = await chain.ainvoke(prompt_inputs)
         except Exception as e:
             logger.warning(f"Primary LLM failed: {e}. Attempting fallback...")
             llm = LLMFactory.get_fallback_llm()
             chain = prompt | llm | StrOutputParser()
-            hint = await chain.ainvoke(
-                {
-                    "challenge_title": challenge_title,
-                    "challenge_description": challenge_description,
-                    "user_code": request.user_code,
-                    "hint_level": request.hint_level,
-                    "user_xp": request.user_xp,
-                    "rag_context": rag_context,
-                }
-            )
+            hint = await chain.ainvoke(prompt_inputs)
 
         safe_hint = sanitize_guidance_output(hint, mode="hint")
         logger.info("Hint generated successfully")
@@ -370,6 +423,11 @@ async def analyze_code(
         logger.error("No LLM API Keys configured")
         raise HTTPException(status_code=500, detail="LLM API Key not configured")
 
+    key = request_key("analyze", request.challenge_slug, request.user_code)
+    return await single_flight(key, lambda: _analyze_code(request))
+
+
+async def _analyze_code(request: AnalyzeRequest):
     context_data = await fetch_challenge_context(request.challenge_slug)
     challenge_title = context_data.get("challenge_title", context_data.get("title", ""))
     challenge_description = context_data.get(
@@ -389,6 +447,18 @@ async def analyze_code(
             ("user", CODE_REVIEW_USER_TEMPLATE),
         ]
     )
+    prompt_inputs = fit_prompt(
+        CODE_REVIEW_PROMPT_BUDGET,
+        {
+            "challenge_title": challenge_title,
+            "challenge_description": challenge_description,
+            "initial_code": initial_code,
+            "user_code": request.user_code,
+            "test_code": test_code,
+            "rag_context": rag_context,
+        },
+        mode="analyze",
+    )
 
     try:
         from llm_factory import LLMFactory
@@ -396,32 +466,14 @@ async def analyze_code(
         try:
             llm = LLMFactory.get_llm()
             chain = prompt | llm | StrOutputParser()
-            review = await chain.ainvoke(
-                {
-                    "challenge_title": challenge_title,
-                    "challenge_description": challenge_description,
-                    "initial_code": initial_code,
-                    "user_code": request.user_code,
-                    "test_code": test_code,
-                    "rag_context": rag_context,
-                }
-            )
+            review = await chain.ainvoke(prompt_inputs)
         except Exception as e:
             logger.warning(
                 f"Primary LLM failed on analyze: {e}. Attempting fallback..."
             )
             llm = LLMFactory.get_fallback_llm()
             chain = prompt | llm | StrOutputParser()
-            review = await chain.ainvoke(
-                {
-                    "challenge_title": challenge_title,
-                    "challenge_description": challenge_description,
-                    "initial_code": initial_code,
-                    "user_code": request.user_code,
-                    "test_code": test_code,
-                    "rag_context": rag_context,
-                }
-            )
+            review = await chain.ainvoke(prompt_inputs)
 
         safe_review = sanitize_guidance_output(review, mode="analyze")
         logger.info("AI code review generated successfully")
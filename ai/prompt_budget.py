@@ -0,0 +1,204 @@
+import io
+import logging
+import re
+import tokenize
+from dataclasses import dataclass, field
+from math import ceil
+from string import Formatter
+
+logger = logging.getLogger(__name__)
+
+WORD_OR_SYMBOL_PATTERN = re.compile(r"\w+|[^\w\s]")
+TRIPLE_QUOTED_PATTERN = re.compile(r"(\"\"\"|''')(.*?)\1", flags=re.DOTALL)
+SINGLE_QUOTED_PATTERN = re.compile(r"([\"'])((?:\\.|(?!\1)[^\\\n])*)\1")
+TRUNCATION_MARKER = "\n... [{count} tokens truncated] ...\n"
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimates the BPE token count of ``text`` without a model-specific tokenizer.
+
+    Words are charged one token per four characters and every symbol counts as
+    one token, which tracks Llama/GPT tokenizers closely enough for budgeting.
+    """
+    if not text:
+        return 0
+    return sum(
+        max(1, ceil(len(piece) / 4)) if piece[0].isalnum() or piece[0] == "_" else 1
+        for piece in WORD_OR_SYMBOL_PATTERN.findall(text)
+    )
+
+
+def strip_comments(code: str) -> str:
+    """
+    Removes ``#`` comments from Python source. Falls back to dropping
+    comment-only lines when the code does not tokenize (e.g. a half-typed
+    submission).
+    """
+    if not code:
+        return code
+
+    lines = code.splitlines(keepends=True)
+    try:
+        comments = [
+            tok
+            for tok in tokenize.generate_tokens(io.StringIO(code).readline)
+            if tok.type == tokenize.COMMENT
+        ]
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return "".join(line for line in lines if not line.lstrip().startswith("#"))
+
+    for tok in comments:
+        row, col = tok.start
+        line = lines[row - 1]
+        code_part = line[:col].rstrip()
+        newline = "\n" if line.endswith("\n") else ""
+        lines[row - 1] = code_part + newline if code_part else ""
+
+    return "".join(lines)
+
+
+def elide_long_literals(code: str, max_chars: int) -> str:
+    """
+    Replaces string literals longer than ``max_chars`` with a short placeholder.
+    """
+
+    def _replace(match: re.Match) -> str:
+        quote, body = match.group(1), match.group(2)
+        if len(body) <= max_chars:
+            return match.group(0)
+        elided = len(body) - max_chars
+        return f"{quote}{body[:max_chars]}...<{elided} chars elided>{quote}"
+
+    code = TRIPLE_QUOTED_PATTERN.sub(_replace, code)
+    return SINGLE_QUOTED_PATTERN.sub(_replace, code)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Keeps the head and tail of ``text`` so that it fits within ``max_tokens``.
+    """
+    total = count_tokens(text)
+    if total <= max_tokens:
+        return text
+
+    marker = TRUNCATION_MARKER.format(count=total - max_tokens)
+    keep_tokens = max_tokens - count_tokens(marker)
+    if keep_tokens <= 0:
+        return ""
+
+    keep_chars = int(len(text) * keep_tokens / total)
+    head_chars = int(keep_chars * 0.7)
+    tail_chars = keep_chars - head_chars
+    tail = text[len(text) - tail_chars :] if tail_chars else ""
+    return text[:head_chars] + marker + tail
+
+
+@dataclass(frozen=True)
+class Section:
+    """
+    A templated prompt input. Lower ``priority`` sections are shrunk first.
+    """
+
+    name: str
+    priority: int
+    is_code: bool = False
+    max_tokens: int | None = None
+
+
+@dataclass
+class CompactedPrompt:
+    values: dict
+    prompt_tokens: int
+    original_tokens: int
+    compacted_sections: list[str] = field(default_factory=list)
+
+
+class PromptBudget:
+    """
+    Fits templated prompt inputs into a fixed token budget.
+
+    Compaction runs in stages, each only if the prompt is still over budget:
+    1. Cap every section at its own ``max_tokens`` (e.g. the RAG context).
+    2. Strip comments from code sections.
+    3. Elide long string literals in code sections.
+    4. Truncate sections from lowest to highest priority.
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        user_template: str,
+        sections: list[Section],
+        budget: int,
+        literal_max_chars: int = 200,
+    ):
+        self.sections = sorted(sections, key=lambda section: section.priority)
+        self.budget = budget
+        self.literal_max_chars = literal_max_chars
+        placeholders = {
+            name for _, name, _, _ in Formatter().parse(user_template) if name
+        }
+        skeleton = Formatter().vformat(
+            user_template, (), {name: "" for name in placeholders}
+        )
+        self.overhead_tokens = count_tokens(system_prompt) + count_tokens(skeleton)
+
+    def _total(self, values: dict) -> int:
+        return self.overhead_tokens + sum(
+            count_tokens(str(value)) for value in values.values()
+        )
+
+    def fit(self, values: dict) -> CompactedPrompt:
+        values = dict(values)
+        original_tokens = self._total(values)
+        compacted: list[str] = []
+
+        def _apply(section: Section, new_text: str) -> None:
+            if new_text != values[section.name]:
+                values[section.name] = new_text
+                if section.name not in compacted:
+                    compacted.append(section.name)
+
+        for section in self.sections:
+            if section.max_tokens is not None and section.name in values:
+                _apply(
+                    section,
+                    truncate_to_tokens(values[section.name] or "", section.max_tokens),
+                )
+
+        code_sections = [s for s in self.sections if s.is_code and values.get(s.name)]
+        for transform in (
+            strip_comments,
+            lambda code: elide_long_literals(code, self.literal_max_chars),
+        ):
+            for section in code_sections:
+                if self._total(values) <= self.budget:
+                    break
+                _apply(section, transform(values[section.name]))
+
+        for section in self.sections:
+            excess = self._total(values) - self.budget
+            if excess <= 0:
+                break
+            text = values.get(section.name) or ""
+            if not isinstance(text, str) or not text:
+                continue
+            _apply(
+                section, truncate_to_tokens(text, max(count_tokens(text) - excess, 0))
+            )
+
+        prompt_tokens = self._total(values)
+        if compacted:
+            logger.info(
+                "Compacted prompt from %s to %s tokens (sections: %s)",
+                original_tokens,
+                prompt_tokens,
+                ", ".join(compacted),
+            )
+        return CompactedPrompt(
+            values=values,
+            prompt_tokens=prompt_tokens,
+            original_tokens=original_tokens,
+            compacted_sections=compacted,
+        )
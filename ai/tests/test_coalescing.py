@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from coalescing import request_key, single_flight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_call():
+    calls = 0
+
+    async def slow_llm_call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"review": "Findings"}
+
+    key = request_key("analyze", "two-sum", "print(1)")
+    results = await asyncio.gather(
+        *(single_flight(key, slow_llm_call) for _ in range(5))
+    )
+
+    assert calls == 1
+    assert all(result == {"review": "Findings"} for result in results)
+
+
+@pytest.mark.asyncio
+async def test_key_is_released_after_completion():
+    calls = 0
+
+    async def llm_call():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    key = request_key("hint", "two-sum", 1, 0, "print(1)")
+    assert await single_flight(key, llm_call) == 1
+    assert await single_flight(key, llm_call) == 2
+
+
+@pytest.mark.asyncio
+async def test_failure_propagates_to_all_waiters():
+    async def failing_call():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    key = request_key("analyze", "two-sum", "broken")
+    results = await asyncio.gather(
+        single_flight(key, failing_call),
+        single_flight(key, failing_call),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_request_key_distinguishes_inputs():
+    assert request_key("analyze", "a", "x") != request_key("analyze", "a", "y")
+    assert request_key("analyze", "ab", "c") != request_key("analyze", "a", "bc")
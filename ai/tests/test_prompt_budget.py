@@ -0,0 +1,83 @@
+from prompt_budget import (
+    PromptBudget,
+    Section,
+    count_tokens,
+    elide_long_literals,
+    strip_comments,
+    truncate_to_tokens,
+)
+
+TEMPLATE = "Description: {description}\nCode: {user_code}\nContext: {rag_context}"
+
+
+def _budget(budget: int) -> PromptBudget:
+    return PromptBudget(
+        system_prompt="You are a reviewer.",
+        user_template=TEMPLATE,
+        sections=[
+            Section("rag_context", priority=0, max_tokens=50),
+            Section("description", priority=1),
+            Section("user_code", priority=2, is_code=True),
+        ],
+        budget=budget,
+        literal_max_chars=10,
+    )
+
+
+def test_strip_comments_keeps_hash_inside_strings():
+    code = "# header\nx = 1  # trailing\ns = '#not a comment'\n"
+    assert strip_comments(code) == "x = 1\ns = '#not a comment'\n"
+
+
+def test_strip_comments_handles_untokenizable_code():
+    code = "def broken(:\n    # note\n    pass"
+    assert "# note" not in strip_comments(code)
+
+
+def test_elide_long_literals_only_touches_long_strings():
+    code = 'short = "ok"\nlong = "' + "a" * 50 + '"'
+    result = elide_long_literals(code, 10)
+    assert 'short = "ok"' in result
+    assert "40 chars elided" in result
+
+
+def test_truncate_keeps_head_and_tail():
+    text = "start " + "filler " * 500 + "finish"
+    result = truncate_to_tokens(text, 60)
+    assert result.startswith("start")
+    assert result.endswith("finish")
+    assert "tokens truncated" in result
+
+
+def test_small_prompt_is_untouched():
+    values = {
+        "description": "Add two numbers.",
+        "user_code": "x = 1",
+        "rag_context": "",
+    }
+    compacted = _budget(1000).fit(values)
+    assert compacted.values == values
+    assert compacted.compacted_sections == []
+    assert compacted.prompt_tokens == compacted.original_tokens
+
+
+def test_rag_context_is_always_capped():
+    values = {"description": "D", "user_code": "x", "rag_context": "word " * 500}
+    compacted = _budget(10_000).fit(values)
+    assert count_tokens(compacted.values["rag_context"]) <= 50
+    assert compacted.compacted_sections == ["rag_context"]
+
+
+def test_oversized_prompt_is_bounded_and_user_code_shrinks_last():
+    values = {
+        "description": "Explain things. " * 400,
+        "user_code": "# note\n" * 50 + "total = 0\n",
+        "rag_context": "similar " * 400,
+    }
+    compacted = _budget(300).fit(values)
+
+    assert compacted.original_tokens > 1500
+    assert compacted.prompt_tokens <= 310
+    assert "total = 0" in compacted.values["user_code"]
+    assert "# note" not in compacted.values["user_code"]
+    assert "description" in compacted.compacted_sections
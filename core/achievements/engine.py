@@ -0,0 +1,162 @@
+"""
+Rule-driven achievement engine.
+
+Unlock conditions are thresholds on per-user counters kept on UserProfile
+(or, for streaks, carried by the check-in itself). Signal receivers bump a
+counter with one F-expression UPDATE and only look at the rules whose
+threshold the new value just crossed, so a save that crosses nothing costs
+no further queries. Grants are collected and applied in bulk by a Celery task
+after the triggering transaction commits, using a process-local slug catalog
+that reloads only when an achievement changes.
+"""
+
+import threading
+from dataclasses import dataclass
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from users.models import UserProfile
+from xpoint.services import XPService
+from .models import Achievement, UserAchievement
+
+CATALOG_VERSION_KEY = "achievements:catalog_version"
+
+# Counter -> (threshold, slug) pairs, ascending.
+THRESHOLD_RULES = {
+    "challenges_completed": (
+        (1, "first-blood"),
+        (5, "rising-coder"),
+        (10, "challenge-veteran"),
+        (25, "legend"),
+    ),
+    "following_count": (
+        (1, "socializer"),
+        (10, "networker"),
+    ),
+    "streak_day": (
+        (3, "streak-starter"),
+        (7, "streak-master"),
+    ),
+}
+
+SPEED_DEMON_SECONDS = 120
+
+
+@dataclass(frozen=True)
+class AchievementRecord:
+    id: int
+    slug: str
+    xp_reward: int
+
+
+@dataclass(frozen=True)
+class AchievementCatalog:
+    version: str
+    by_slug: dict[str, AchievementRecord]
+
+
+_catalog: AchievementCatalog | None = None
+_catalog_lock = threading.Lock()
+
+
+def _current_version() -> str:
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, uuid4().hex, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def invalidate_catalog() -> None:
+    cache.set(CATALOG_VERSION_KEY, uuid4().hex, timeout=None)
+
+
+def get_catalog() -> AchievementCatalog:
+    global _catalog
+    version = _current_version()
+    catalog = _catalog
+    if catalog is not None and catalog.version == version:
+        return catalog
+
+    with _catalog_lock:
+        if _catalog is None or _catalog.version != version:
+            records = (
+                AchievementRecord(*row)
+                for row in Achievement.objects.values_list("id", "slug", "xp_reward")
+            )
+            _catalog = AchievementCatalog(
+                version=version,
+                by_slug={record.slug: record for record in records},
+            )
+        return _catalog
+
+
+def crossed(counter: str, before: int, after: int) -> list[str]:
+    """Slugs whose threshold lies in ``(before, after]``."""
+    return [
+        slug
+        for threshold, slug in THRESHOLD_RULES[counter]
+        if before < threshold <= after
+    ]
+
+
+def bump_counter(user_id: int, counter: str) -> int:
+    """Increments a profile counter in place and returns its new value."""
+    profiles = UserProfile.objects.filter(user_id=user_id)
+    profiles.update(**{counter: F(counter) + 1})
+    return profiles.values_list(counter, flat=True).get()
+
+
+def drop_counter(user_id: int, counter: str) -> None:
+    # No read-back: the profile may already be gone in a cascading delete.
+    UserProfile.objects.filter(user_id=user_id, **{f"{counter}__gt": 0}).update(
+        **{counter: F(counter) - 1}
+    )
+
+
+def schedule_grants(user_id: int, slugs: list[str]) -> None:
+    """Grants ``slugs`` in one task once the current transaction commits."""
+    if not slugs:
+        return
+    from .tasks import grant_achievements_task
+
+    transaction.on_commit(lambda: grant_achievements_task.delay(user_id, slugs))
+
+
+def grant_achievements(user_id: int, slugs: list[str]) -> list[str]:
+    """
+    Unlocks every achievement in ``slugs`` the user does not own yet and
+    credits their combined XP. Returns the newly unlocked slugs.
+    """
+    catalog = get_catalog().by_slug
+    records = [catalog[slug] for slug in dict.fromkeys(slugs) if slug in catalog]
+    if not records:
+        return []
+
+    with transaction.atomic():
+        # The profile lock serializes concurrent grants for one user.
+        profile = (
+            UserProfile.objects.select_for_update(of=("self",))
+            .select_related("user")
+            .get(user_id=user_id)
+        )
+        owned = set(
+            UserAchievement.objects.filter(
+                user_id=user_id, achievement_id__in=[r.id for r in records]
+            ).values_list("achievement_id", flat=True)
+        )
+        new = [record for record in records if record.id not in owned]
+        if not new:
+            return []
+
+        UserAchievement.objects.bulk_create(
+            UserAchievement(user_id=user_id, achievement_id=record.id) for record in new
+        )
+        xp_reward = sum(record.xp_reward for record in new)
+        if xp_reward:
+            XPService.award_xp(profile.user, xp_reward, source="achievement")
+
+    return [record.slug for record in new]
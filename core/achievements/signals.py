@@ -1,121 +1,118 @@
 """
 Achievement auto-unlock signals.
 
-Listens for challenge completions, streak check-ins, and social actions
-to automatically award achievements when conditions are met.
+Listens for challenge completions, streak check-ins, and social actions,
+keeps the per-user counters behind the unlock rules up to date and schedules
+grants for any thresholds they cross (see engine.py).
 """
 
-from django.db.models.signals import post_save
+import logging
+
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from challenges.models import UserProgress
 from rewards.models import DailyCheckIn
 from users.models import UserFollow
-from .models import Achievement, UserAchievement
+from .engine import (
+    SPEED_DEMON_SECONDS,
+    bump_counter,
+    crossed,
+    drop_counter,
+    invalidate_catalog,
+    schedule_grants,
+)
+from .models import Achievement
 
+logger = logging.getLogger("achievements")
 
-def _grant(user, slug):
-    """Grant achievement by slug if not already unlocked."""
-    try:
-        achievement = Achievement.objects.get(slug=slug)
-        _, created = UserAchievement.objects.get_or_create(
-            user=user, achievement=achievement
-        )
-        if created and achievement.xp_reward:
-            profile = user.profile
-            profile.xp += achievement.xp_reward
-            profile.save(update_fields=["xp"])
-        return created
-    except Achievement.DoesNotExist:
-        return False
+
+@receiver(post_save, sender=Achievement)
+@receiver(post_delete, sender=Achievement)
+def refresh_achievement_catalog(sender, instance, **kwargs):
+    _ = sender, instance, kwargs
+    invalidate_catalog()
 
 
 # ──── Challenge-based achievements ────
 
 
 @receiver(post_save, sender=UserProgress)
-def check_challenge_achievements(sender, instance, **kwargs):
+def check_challenge_achievements(sender, instance, update_fields=None, **kwargs):
     _ = sender, kwargs
-    if instance.status != "COMPLETED":
+    if instance.status != UserProgress.Status.COMPLETED:
+        return
+    # Counted by UserProgress.save; None unless this save completed the level.
+    totals = getattr(instance, "completion_totals", None)
+    # Other saves that leave stars alone (e.g. hint purchases) cannot unlock
+    # anything.
+    if totals is None and update_fields is not None and "stars" not in update_fields:
         return
-
-    user = instance.user
 
     try:
-        # First Blood — complete any challenge
-        completed_count = UserProgress.objects.filter(
-            user=user, status="COMPLETED"
-        ).count()
-
-        if completed_count >= 1:
-            _grant(user, "first-blood")
-
-        if completed_count >= 5:
-            _grant(user, "rising-coder")
-
-        if completed_count >= 10:
-            _grant(user, "challenge-veteran")
-
-        if completed_count >= 25:
-            _grant(user, "legend")
+        slugs = []
+        if totals is not None:
+            completed = totals["challenges_completed"]
+            slugs += crossed("challenges_completed", completed - 1, completed)
 
         # Speed Demon — completed in under 2 minutes
         if instance.started_at and instance.completed_at:
             elapsed = (instance.completed_at - instance.started_at).total_seconds()
-            if elapsed < 120:
-                _grant(user, "speed-demon")
+            if elapsed < SPEED_DEMON_SECONDS:
+                slugs.append("speed-demon")
 
         # Perfect Score — 3 stars
         if instance.stars == 3:
-            _grant(user, "perfectionist")
+            slugs.append("perfectionist")
+
+        schedule_grants(instance.user_id, slugs)
     except Exception as e:
-        import logging
+        logger.warning(f"Error checking challenge achievements: {e}")
 
-        logging.getLogger("achievements").warning(
-            f"Error checking challenge achievements: {e}"
-        )
+
+@receiver(post_delete, sender=UserProgress)
+def uncount_deleted_completion(sender, instance, **kwargs):
+    _ = sender, kwargs
+    if instance.status == UserProgress.Status.COMPLETED:
+        drop_counter(instance.user_id, "challenges_completed")
 
 
 # ──── Streak-based achievements ────
 
 
 @receiver(post_save, sender=DailyCheckIn)
-def check_streak_achievements(sender, instance, **kwargs):
+def check_streak_achievements(sender, instance, created, **kwargs):
     _ = sender, kwargs
-    user = instance.user
+    if not created:
+        return
 
     try:
-        if instance.streak_day >= 3:
-            _grant(user, "streak-starter")
-
-        if instance.streak_day >= 7:
-            _grant(user, "streak-master")
+        day = instance.streak_day
+        schedule_grants(instance.user_id, crossed("streak_day", day - 1, day))
     except Exception as e:
-        import logging
-
-        logging.getLogger("achievements").warning(
-            f"Error checking streak achievements: {e}"
-        )
+        logger.warning(f"Error checking streak achievements: {e}")
 
 
 # ──── Social achievements ────
 
 
 @receiver(post_save, sender=UserFollow)
-def check_social_achievements(sender, instance, **kwargs):
+def check_social_achievements(sender, instance, created, **kwargs):
     _ = sender, kwargs
-    follower = instance.follower
+    if not created:
+        return
 
     try:
-        following_count = UserFollow.objects.filter(follower=follower).count()
-        if following_count >= 1:
-            _grant(follower, "socializer")
-
-        if following_count >= 10:
-            _grant(follower, "networker")
+        following = bump_counter(instance.follower_id, "following_count")
+        schedule_grants(
+            instance.follower_id,
+            crossed("following_count", following - 1, following),
+        )
     except Exception as e:
-        import logging
+        logger.warning(f"Error checking social achievements: {e}")
 
-        logging.getLogger("achievements").warning(
-            f"Error checking social achievements: {e}"
-        )
+
+@receiver(post_delete, sender=UserFollow)
+def uncount_unfollow(sender, instance, **kwargs):
+    _ = sender, kwargs
+    drop_counter(instance.follower_id, "following_count")
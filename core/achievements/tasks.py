@@ -0,0 +1,10 @@
+from celery import shared_task
+
+from project.task_results import EphemeralResultTask
+from .engine import grant_achievements
+
+
+@shared_task(base=EphemeralResultTask)
+def grant_achievements_task(user_id, slugs):
+    """Apply achievement unlocks collected by the signal receivers."""
+    return grant_achievements(user_id, slugs)
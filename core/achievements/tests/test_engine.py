@@ -0,0 +1,105 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from achievements.engine import get_catalog, grant_achievements
+from achievements.management.commands.seed_achievements import ACHIEVEMENTS
+from achievements.models import Achievement, UserAchievement
+from achievements.signals import check_social_achievements
+from challenges.models import Challenge, UserProgress
+from challenges.services import ChallengeService
+from users.models import UserFollow, UserProfile
+
+
+class AchievementEngineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        for data in ACHIEVEMENTS:
+            Achievement.objects.create(**data)
+        self.user = User.objects.create_user(username="coder", password="pw")
+        self.others = [
+            User.objects.create_user(username=f"friend{i}", password="pw")
+            for i in range(3)
+        ]
+        get_catalog()
+
+    def unlocked(self):
+        return set(
+            UserAchievement.objects.filter(user=self.user).values_list(
+                "achievement__slug", flat=True
+            )
+        )
+
+    def test_first_completion_grants_crossed_thresholds_after_commit(self):
+        challenge = Challenge.objects.create(
+            title="One", slug="one", order=1, xp_reward=10
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ChallengeService.process_submission(self.user, challenge, passed=True)
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.challenges_completed, 1)
+        self.assertEqual(self.unlocked(), {"first-blood", "perfectionist"})
+        # Challenge XP plus both achievement rewards.
+        self.assertEqual(profile.xp, 10 + 25 + 50)
+
+    def test_completion_saved_without_stars_is_counted(self):
+        challenge = Challenge.objects.create(
+            title="Mine", slug="mine", order=1, created_for_user=self.user
+        )
+        progress = UserProgress.objects.create(user=self.user, challenge=challenge)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            progress.status = UserProgress.Status.COMPLETED
+            progress.save(update_fields=["status"])
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.challenges_completed, 1)
+        self.assertEqual(profile.global_levels_completed, 0)
+        self.assertIn("first-blood", self.unlocked())
+
+    def test_follow_that_crosses_nothing_costs_two_queries(self):
+        UserFollow.objects.create(follower=self.user, following=self.others[0])
+        follow = UserFollow.objects.create(follower=self.user, following=self.others[1])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            # UPDATE counter, SELECT counter; no grant is scheduled.
+            with self.assertNumQueries(2):
+                check_social_achievements(
+                    sender=UserFollow, instance=follow, created=True
+                )
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(UserProfile.objects.get(user=self.user).following_count, 3)
+
+    def test_unfollow_decrements_counter(self):
+        follow = UserFollow.objects.create(follower=self.user, following=self.others[0])
+        UserFollow.objects.create(follower=self.user, following=self.others[1])
+        follow.delete()
+
+        self.assertEqual(UserProfile.objects.get(user=self.user).following_count, 1)
+
+    def test_grants_are_bulk_and_idempotent(self):
+        # SAVEPOINT, SELECT ... FOR UPDATE, SELECT owned, INSERT, UPDATE/SELECT
+        # xp, INSERT ledger row, RELEASE.
+        with self.assertNumQueries(8):
+            granted = grant_achievements(
+                self.user.id, ["first-blood", "rising-coder", "no-such-badge"]
+            )
+        self.assertEqual(granted, ["first-blood", "rising-coder"])
+        self.assertEqual(UserProfile.objects.get(user=self.user).xp, 75)
+
+        with self.assertNumQueries(4):
+            self.assertEqual(grant_achievements(self.user.id, ["first-blood"]), [])
+        self.assertEqual(UserProfile.objects.get(user=self.user).xp, 75)
+
+    def test_catalog_reloads_only_after_an_achievement_changes(self):
+        with self.assertNumQueries(0):
+            get_catalog()
+
+        Achievement.objects.create(slug="night-owl", title="Night Owl", xp_reward=5)
+
+        with self.assertNumQueries(1):
+            self.assertIn("night-owl", get_catalog().by_slug)
@@ -34,7 +34,7 @@ class AdminAnalyticsTest(TestCase):
         self.profile = self.user.profile
         self.profile.provider = "github"
         self.profile.xp = 500
-        self.profile.save()
+        self.profile.save(update_fields=["provider", "xp"])
 
         # Create a challenge and some progress
         self.challenge = Challenge.objects.create(
@@ -0,0 +1,140 @@
+import json
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from administration.models import AdminAuditLog
+from users.models import UserProfile
+from xpoint.models import XPTransaction
+from xpoint.services import XPService
+
+
+class BulkXPAwardViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username="superadmin",
+            password="pass1234",
+            is_staff=True,
+            is_superuser=True,
+        )
+        self.players = [
+            User.objects.create_user(username=f"player{i}", password="pass1234")
+            for i in range(3)
+        ]
+        self.url = "/api/admin/xp/bulk-award/"
+
+    def read_lines(self, response):
+        body = b"".join(response.streaming_content).decode()
+        return [json.loads(line) for line in body.splitlines()]
+
+    def in_chunks_of_two(self):
+        iter_add_xp_bulk = XPService.iter_add_xp_bulk
+
+        def in_pairs(grants, description):
+            return iter_add_xp_bulk(grants, description, chunk_size=2)
+
+        return patch.object(XPService, "iter_add_xp_bulk", in_pairs)
+
+    def test_reports_progress_per_chunk(self):
+        self.client.force_authenticate(user=self.admin)
+        grants = [{"user_id": user.id, "amount": 15} for user in self.players]
+
+        response = self.client.post(
+            self.url, {"grants": grants, "description": "Apology"}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = self.read_lines(response)
+        self.assertEqual(lines[0]["total"], 3)
+        self.assertEqual(
+            lines[-1], {"done": True, "users_updated": 3, "users_skipped": 0}
+        )
+        self.assertEqual(
+            list(
+                UserProfile.objects.filter(user__in=self.players).values_list(
+                    "xp", flat=True
+                )
+            ),
+            [15, 15, 15],
+        )
+        self.assertEqual(
+            set(XPTransaction.objects.values_list("source", flat=True)),
+            {XPService.SOURCE_ADMIN},
+        )
+        log = AdminAuditLog.objects.get(action="BULK_XP_AWARD")
+        self.assertEqual(log.details["users_updated"], 3)
+        self.assertTrue(log.details["completed"])
+
+    def test_failed_chunk_is_reported_and_logged(self):
+        self.client.force_authenticate(user=self.admin)
+        grants = [{"user_id": user.id, "amount": 15} for user in self.players]
+        apply_chunk = XPService._apply_chunk
+        calls = []
+
+        def fail_second_chunk(chunk, description):
+            calls.append(chunk)
+            if len(calls) == 2:
+                raise DatabaseError("connection lost")
+            return apply_chunk(chunk, description)
+
+        with self.in_chunks_of_two(), patch.object(
+            XPService, "_apply_chunk", side_effect=fail_second_chunk
+        ):
+            response = self.client.post(self.url, {"grants": grants}, format="json")
+            lines = self.read_lines(response)
+
+        self.assertEqual(lines[0]["applied"], 2)
+        self.assertEqual(lines[-1], {"error": "Bulk award failed", "processed": 2})
+        log = AdminAuditLog.objects.get(action="BULK_XP_AWARD")
+        self.assertEqual(
+            (log.details["users_updated"], log.details["error"]),
+            (2, "connection lost"),
+        )
+
+    def test_disconnect_is_logged_with_progress_so_far(self):
+        self.client.force_authenticate(user=self.admin)
+        grants = [{"user_id": user.id, "amount": 15} for user in self.players]
+
+        with self.in_chunks_of_two():
+            response = self.client.post(self.url, {"grants": grants}, format="json")
+            stream = iter(response.streaming_content)
+            first = json.loads(next(stream))
+            self.assertFalse(AdminAuditLog.objects.exists())
+            response.close()
+
+        self.assertEqual(first["processed"], 2)
+        log = AdminAuditLog.objects.get(action="BULK_XP_AWARD")
+        self.assertEqual(
+            (log.details["processed"], log.details["completed"]), (2, False)
+        )
+        self.assertEqual(UserProfile.objects.get(user=self.players[2]).xp, 0)
+
+    def test_rejects_malformed_grants(self):
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.post(
+            self.url, {"grants": [{"user_id": self.players[0].id}]}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(XPTransaction.objects.exists())
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(user=self.players[0])
+
+        response = self.client.post(
+            self.url,
+            {"grants": [{"user_id": self.players[0].id, "amount": 1000}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(XPTransaction.objects.exists())
@@ -22,6 +22,7 @@ from .views import (
     AdminReportsView,
     AdminReportDetailView,
     StoreItemDuplicateView,
+    BulkXPAwardView,
 )
 
 urlpatterns = [
@@ -60,6 +61,7 @@ urlpatterns = [
         GlobalNotificationView.as_view(),
         name="admin_broadcast",
     ),
+    path("xp/bulk-award/", BulkXPAwardView.as_view(), name="admin_xp_bulk_award"),
     path("users/", UserListView.as_view(), name="admin_user_list"),
     path("users/export/", UserExportView.as_view(), name="admin_user_export"),
     path("users/bulk/", UserBulkActionView.as_view(), name="admin_user_bulk"),
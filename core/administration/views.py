@@ -1,13 +1,14 @@
 import csv
+import json
+import logging
 import uuid
 from io import StringIO
 from datetime import datetime, time, timedelta
 
 from django.contrib.auth.models import User
-from django.core.cache import cache
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.core.paginator import Paginator
-from django.db import models
+from django.db import DatabaseError, models
 from django.db.models import Avg, Count, Sum
 from django.db.models.functions import TruncDay
 from django.utils import timezone
@@ -24,10 +25,12 @@ from rest_framework.views import APIView
 
 from challenges.models import Challenge, UserProgress
 from notifications.models import Notification
+from project.caching import get_or_compute
 from store.models import StoreItem
 from store.models import Purchase
 from users.models import UserProfile
 from users.serializers import UserSerializer
+from xpoint.services import XPService
 
 from .models import AdminAuditLog, AdminNote, AdminReport
 from .permissions import IsAdminUser, can_manage_user
@@ -43,7 +46,10 @@ from .serializers import (
     UltimateAnalyticsSerializer,
 )
 
+logger = logging.getLogger(__name__)
+
 ANALYTICS_CACHE_TTL = 60 * 2
+BULK_XP_MAX_GRANTS = 100_000
 
 
 def _request_ip(request):
@@ -139,11 +145,14 @@ class AdminStatsView(APIView):
         description="Get administration statistics including total users, active sessions, and economy totals.",
     )
     def get(self, request):
-        cache_key = _analytics_cache_key("stats", request)
-        cached_data = cache.get(cache_key)
-        if cached_data is not None:
-            return Response(cached_data, status=status.HTTP_200_OK)
+        data = get_or_compute(
+            _analytics_cache_key("stats", request),
+            lambda: self.build_analytics(request),
+            ANALYTICS_CACHE_TTL,
+        )
+        return Response(data, status=status.HTTP_200_OK)
 
+    def build_analytics(self, request):
         total_users = User.objects.count()
         yesterday = timezone.now() - timedelta(days=1)
         active_sessions = User.objects.filter(last_login__gte=yesterday).count()
@@ -159,8 +168,7 @@ class AdminStatsView(APIView):
             "total_gems": total_xp,
         }
         serializer = AdminStatsSerializer(data)
-        cache.set(cache_key, serializer.data, timeout=ANALYTICS_CACHE_TTL)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return serializer.data
 
 
 class UserListView(APIView):
@@ -880,11 +888,14 @@ class ChallengeAnalyticsView(APIView):
         description="Get detailed challenge performance analytics including completion rates and average stars.",
     )
     def get(self, request):
-        cache_key = _analytics_cache_key("challenge-analytics", request)
-        cached_data = cache.get(cache_key)
-        if cached_data is not None:
-            return Response(cached_data, status=status.HTTP_200_OK)
+        data = get_or_compute(
+            _analytics_cache_key("challenge-analytics", request),
+            lambda: self.build_analytics(request),
+            ANALYTICS_CACHE_TTL,
+        )
+        return Response(data, status=status.HTTP_200_OK)
 
+    def build_analytics(self, request):
         challenges = Challenge.objects.all()
         progress_summary = UserProgress.objects.values("challenge_id").annotate(
             total_attempts=Count("id"),
@@ -946,8 +957,7 @@ class ChallengeAnalyticsView(APIView):
             )
 
         serializer = ChallengeAnalyticsSerializer(analytics_data, many=True)
-        cache.set(cache_key, serializer.data, timeout=ANALYTICS_CACHE_TTL)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return serializer.data
 
 
 class StoreAnalyticsView(APIView):
@@ -960,11 +970,14 @@ class StoreAnalyticsView(APIView):
         description="Get store economy analytics, item popularity, and total XP revenue.",
     )
     def get(self, request):
-        cache_key = _analytics_cache_key("store-analytics", request)
-        cached_data = cache.get(cache_key)
-        if cached_data is not None:
-            return Response(cached_data, status=status.HTTP_200_OK)
+        data = get_or_compute(
+            _analytics_cache_key("store-analytics", request),
+            lambda: self.build_analytics(request),
+            ANALYTICS_CACHE_TTL,
+        )
+        return Response(data, status=status.HTTP_200_OK)
 
+    def build_analytics(self, request):
         items = StoreItem.objects.annotate(purchase_count=Count("purchases")).order_by(
             "-purchase_count"
         )
@@ -983,8 +996,7 @@ class StoreAnalyticsView(APIView):
         total_revenue = sum(item["revenue"] for item in item_stats)
         data = {"items": item_stats, "total_xp_spent": total_revenue}
         serializer = StoreAnalyticsSerializer(data)
-        cache.set(cache_key, serializer.data, timeout=ANALYTICS_CACHE_TTL)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return serializer.data
 
 
 class UserEngagementAnalyticsView(APIView):
@@ -997,11 +1009,14 @@ class UserEngagementAnalyticsView(APIView):
         description="Get user growth trends, active session counts, and auth provider distribution.",
     )
     def get(self, request):
-        cache_key = _analytics_cache_key("user-engagement", request)
-        cached_data = cache.get(cache_key)
-        if cached_data is not None:
-            return Response(cached_data, status=status.HTTP_200_OK)
+        data = get_or_compute(
+            _analytics_cache_key("user-engagement", request),
+            lambda: self.build_analytics(request),
+            ANALYTICS_CACHE_TTL,
+        )
+        return Response(data, status=status.HTTP_200_OK)
 
+    def build_analytics(self, request):
         now = timezone.now()
         thirty_days_ago = now - timedelta(days=30)
 
@@ -1055,8 +1070,7 @@ class UserEngagementAnalyticsView(APIView):
             "top_users": top_users,
         }
         serializer = UserEngagementAnalyticsSerializer(data)
-        cache.set(cache_key, serializer.data, timeout=ANALYTICS_CACHE_TTL)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return serializer.data
 
 
 class UltimateAnalyticsView(APIView):
@@ -1069,11 +1083,14 @@ class UltimateAnalyticsView(APIView):
         description="Consolidated analytics including growth, economy, and performance leaderboards.",
     )
     def get(self, request):
-        cache_key = _analytics_cache_key("ultimate", request)
-        cached_data = cache.get(cache_key)
-        if cached_data is not None:
-            return Response(cached_data, status=status.HTTP_200_OK)
+        data = get_or_compute(
+            _analytics_cache_key("ultimate", request),
+            lambda: self.build_analytics(request),
+            ANALYTICS_CACHE_TTL,
+        )
+        return Response(data, status=status.HTTP_200_OK)
 
+    def build_analytics(self, request):
         now = timezone.now()
         thirty_ago = now - timedelta(days=30)
 
@@ -1229,8 +1246,7 @@ class UltimateAnalyticsView(APIView):
             "system_health": system_health,
         }
         serializer = UltimateAnalyticsSerializer(data)
-        cache.set(cache_key, serializer.data, timeout=ANALYTICS_CACHE_TTL)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return serializer.data
 
 
 class GlobalNotificationView(APIView):
@@ -1513,11 +1529,14 @@ class SystemIntegrityView(APIView):
         description="Get current collection counts for key system models.",
     )
     def get(self, request):
-        cache_key = _analytics_cache_key("system-integrity", request)
-        cached_data = cache.get(cache_key)
-        if cached_data is not None:
-            return Response(cached_data, status=status.HTTP_200_OK)
+        data = get_or_compute(
+            _analytics_cache_key("system-integrity", request),
+            lambda: self.build_analytics(request),
+            ANALYTICS_CACHE_TTL,
+        )
+        return Response(data, status=status.HTTP_200_OK)
 
+    def build_analytics(self, request):
         data = {
             "users": User.objects.count(),
             "challenges": Challenge.objects.count(),
@@ -1526,8 +1545,7 @@ class SystemIntegrityView(APIView):
             "audit_logs": AdminAuditLog.objects.count(),
         }
         serializer = SystemIntegritySerializer(data)
-        cache.set(cache_key, serializer.data, timeout=ANALYTICS_CACHE_TTL)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return serializer.data
 
 
 class SystemHealthView(APIView):
@@ -1538,11 +1556,14 @@ class SystemHealthView(APIView):
         description="Get lightweight operational health data for the admin dashboard.",
     )
     def get(self, request):
-        cache_key = _analytics_cache_key("system-health", request)
-        cached_data = cache.get(cache_key)
-        if cached_data is not None:
-            return Response(cached_data, status=status.HTTP_200_OK)
+        data = get_or_compute(
+            _analytics_cache_key("system-health", request),
+            lambda: self.build_analytics(request),
+            ANALYTICS_CACHE_TTL,
+        )
+        return Response(data, status=status.HTTP_200_OK)
 
+    def build_analytics(self, request):
         latest_audit = (
             AdminAuditLog.objects.order_by("-timestamp")
             .values_list("timestamp", flat=True)
@@ -1567,8 +1588,7 @@ class SystemHealthView(APIView):
                 status=AdminReport.Status.RESOLVED
             ).count(),
         }
-        cache.set(cache_key, data, timeout=ANALYTICS_CACHE_TTL)
-        return Response(data, status=status.HTTP_200_OK)
+        return data
 
 
 class StoreItemDuplicateView(APIView):
@@ -1606,3 +1626,104 @@ class StoreItemDuplicateView(APIView):
             {"id": duplicate.id, "message": "Store item duplicated."},
             status=status.HTTP_200_OK,
         )
+
+
+class BulkXPAwardView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        request=inline_serializer(
+            name="AdminBulkXPAwardRequest",
+            fields={
+                "grants": serializers.ListField(
+                    child=serializers.DictField(), max_length=BULK_XP_MAX_GRANTS
+                ),
+                "source": serializers.CharField(required=False),
+                "description": serializers.CharField(required=False),
+            },
+        ),
+        responses={200: OpenApiTypes.BINARY, 400: OpenApiTypes.OBJECT},
+        description=(
+            "Award or deduct XP for many users at once. Each grant is "
+            '{"user_id", "amount", "source"?}. Progress is streamed as one JSON '
+            "object per line after every applied chunk, then a done line (or an "
+            "error line if a chunk failed; earlier chunks stay applied)."
+        ),
+    )
+    def post(self, request):
+        raw_grants = request.data.get("grants")
+        default_source = str(request.data.get("source") or XPService.SOURCE_ADMIN)
+        description = str(request.data.get("description") or "")[:255]
+        if not isinstance(raw_grants, list) or not raw_grants:
+            return Response(
+                {"error": "grants must be a non-empty list."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(raw_grants) > BULK_XP_MAX_GRANTS:
+            return Response(
+                {"error": f"At most {BULK_XP_MAX_GRANTS} grants per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        grants = []
+        for index, grant in enumerate(raw_grants):
+            try:
+                user_id, amount = int(grant["user_id"]), int(grant["amount"])
+                source = str(grant.get("source") or default_source)[:50]
+            except (KeyError, TypeError, ValueError, AttributeError):
+                return Response(
+                    {"error": f"Invalid grant at index {index}."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            grants.append((user_id, amount, source))
+
+        def progress_lines():
+            applied = skipped = processed = 0
+            error, finished = None, False
+            try:
+                for progress in XPService.iter_add_xp_bulk(grants, description):
+                    applied += len(progress["balances"])
+                    skipped += len(progress["skipped"])
+                    processed = progress["processed"]
+                    line = {
+                        "processed": processed,
+                        "total": progress["total"],
+                        "applied": len(progress["balances"]),
+                        "skipped": progress["skipped"],
+                    }
+                    yield json.dumps(line) + "\n"
+                finished = True
+                yield json.dumps(
+                    {"done": True, "users_updated": applied, "users_skipped": skipped}
+                ) + "\n"
+            except DatabaseError as exc:
+                # Chunks commit one by one: everything reported so far stays.
+                logger.exception("Bulk XP award failed after %s grants", processed)
+                error = str(exc)
+                yield json.dumps(
+                    {"error": "Bulk award failed", "processed": processed}
+                ) + "\n"
+            finally:
+                # Also runs when the client disconnects and the server closes
+                # the stream: the log records how far the batch got.
+                log_admin_action(
+                    admin=request.user,
+                    action="BULK_XP_AWARD",
+                    request=request,
+                    details={
+                        "grant_count": len(grants),
+                        "net_amount": sum(amount for _, amount, _ in grants),
+                        "processed": processed,
+                        "users_updated": applied,
+                        "users_skipped": skipped,
+                        "completed": finished,
+                        "description": description,
+                        **({"error": error} if error else {}),
+                    },
+                )
+
+        response = StreamingHttpResponse(
+            progress_lines(), content_type="application/x-ndjson"
+        )
+        response["Cache-Control"] = "no-store"
+        return response
@@ -1,3 +1,4 @@
+import io
 import logging
 import hmac
 from datetime import datetime, timedelta, timezone
@@ -9,6 +10,7 @@ from django.db import transaction
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
 from django.core.cache import cache
+from PIL import Image
 
 from users.models import UserProfile
 from .models import EmailOTP
@@ -250,19 +252,21 @@ class AuthService:
 
     @staticmethod
     def _download_and_save_avatar(profile, url):
-        """Helper to download image from URL and save to ImageField."""
+        """
+        Helper to download an image from URL and save it to the avatar field.
+        The resized renditions are made afterwards (see project.images).
+        """
         try:
             response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                file_name = url.split("/")[-1].split("?")[0]
-                if not file_name:
-                    file_name = f"avatar_{profile.user.id}.png"
-
-                # Ensure extension
-                if "." not in file_name:
-                    file_name += ".png"
-
-                profile.avatar.save(file_name, ContentFile(response.content), save=True)
+            if response.status_code != 200:
+                return
+            # Providers sometimes answer with an HTML error page; keep only
+            # real images, named by their actual format.
+            with Image.open(io.BytesIO(response.content)) as image:
+                image_format = (image.format or "png").lower()
+                image.verify()
+            file_name = f"avatar_{profile.user.id}.{image_format}"
+            profile.avatar.save(file_name, ContentFile(response.content), save=True)
         except Exception as e:
             logger.error(f"Failed to download avatar from {url}: {e}")
 
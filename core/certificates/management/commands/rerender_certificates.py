@@ -0,0 +1,46 @@
+"""
+Django Management Command: Re-render Certificates
+Run after changing the certificate template (bump
+``certificates.rendering.TEMPLATE_VERSION``). Certificates whose stored image
+already matches are skipped.
+"""
+
+from django.core.management.base import BaseCommand
+
+from certificates.tasks import RERENDER_BATCH_SIZE, rerender_certificates_task
+
+
+class Command(BaseCommand):
+    help = "Re-render stale certificate images in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=RERENDER_BATCH_SIZE,
+            help="Certificates per task",
+        )
+        parser.add_argument(
+            "--sync",
+            action="store_true",
+            help="Render in this process instead of queueing Celery tasks",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if not options["sync"]:
+            rerender_certificates_task.delay(0, batch_size)
+            self.stdout.write(self.style.SUCCESS("Queued certificate re-render"))
+            return
+
+        after_pk, checked, rendered = 0, 0, 0
+        while True:
+            result = rerender_certificates_task.run(after_pk, batch_size, chain=False)
+            checked += result["checked"]
+            rendered += result["rendered"]
+            if result["checked"] < batch_size:
+                break
+            after_pk = result["last_pk"]
+        self.stdout.write(
+            self.style.SUCCESS(f"Checked {checked} certificates, rendered {rendered}")
+        )
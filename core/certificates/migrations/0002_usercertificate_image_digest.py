@@ -0,0 +1,38 @@
+# Generated by Django 5.0.9 on 2026-10-19 15:13
+
+import re
+
+from django.db import migrations, models
+
+# Images were named ``certificates/<digest>.png``; Cloudinary stores them as
+# ``media/certificates/<digest>_<suffix>``.
+DIGEST_IN_NAME = re.compile(r"certificates/([0-9a-f]{32})(?:[_.]|$)")
+
+
+def backfill_image_digest(apps, _schema_editor):
+    UserCertificate = apps.get_model("certificates", "UserCertificate")
+    certificates = UserCertificate.objects.exclude(certificate_image="").exclude(
+        certificate_image__isnull=True
+    )
+    for certificate in certificates.only("pk", "certificate_image").iterator():
+        match = DIGEST_IN_NAME.search(certificate.certificate_image.name)
+        if match:
+            UserCertificate.objects.filter(pk=certificate.pk).update(
+                image_digest=match.group(1)
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("certificates", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="usercertificate",
+            name="image_digest",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+        migrations.RunPython(backfill_image_digest, migrations.RunPython.noop),
+    ]
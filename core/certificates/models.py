@@ -19,6 +19,8 @@ class UserCertificate(models.Model):
     certificate_image = models.ImageField(
         upload_to="certificates/", null=True, blank=True
     )
+    # Digest of what ``certificate_image`` shows; storages may rename uploads.
+    image_digest = models.CharField(max_length=32, blank=True, default="")
     is_valid = models.BooleanField(default=True)
     completion_count = models.IntegerField(
         help_text="Number of challenges completed when certificate was issued"
@@ -0,0 +1,144 @@
+"""
+Server-side certificate images.
+
+Certificates are rendered to PNG by a Celery task and recorded with a
+digest of everything drawn on the image plus the template version. The
+digest is kept in its own column rather than read back from the file name,
+which the storage may change on upload (Cloudinary appends a random suffix).
+A render whose digest matches the recorded one is skipped, and bumping
+``TEMPLATE_VERSION`` makes every certificate stale so
+``rerender_certificates`` can redraw them in batches.
+"""
+
+import io
+import json
+from hashlib import sha256
+
+import qrcode
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageDraw, ImageFont
+
+from .models import UserCertificate
+
+# Bump whenever the layout below changes.
+TEMPLATE_VERSION = 1
+IMAGE_DIR = "certificates"
+# Image URLs embed the digest, so their content never changes.
+IMAGE_CACHE_SECONDS = 60 * 60 * 24 * 365
+
+CANVAS_SIZE = (1600, 1130)
+QR_SIZE = 240
+BACKGROUND = "#0f172a"
+ACCENT = "#f59e0b"
+TEXT = "#f8fafc"
+MUTED = "#94a3b8"
+
+
+def render_inputs(certificate) -> dict[str, object]:
+    """Everything drawn on the certificate; any change means a new image."""
+    return {
+        "template": TEMPLATE_VERSION,
+        "certificate_id": str(certificate.certificate_id),
+        "username": certificate.user.username,
+        "issued": certificate.issued_date.date().isoformat(),
+        "completion_count": certificate.completion_count,
+        "verification_url": certificate.verification_url,
+    }
+
+
+def render_digest(inputs: dict[str, object]) -> str:
+    payload = json.dumps(inputs, sort_keys=True, separators=(",", ":"))
+    return sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def image_name(digest: str) -> str:
+    return f"{IMAGE_DIR}/{digest}.png"
+
+
+def image_digest(certificate) -> str | None:
+    """Digest of the stored image, if one has been rendered."""
+    if not certificate.certificate_image:
+        return None
+    return certificate.image_digest or None
+
+
+def render_png(inputs: dict[str, object]) -> bytes:
+    width, height = CANVAS_SIZE
+    image = Image.new("RGB", CANVAS_SIZE, BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((30, 30, width - 30, height - 30), outline=ACCENT, width=6)
+    draw.rectangle((50, 50, width - 50, height - 50), outline=MUTED, width=2)
+
+    def centered(y, text, size, fill):
+        font = ImageFont.load_default(size=size)
+        draw.text((width / 2, y), text, font=font, fill=fill, anchor="mm")
+
+    centered(190, "CLASH OF CODE", 44, ACCENT)
+    centered(290, "Certificate of Completion", 72, TEXT)
+    centered(400, "This certifies that", 34, MUTED)
+    centered(490, str(inputs["username"]), 96, TEXT)
+    centered(
+        600,
+        f"completed all {inputs['completion_count']} levels of the campaign",
+        38,
+        MUTED,
+    )
+    centered(660, f"Issued {inputs['issued']}", 34, MUTED)
+
+    qr = qrcode.QRCode(border=2)
+    qr.add_data(inputs["verification_url"])
+    qr.make(fit=True)
+    # Whole pixels per module keep the code scannable.
+    qr.box_size = max(1, QR_SIZE // (qr.modules_count + 2 * qr.border))
+    code = qr.make_image(fill_color="black", back_color="white").get_image()
+    offset = (QR_SIZE - code.size[0]) // 2
+    image.paste(
+        code.convert("RGB"),
+        (width - 100 - QR_SIZE + offset, height - 100 - QR_SIZE + offset),
+    )
+
+    small = ImageFont.load_default(size=24)
+    draw.text(
+        (100, height - 130),
+        f"Certificate ID: {inputs['certificate_id']}",
+        font=small,
+        fill=MUTED,
+    )
+    draw.text(
+        (100, height - 95), str(inputs["verification_url"]), font=small, fill=MUTED
+    )
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def ensure_rendered(certificate) -> bool:
+    """
+    Renders ``certificate`` unless its stored image already matches the
+    current inputs. Returns True if a new image was attached.
+    """
+    inputs = render_inputs(certificate)
+    digest = render_digest(inputs)
+    if image_digest(certificate) == digest:
+        return False
+
+    storage = certificate.certificate_image.storage
+    # The storage may save under another name; keep whatever it returns.
+    name = storage.save(image_name(digest), ContentFile(render_png(inputs)))
+
+    # A queryset update, so the post_save render hook does not fire again.
+    UserCertificate.objects.filter(pk=certificate.pk).update(
+        certificate_image=name, image_digest=digest
+    )
+    certificate.certificate_image = name
+    certificate.image_digest = digest
+    return True
+
+
+def schedule_render(certificate) -> None:
+    from .tasks import render_certificate_task
+
+    pk = certificate.pk
+    transaction.on_commit(lambda: render_certificate_task.delay(pk))
@@ -1,11 +1,14 @@
+from django.urls import reverse
 from rest_framework import serializers
 
 from .models import UserCertificate
+from .rendering import image_digest
 
 
 class UserCertificateSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source="user.username", read_only=True)
     verification_url = serializers.CharField(read_only=True)
+    image_url = serializers.SerializerMethodField()
 
     class Meta:
         model = UserCertificate
@@ -17,5 +20,17 @@ class UserCertificateSerializer(serializers.ModelSerializer):
             "is_valid",
             "completion_count",
             "verification_url",
+            "image_url",
         ]
         read_only_fields = ["certificate_id", "issued_date"]
+
+    def get_image_url(self, obj) -> str | None:
+        digest = image_digest(obj)
+        if digest is None:
+            return None
+        path = reverse(
+            "certificate-image",
+            kwargs={"certificate_id": str(obj.certificate_id), "digest": digest},
+        )
+        request = self.context.get("request")
+        return request.build_absolute_uri(path) if request else path
@@ -5,16 +5,37 @@ Centralized logic for certificate eligibility, generation, and management.
 
 import logging
 
-from challenges.models import UserProgress
+from django.db.models import F
+
+from challenges.campaign import get_campaign_snapshot
 from challenges.levels import LEVELS
+from users.models import UserProfile
 
 from .models import UserCertificate
 
 logger = logging.getLogger(__name__)
 
+# (LEVELS object, its orders); rebuilt only when LEVELS is replaced.
+_required_orders = (None, frozenset())
+
+
+def required_orders():
+    global _required_orders
+    levels, orders = _required_orders
+    if levels is not LEVELS:
+        orders = frozenset(level["order"] for level in LEVELS)
+        _required_orders = (LEVELS, orders)
+    return orders
+
 
 class CertificateService:
-    """Service for managing user certificates."""
+    """
+    Service for managing user certificates.
+
+    Progress toward the certificate is the ``global_levels_completed``
+    counter on the profile, maintained by progress signals, so eligibility
+    is a single comparison instead of a scan of the user's completions.
+    """
 
     @staticmethod
     def get_required_challenges():
@@ -27,34 +48,45 @@ class CertificateService:
 
     @staticmethod
     def get_completed_count(user):
-        required_orders = {level["order"] for level in LEVELS}
-        completed_orders = set(
-            UserProgress.objects.filter(
-                user=user,
-                status=UserProgress.Status.COMPLETED,
-                challenge__created_for_user__isnull=True,
-            ).values_list("challenge__order", flat=True)
+        completed = (
+            UserProfile.objects.filter(user=user)
+            .values_list("global_levels_completed", flat=True)
+            .first()
         )
-        return len(required_orders.intersection(completed_orders))
+        return completed or 0
+
+    @staticmethod
+    def counts_toward_certificate(challenge_id):
+        """Whether ``challenge_id`` is a global level on the certificate track."""
+        snapshot = get_campaign_snapshot()
+        index = snapshot.positions.get(challenge_id)
+        if index is None:
+            return False
+        record = snapshot.records[index]
+        return record.created_for_user is None and record.order in required_orders()
+
+    @staticmethod
+    def record_removal(user_id):
+        UserProfile.objects.filter(
+            user_id=user_id, global_levels_completed__gt=0
+        ).update(global_levels_completed=F("global_levels_completed") - 1)
 
     @staticmethod
     def get_or_create_certificate(user):
         required = CertificateService.get_required_challenges()
-        if not CertificateService.is_eligible(user):
-            completed = CertificateService.get_completed_count(user)
+        completed = CertificateService.get_completed_count(user)
+        if completed < required:
             raise ValueError(
                 f"User not eligible. Completed {completed}/{required} challenges."
             )
 
         certificate, created = UserCertificate.objects.get_or_create(
-            user=user,
-            defaults={"completion_count": CertificateService.get_completed_count(user)},
+            user=user, defaults={"completion_count": completed}
         )
 
         if not created:
-            current_count = CertificateService.get_completed_count(user)
-            if current_count != certificate.completion_count:
-                certificate.completion_count = current_count
+            if completed != certificate.completion_count:
+                certificate.completion_count = completed
                 certificate.save(update_fields=["completion_count"])
                 logger.info(
                     "Updated certificate completion count for %s: %s challenges",
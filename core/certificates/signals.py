@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import UserCertificate
+from .rendering import schedule_render
+
+
+@receiver(post_save, sender=UserCertificate)
+def render_certificate_image(sender, instance, **kwargs):
+    """Re-render after commit; the task skips it if nothing drawn changed."""
+    _ = sender, kwargs
+    schedule_render(instance)
@@ -0,0 +1,60 @@
+import logging
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+
+from .models import UserCertificate
+from .rendering import ensure_rendered
+from .services import CertificateService
+
+logger = logging.getLogger(__name__)
+RERENDER_BATCH_SIZE = 100
+
+
+@shared_task
+def issue_certificate_task(user_id):
+    """Issue (or refresh) a certificate once the user completes the track."""
+    User = get_user_model()
+    try:
+        user = User.objects.get(pk=user_id)
+        certificate = CertificateService.get_or_create_certificate(user)
+    except User.DoesNotExist:
+        logger.warning("User %s not found for certificate task", user_id)
+        return {"status": "user_not_found", "user_id": user_id}
+    except ValueError as e:
+        # The track changed between completion and this task.
+        logger.warning("Certificate generation failed for user %s: %s", user_id, e)
+        return {"status": "not_eligible", "user_id": user_id}
+
+    return {"status": "issued", "certificate_id": str(certificate.certificate_id)}
+
+
+@shared_task
+def render_certificate_task(certificate_pk):
+    certificate = (
+        UserCertificate.objects.select_related("user").filter(pk=certificate_pk).first()
+    )
+    if certificate is None:
+        return {"status": "not_found", "certificate_pk": certificate_pk}
+    rendered = ensure_rendered(certificate)
+    return {"status": "rendered" if rendered else "unchanged"}
+
+
+@shared_task
+def rerender_certificates_task(after_pk=0, batch_size=RERENDER_BATCH_SIZE, chain=True):
+    """
+    Brings one batch of certificates up to date with the current template,
+    then queues the next batch. Certificates that are already current cost
+    only a digest comparison.
+    """
+    batch = list(
+        UserCertificate.objects.select_related("user")
+        .filter(pk__gt=after_pk)
+        .order_by("pk")[:batch_size]
+    )
+    rendered = sum(ensure_rendered(certificate) for certificate in batch)
+    last_pk = batch[-1].pk if batch else after_pk
+    if chain and len(batch) == batch_size:
+        rerender_certificates_task.delay(last_pk, batch_size)
+    logger.info("Re-rendered %s of %s certificates", rendered, len(batch))
+    return {"checked": len(batch), "rendered": rendered, "last_pk": last_pk}
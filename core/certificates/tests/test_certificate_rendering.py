@@ -0,0 +1,161 @@
+import secrets
+from pathlib import PurePosixPath
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.storage import InMemoryStorage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from certificates import rendering
+from certificates.models import UserCertificate
+from certificates.tasks import rerender_certificates_task
+
+IN_MEMORY_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+class RenamingStorage(InMemoryStorage):
+    """Saves like Cloudinary: a random suffix and no extension."""
+
+    def _save(self, name, content):
+        path = PurePosixPath(name)
+        renamed = f"media/{path.parent}/{path.stem}_{secrets.token_hex(3)}"
+        return super()._save(renamed, content)
+
+
+RENAMING_STORAGES = {
+    **IN_MEMORY_STORAGES,
+    "default": {
+        "BACKEND": "certificates.tests.test_certificate_rendering.RenamingStorage"
+    },
+}
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class CertificateRenderingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="ada", password="pw")
+
+    def issue(self, user=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            certificate = UserCertificate.objects.create(
+                user=user or self.user, completion_count=60
+            )
+        certificate.refresh_from_db()
+        return certificate
+
+    def test_new_certificate_is_rendered_under_its_digest(self):
+        certificate = self.issue()
+
+        digest = rendering.render_digest(rendering.render_inputs(certificate))
+        self.assertEqual(certificate.image_digest, digest)
+        self.assertEqual(
+            certificate.certificate_image.name, f"certificates/{digest}.png"
+        )
+        with certificate.certificate_image.open("rb") as image:
+            self.assertEqual(image.read(8), b"\x89PNG\r\n\x1a\n")
+
+    def test_unchanged_inputs_are_not_rendered_again(self):
+        certificate = self.issue()
+
+        with patch.object(rendering, "render_png") as render_png:
+            with self.captureOnCommitCallbacks(execute=True):
+                certificate.is_valid = False
+                certificate.save()
+        render_png.assert_not_called()
+
+    def test_changed_inputs_produce_a_new_image(self):
+        certificate = self.issue()
+        old_name = certificate.certificate_image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            certificate.completion_count = 61
+            certificate.save(update_fields=["completion_count"])
+        certificate.refresh_from_db()
+
+        self.assertNotEqual(certificate.certificate_image.name, old_name)
+
+    def test_template_change_rerenders_in_batches(self):
+        certificates = [
+            self.issue(User.objects.create_user(username=f"u{i}", password="pw"))
+            for i in range(3)
+        ]
+
+        with patch.object(
+            rendering, "TEMPLATE_VERSION", rendering.TEMPLATE_VERSION + 1
+        ):
+            result = rerender_certificates_task.run(0, batch_size=2)
+            self.assertEqual(result["rendered"], 2)
+            # The next batch was queued (and run eagerly) by the first one.
+            self.assertEqual(rerender_certificates_task.run(0, 2)["rendered"], 0)
+
+        for certificate in certificates:
+            old_name = certificate.certificate_image.name
+            certificate.refresh_from_db()
+            self.assertNotEqual(certificate.certificate_image.name, old_name)
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class CertificateImageEndpointTests(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="ada", password="pw")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.certificate = UserCertificate.objects.create(
+                user=user, completion_count=60
+            )
+        self.certificate.refresh_from_db()
+        self.digest = rendering.image_digest(self.certificate)
+
+    def image_url(self, digest):
+        return reverse(
+            "certificate-image",
+            kwargs={
+                "certificate_id": str(self.certificate.certificate_id),
+                "digest": digest,
+            },
+        )
+
+    def test_verify_links_an_immutable_image(self):
+        response = self.client.get(
+            reverse(
+                "certificate-verify",
+                kwargs={"certificate_id": str(self.certificate.certificate_id)},
+            )
+        )
+        image_url = response.data["certificate"]["image_url"]
+        self.assertTrue(image_url.endswith(self.image_url(self.digest)))
+
+        response = self.client.get(self.image_url(self.digest))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertIn("immutable", response["Cache-Control"])
+
+        response = self.client.get(
+            self.image_url(self.digest), HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_stale_digest_redirects_to_current_image(self):
+        response = self.client.get(self.image_url("0" * 32))
+
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(response["Location"], self.image_url(self.digest))
+
+
+@override_settings(STORAGES=RENAMING_STORAGES)
+class RenamingStorageTests(CertificateImageEndpointTests):
+    """The storage picks the file name; the digest must not depend on it."""
+
+    def test_renamed_image_is_linked_and_not_rendered_again(self):
+        digest = rendering.render_digest(rendering.render_inputs(self.certificate))
+        self.assertEqual(self.digest, digest)
+        self.assertNotIn(digest + ".png", self.certificate.certificate_image.name)
+
+        with patch.object(rendering, "render_png") as render_png:
+            self.assertFalse(rendering.ensure_rendered(self.certificate))
+        render_png.assert_not_called()
@@ -1,11 +1,14 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
 from unittest.mock import patch, MagicMock
 from challenges.models import Challenge, UserProgress
 from certificates.models import UserCertificate
 from certificates.services import CertificateService
+from certificates.tests.test_certificate_rendering import IN_MEMORY_STORAGES
+from challenges.campaign import get_campaign_snapshot
 
 
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
 class CertificateServiceTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -94,3 +97,61 @@ class CertificateServiceTest(TestCase):
         self.assertEqual(status["remaining_challenges"], 3)
         self.assertFalse(status["eligible"])
         self.assertFalse(status["has_certificate"])
+
+    @patch("certificates.services.LEVELS", [{"order": i} for i in range(1, 4)])
+    def test_completion_counter_is_maintained_by_signals(self):
+        challenges = [
+            Challenge.objects.create(order=i, title=f"C{i}", slug=f"c{i}")
+            for i in range(1, 5)
+        ]
+        progress = UserProgress.objects.create(
+            user=self.user, challenge=challenges[0], status=UserProgress.Status.LOCKED
+        )
+        progress.status = UserProgress.Status.COMPLETED
+        progress.save()
+        # Re-saving a completed level and finishing an off-track level do not count.
+        progress.save()
+        UserProgress.objects.create(
+            user=self.user,
+            challenge=challenges[3],
+            status=UserProgress.Status.COMPLETED,
+        )
+        self.assertEqual(CertificateService.get_completed_count(self.user), 1)
+
+        progress.delete()
+        self.assertEqual(CertificateService.get_completed_count(self.user), 0)
+
+    @patch("certificates.services.LEVELS", [{"order": i} for i in range(1, 4)])
+    def test_completion_is_counted_on_save_and_issues_when_done(self):
+        challenges = [
+            Challenge.objects.create(order=i, title=f"C{i}", slug=f"c{i}")
+            for i in range(1, 4)
+        ]
+        UserProgress.objects.create(
+            user=self.user,
+            challenge=challenges[0],
+            status=UserProgress.Status.COMPLETED,
+        )
+        get_campaign_snapshot()
+
+        def complete(challenge):
+            UserProgress.objects.create(
+                user=self.user,
+                challenge=challenge,
+                status=UserProgress.Status.COMPLETED,
+            )
+
+        # One UPDATE and one read-back of the counters, then the INSERT; the
+        # receivers only read the totals.
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertNumQueries(3):
+                complete(challenges[1])
+        self.assertEqual(callbacks, [])
+
+        # Finishing the track issues the certificate.
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(3):
+                complete(challenges[2])
+        self.assertEqual(
+            UserCertificate.objects.get(user=self.user).completion_count, 3
+        )
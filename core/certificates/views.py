@@ -1,12 +1,16 @@
 import logging
 
-from django.shortcuts import get_object_or_404
+from django.core.exceptions import ValidationError
+from django.http import FileResponse, HttpResponseNotModified
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import reverse
 from rest_framework import decorators, status, viewsets, serializers
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema, OpenApiTypes, inline_serializer
 
 from .models import UserCertificate
+from .rendering import IMAGE_CACHE_SECONDS, image_digest
 from .serializers import UserCertificateSerializer
 from .services import CertificateService
 
@@ -114,6 +118,62 @@ class CertificateViewSet(viewsets.ViewSet):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
+    @extend_schema(
+        responses={
+            (200, "image/png"): OpenApiTypes.BINARY,
+            302: None,
+            304: None,
+            404: OpenApiTypes.OBJECT,
+        },
+        description=(
+            "Rendered certificate image. The URL embeds the image digest, so "
+            "responses are cacheable forever; stale digests redirect to the "
+            "current image."
+        ),
+    )
+    @decorators.action(
+        detail=False,
+        methods=["get"],
+        url_path="verify/(?P<certificate_id>[^/.]+)/image/(?P<digest>[0-9a-f]+)",
+        permission_classes=[AllowAny],
+    )
+    def image(self, request, certificate_id=None, digest=None):
+        try:
+            certificate = (
+                UserCertificate.objects.only(
+                    "certificate_id", "certificate_image", "image_digest"
+                )
+                .filter(certificate_id=certificate_id)
+                .first()
+            )
+        except ValidationError:
+            certificate = None
+        current = image_digest(certificate) if certificate else None
+        if current is None:
+            return Response(
+                {"error": "Certificate image not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        if digest != current:
+            # Re-rendered since this link was shared.
+            return redirect(
+                reverse(
+                    "certificate-image",
+                    kwargs={"certificate_id": certificate_id, "digest": current},
+                )
+            )
+
+        etag = f'"{current}"'
+        if request.headers.get("If-None-Match") == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(
+                certificate.certificate_image.open("rb"), content_type="image/png"
+            )
+        response["ETag"] = etag
+        response["Cache-Control"] = f"public, max-age={IMAGE_CACHE_SECONDS}, immutable"
+        return response
+
     @extend_schema(
         responses={200: OpenApiTypes.OBJECT},
         description="Check if the authenticated user is eligible for a certificate.",
@@ -0,0 +1,269 @@
+"""
+Campaign map served from a process-local catalog snapshot.
+
+The ordered catalog of global challenges rarely changes, so each process
+keeps an immutable snapshot of lightweight records (no description/code text)
+and reloads it only when the shared version token in the cache changes.
+Personalized challenges are not part of it: each user's own are cached per
+user and merged in on read. Per-user progress is a compact bitmap indexed by
+snapshot position and cached per user, so listing the map normally needs no
+database queries at all.
+"""
+
+import heapq
+import threading
+from dataclasses import dataclass, field
+from uuid import uuid4
+
+from django.core.cache import cache
+from drf_spectacular.utils import inline_serializer
+from rest_framework import serializers
+
+from .models import Challenge, UserProgress
+from .serializers import CHALLENGE_MAP_FIELDS
+
+CAMPAIGN_VERSION_KEY = "campaign_map:version"
+PROGRESS_CACHE_TIMEOUT = 60 * 60 * 24
+PERSONAL_CACHE_TIMEOUT = 60 * 60 * 24
+# Staff see every user's personalized challenges.
+ALL_PERSONAL_KEY = "campaign_personal:all"
+# Each global challenge gets a 2-bit cell in the progress bitmap, indexed by
+# its snapshot position: 0 = not completed, 1-3 = completed with that many
+# stars.
+PROGRESS_CELL_BITS = 2
+PROGRESS_CELL_MASK = (1 << PROGRESS_CELL_BITS) - 1
+
+
+@dataclass(frozen=True)
+class ChallengeRecord:
+    id: int
+    title: str
+    slug: str
+    order: int
+    xp_reward: int
+    time_limit: int
+    target_time_seconds: int
+    created_for_user: int | None
+
+
+@dataclass(frozen=True)
+class CampaignSnapshot:
+    version: str
+    records: tuple[ChallengeRecord, ...]
+    # Challenge id -> index in ``records``, precomputed for next-level lookups.
+    positions: dict[int, int]
+
+
+@dataclass(frozen=True)
+class CampaignProgress:
+    """A user's completions against one snapshot version."""
+
+    version: str
+    bitmap: int = 0
+    # Stars for completed challenges outside the snapshot (personalized).
+    extra: dict[int, int] = field(default_factory=dict)
+
+    def stars(self, snapshot: CampaignSnapshot, challenge_id: int) -> int:
+        """Stars for a completed challenge, or 0 when it is not completed."""
+        position = snapshot.positions.get(challenge_id)
+        if position is None:
+            return self.extra.get(challenge_id, 0)
+        return (self.bitmap >> (position * PROGRESS_CELL_BITS)) & PROGRESS_CELL_MASK
+
+
+_snapshot: CampaignSnapshot | None = None
+_snapshot_lock = threading.Lock()
+
+
+def _progress_key(user_id: int) -> str:
+    return f"campaign_progress:{user_id}"
+
+
+def _personal_key(user_id: int) -> str:
+    return f"campaign_personal:{user_id}"
+
+
+def _current_version() -> str:
+    version = cache.get(CAMPAIGN_VERSION_KEY)
+    if version is None:
+        cache.add(CAMPAIGN_VERSION_KEY, uuid4().hex, timeout=None)
+        version = cache.get(CAMPAIGN_VERSION_KEY)
+    return version
+
+
+def invalidate_campaign_map() -> None:
+    """
+    Publishes a new catalog version; every process reloads on its next read.
+    """
+    cache.set(CAMPAIGN_VERSION_KEY, uuid4().hex, timeout=None)
+
+
+def _load_records(challenges) -> tuple[ChallengeRecord, ...]:
+    challenges = challenges.only(*CHALLENGE_MAP_FIELDS).order_by("order", "id")
+    return tuple(
+        ChallengeRecord(
+            id=challenge.id,
+            title=challenge.title,
+            slug=challenge.slug,
+            order=challenge.order,
+            xp_reward=challenge.xp_reward,
+            time_limit=challenge.time_limit,
+            target_time_seconds=challenge.target_time_seconds,
+            created_for_user=challenge.created_for_user_id,
+        )
+        for challenge in challenges
+    )
+
+
+def _load_snapshot(version: str) -> CampaignSnapshot:
+    records = _load_records(Challenge.objects.filter(created_for_user__isnull=True))
+    return CampaignSnapshot(
+        version=version,
+        records=records,
+        positions={record.id: index for index, record in enumerate(records)},
+    )
+
+
+def get_campaign_snapshot() -> CampaignSnapshot:
+    global _snapshot
+    version = _current_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = _load_snapshot(version)
+        return _snapshot
+
+
+def invalidate_personal_challenges(user_id: int | None) -> None:
+    cache.delete_many(
+        [ALL_PERSONAL_KEY] + ([_personal_key(user_id)] if user_id else [])
+    )
+
+
+def get_personal_records(user) -> tuple[ChallengeRecord, ...]:
+    """
+    The personalized challenges ``user`` can see (every user's for staff),
+    loaded with one query on a cache miss.
+    """
+    key = ALL_PERSONAL_KEY if user.is_staff else _personal_key(user.id)
+    records = cache.get(key)
+    if records is None:
+        challenges = Challenge.objects.filter(created_for_user__isnull=False)
+        if not user.is_staff:
+            challenges = challenges.filter(created_for_user=user.id)
+        records = _load_records(challenges)
+        cache.set(key, records, timeout=PERSONAL_CACHE_TIMEOUT)
+    return records
+
+
+def visible_records(user, snapshot: CampaignSnapshot):
+    """Every level ``user`` can see, in campaign order."""
+    # Skip rows that have since become global and are in the snapshot.
+    personal = [
+        record
+        for record in get_personal_records(user)
+        if record.id not in snapshot.positions
+    ]
+    return heapq.merge(
+        snapshot.records, personal, key=lambda record: (record.order, record.id)
+    )
+
+
+def next_level_slug(challenge, user) -> str | None:
+    """
+    Slug of the first level after ``challenge`` that ``user`` can see, read
+    from the snapshot and cached personal levels instead of the database.
+    """
+    for record in visible_records(user, get_campaign_snapshot()):
+        if record.order > challenge.order:
+            return record.slug
+    return None
+
+
+def invalidate_user_progress(user_id: int) -> None:
+    cache.delete(_progress_key(user_id))
+
+
+def get_progress(user_id: int, snapshot: CampaignSnapshot) -> CampaignProgress:
+    """
+    Returns the user's completions for ``snapshot``, building them with a
+    single query on a cache miss or after the catalog changed.
+    """
+    key = _progress_key(user_id)
+    progress = cache.get(key)
+    if isinstance(progress, CampaignProgress) and progress.version == snapshot.version:
+        return progress
+
+    bitmap, extra = 0, {}
+    completed = UserProgress.objects.filter(
+        user_id=user_id, status=UserProgress.Status.COMPLETED
+    ).values_list("challenge_id", "stars")
+    for challenge_id, stars in completed:
+        cell = min(max(stars, 1), PROGRESS_CELL_MASK)
+        position = snapshot.positions.get(challenge_id)
+        if position is None:
+            extra[challenge_id] = cell
+        else:
+            bitmap |= cell << (position * PROGRESS_CELL_BITS)
+    progress = CampaignProgress(snapshot.version, bitmap, extra)
+    cache.set(key, progress, timeout=PROGRESS_CACHE_TIMEOUT)
+    return progress
+
+
+# Schema of the ``build_campaign_map`` rows; keep the two in step.
+CAMPAIGN_MAP_SCHEMA = inline_serializer(
+    name="CampaignMapEntry",
+    fields={
+        "id": serializers.IntegerField(),
+        "title": serializers.CharField(),
+        "slug": serializers.SlugField(),
+        "order": serializers.IntegerField(),
+        "xp_reward": serializers.IntegerField(),
+        "time_limit": serializers.IntegerField(),
+        "target_time_seconds": serializers.IntegerField(),
+        "created_for_user": serializers.IntegerField(allow_null=True),
+        "status": serializers.ChoiceField(choices=UserProgress.Status.choices),
+        "stars": serializers.IntegerField(),
+    },
+    many=True,
+)
+
+
+def build_campaign_map(user) -> list[dict[str, object]]:
+    """
+    The campaign map for ``user`` with per-level status and stars.
+    The next level is unlocked only once the previous one is completed.
+    """
+    snapshot = get_campaign_snapshot()
+    progress = get_progress(user.id, snapshot)
+
+    data = []
+    previous_completed = True  # Level 1 is always unlocked
+    for record in visible_records(user, snapshot):
+        stars = progress.stars(snapshot, record.id)
+        if stars:
+            status = UserProgress.Status.COMPLETED
+        elif previous_completed:
+            status = UserProgress.Status.UNLOCKED
+        else:
+            status = UserProgress.Status.LOCKED
+
+        data.append(
+            {
+                "id": record.id,
+                "title": record.title,
+                "slug": record.slug,
+                "order": record.order,
+                "xp_reward": record.xp_reward,
+                "time_limit": record.time_limit,
+                "target_time_seconds": record.target_time_seconds,
+                "created_for_user": record.created_for_user,
+                "status": status,
+                "stars": stars,
+            }
+        )
+        previous_completed = bool(stars)
+    return data
@@ -0,0 +1,129 @@
+"""
+Django Management Command: Benchmark Challenge List
+Compares the legacy full-row challenge listing with the campaign map on a
+throwaway fixture (rolled back afterwards).
+"""
+
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from challenges.campaign import build_campaign_map, invalidate_campaign_map
+from challenges.models import Challenge, UserProgress
+from challenges.serializers import ChallengePublicSerializer
+
+DESCRIPTION_TEXT = "Solve the puzzle described below. " * 60
+INITIAL_CODE_TEXT = "def solve(data):\n    # TODO\n    pass\n" * 8
+TEST_CODE_TEXT = "assert solve([1, 2, 3]) == 6\n" * 40
+
+
+class _Rollback(Exception):
+    pass
+
+
+def legacy_list(user) -> list[dict[str, object]]:
+    """The pre-snapshot listing: every column, one serializer per item."""
+    progress_map = {p.challenge_id: p for p in UserProgress.objects.filter(user=user)}
+    data = []
+    previous_completed = True
+    for challenge in Challenge.objects.all().order_by("order"):
+        progress = progress_map.get(challenge.id)
+        status = progress.status if progress else UserProgress.Status.LOCKED
+        if status == UserProgress.Status.LOCKED and previous_completed:
+            status = UserProgress.Status.UNLOCKED
+        item = ChallengePublicSerializer(challenge).data
+        item["status"] = status
+        item["stars"] = progress.stars if progress else 0
+        data.append(item)
+        previous_completed = status == UserProgress.Status.COMPLETED
+    return data
+
+
+def measure(build) -> dict[str, float]:
+    with CaptureQueriesContext(connection) as queries:
+        started = perf_counter()
+        data = build()
+        total_ms = (perf_counter() - started) * 1000
+    query_ms = sum(float(query["time"]) for query in queries.captured_queries) * 1000
+    return {
+        "queries": len(queries.captured_queries),
+        "query_ms": query_ms,
+        "serialize_ms": max(total_ms - query_ms, 0.0),
+        "bytes": len(JSONRenderer().render(data)),
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark the challenge list payload against the legacy listing"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=1000,
+            help="Number of challenges in the fixture",
+        )
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        results = {}
+
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    username="benchmark-user", email="benchmark@example.com"
+                )
+                challenges = Challenge.objects.bulk_create(
+                    Challenge(
+                        title=f"Benchmark Level {order}",
+                        slug=f"benchmark-level-{order}",
+                        order=order,
+                        description=DESCRIPTION_TEXT,
+                        initial_code=INITIAL_CODE_TEXT,
+                        test_code=TEST_CODE_TEXT,
+                    )
+                    for order in range(1, count + 1)
+                )
+                UserProgress.objects.bulk_create(
+                    UserProgress(
+                        user=user,
+                        challenge=challenge,
+                        status=UserProgress.Status.COMPLETED,
+                        stars=3,
+                    )
+                    for challenge in challenges[: count // 2]
+                )
+                invalidate_campaign_map()
+
+                results["legacy"] = measure(lambda: legacy_list(user))
+                results["map (cold)"] = measure(lambda: build_campaign_map(user))
+                results["map (warm)"] = measure(lambda: build_campaign_map(user))
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            invalidate_campaign_map()
+
+        self.stdout.write(
+            self.style.HTTP_INFO(f"Challenge list benchmark ({count} challenges)")
+        )
+        self.stdout.write(
+            f"{'variant':<12} {'queries':>7} {'query ms':>9} {'serialize ms':>12} {'bytes':>10}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<12} {result['queries']:>7} {result['query_ms']:>9.1f} "
+                f"{result['serialize_ms']:>12.1f} {result['bytes']:>10}"
+            )
+
+        legacy_bytes = results["legacy"]["bytes"]
+        map_bytes = results["map (warm)"]["bytes"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ Payload reduced {legacy_bytes / max(map_bytes, 1):.1f}x"
+            )
+        )
@@ -1,16 +1,90 @@
 """
 Django Management Command: Load Levels
-Loads global challenges from levels.py into the database.
+Syncs global challenges from levels.py into the database.
+
+The sync is diff-based: all global challenges are read in one query, compared
+by content hash, and written back with one bulk_create / bulk_update / delete
+each, so deploys stay fast as the level set grows.
 """
 
+import json
+from hashlib import sha256
+
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.utils import timezone
 from challenges.models import Challenge
 from challenges.levels import LEVELS
+from challenges.signals import challenge_content_changed
+
+SYNCED_FIELDS = [
+    "title",
+    "slug",
+    "description",
+    "initial_code",
+    "test_code",
+    "xp_reward",
+    "target_time_seconds",
+]
+BULK_BATCH_SIZE = 500
+
+
+def content_hash(values: dict) -> str:
+    payload = json.dumps(
+        {field: values[field] for field in SYNCED_FIELDS}, sort_keys=True
+    )
+    return sha256(payload.encode("utf-8")).hexdigest()
+
+
+def diff_levels(levels, existing):
+    """
+    Compares level definitions with existing global challenges.
+    Returns ``(to_create, to_update, to_delete)``; updated challenges carry
+    the new field values, ``to_update`` pairs each with its changed fields.
+    """
+    canonical = {}
+    to_delete = []
+    for challenge in sorted(existing, key=lambda c: c.pk):
+        if challenge.order in canonical:
+            # Keep one canonical row per global order.
+            to_delete.append(challenge)
+        else:
+            canonical[challenge.order] = challenge
+
+    to_create, to_update = [], []
+    target_orders = set()
+    for level_data in levels:
+        order = level_data["order"]
+        target_orders.add(order)
+        challenge = canonical.get(order)
+        if challenge is None:
+            to_create.append(
+                Challenge(
+                    created_for_user=None,
+                    order=order,
+                    **{field: level_data[field] for field in SYNCED_FIELDS},
+                )
+            )
+            continue
+
+        current = {field: getattr(challenge, field) for field in SYNCED_FIELDS}
+        if content_hash(current) == content_hash(level_data):
+            continue
+        changed = [f for f in SYNCED_FIELDS if current[f] != level_data[f]]
+        for field in changed:
+            setattr(challenge, field, level_data[field])
+        to_update.append((challenge, changed))
+
+    to_delete.extend(
+        challenge
+        for order, challenge in canonical.items()
+        if order not in target_orders
+    )
+    return to_create, to_update, to_delete
 
 
 class Command(BaseCommand):
-    help = "Load levels from levels.py into the database"
+    help = "Sync levels from levels.py into the database"
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -18,91 +92,98 @@ class Command(BaseCommand):
             action="store_true",
             help="Clear existing global challenges before loading",
         )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the diff without writing anything",
+        )
 
     def handle(self, *args, **options):
-        target_orders = {level_data["order"] for level_data in LEVELS}
+        dry_run = options["dry_run"]
+        global_qs = Challenge.objects.filter(created_for_user__isnull=True)
 
-        if options["clear"]:
+        if options["clear"] and not dry_run:
             self.stdout.write(
                 self.style.WARNING("Clearing existing global challenges...")
             )
-            deleted = Challenge.objects.filter(created_for_user__isnull=True).delete()
+            deleted = global_qs.delete()
             self.stdout.write(
                 self.style.SUCCESS(f"  ✓ Deleted {deleted[0]} challenges")
             )
-        else:
-            stale_qs = Challenge.objects.filter(created_for_user__isnull=True).exclude(
-                order__in=target_orders
-            )
-            stale_count = stale_qs.count()
-            if stale_count:
-                stale_qs.delete()
-                self.stdout.write(
-                    self.style.WARNING(
-                        f"Removed {stale_count} stale global challenges not present in levels.py"
-                    )
-                )
 
-        self.stdout.write(self.style.HTTP_INFO(f"Loading {len(LEVELS)} levels..."))
+        self.stdout.write(self.style.HTTP_INFO(f"Syncing {len(LEVELS)} levels..."))
 
-        created_count = 0
-        updated_count = 0
+        existing = [] if options["clear"] else list(global_qs)
+        to_create, to_update, to_delete = diff_levels(LEVELS, existing)
 
-        with transaction.atomic():
-            for level_data in LEVELS:
-                order = level_data["order"]
-                existing_qs = Challenge.objects.filter(
-                    created_for_user__isnull=True,
-                    order=order,
+        for challenge in to_create:
+            self.stdout.write(self.style.SUCCESS(f"  + Create: {challenge.title}"))
+        for challenge, changed in to_update:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"  ↻ Update: {challenge.title} ({', '.join(changed)})"
+                )
+            )
+        for challenge in to_delete:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"  - Delete: {challenge.title} (order {challenge.order})"
                 )
-                challenge = existing_qs.first()
-                created = challenge is None
-
-                if created:
-                    challenge = Challenge(created_for_user=None, order=order)
-                else:
-                    # Keep one canonical row per global order.
-                    duplicate_qs = existing_qs.exclude(pk=challenge.pk)
-                    if duplicate_qs.exists():
-                        removed = duplicate_qs.count()
-                        duplicate_qs.delete()
-                        self.stdout.write(
-                            self.style.WARNING(
-                                f"  ! Removed {removed} duplicate row(s) for order {order}"
-                            )
-                        )
-
-                challenge.title = level_data["title"]
-                challenge.slug = level_data["slug"]
-                challenge.description = level_data["description"]
-                challenge.initial_code = level_data["initial_code"]
-                challenge.test_code = level_data["test_code"]
-                challenge.xp_reward = level_data["xp_reward"]
-                challenge.target_time_seconds = level_data["target_time_seconds"]
-                challenge.created_for_user = None
-                challenge.save()
-
-                if created:
-                    created_count += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(f"  ✓ Created: {challenge.title}")
-                    )
-                else:
-                    updated_count += 1
-                    self.stdout.write(
-                        self.style.WARNING(f"  ↻ Updated: {challenge.title}")
-                    )
+            )
+
+        if dry_run:
+            self.stdout.write(self.style.HTTP_INFO("Dry run: no changes written."))
+        elif to_create or to_update or to_delete:
+            self._apply(to_create, to_update, to_delete)
 
         self.stdout.write("")
         self.stdout.write(self.style.SUCCESS("=" * 50))
-        self.stdout.write(self.style.SUCCESS("✓ Levels Loading Complete!"))
+        self.stdout.write(self.style.SUCCESS("✓ Levels Sync Complete!"))
         self.stdout.write(
-            self.style.SUCCESS(f"  - Created: {created_count} challenges")
+            self.style.SUCCESS(f"  - Created: {len(to_create)} challenges")
         )
         self.stdout.write(
-            self.style.SUCCESS(f"  - Updated: {updated_count} challenges")
+            self.style.SUCCESS(f"  - Updated: {len(to_update)} challenges")
         )
         self.stdout.write(
-            self.style.SUCCESS(f"  - Total: {created_count + updated_count} challenges")
+            self.style.SUCCESS(f"  - Deleted: {len(to_delete)} challenges")
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"  - Unchanged: {len(LEVELS) - len(to_create) - len(to_update)} challenges"
+            )
         )
         self.stdout.write(self.style.SUCCESS("=" * 50))
+
+    def _apply(self, to_create, to_update, to_delete):
+        changed_fields = sorted({field for _, fields in to_update for field in fields})
+        # bulk_update bypasses auto_now, so stamp updated_at explicitly.
+        now = timezone.now()
+        for challenge, _ in to_update:
+            challenge.updated_at = now
+        deleted_ids = [challenge.pk for challenge in to_delete]
+
+        with transaction.atomic():
+            if deleted_ids:
+                Challenge.objects.filter(pk__in=deleted_ids).delete()
+            if to_update:
+                Challenge.objects.bulk_update(
+                    [challenge for challenge, _ in to_update],
+                    [*changed_fields, "updated_at"],
+                    batch_size=BULK_BATCH_SIZE,
+                )
+            created = Challenge.objects.bulk_create(
+                to_create, batch_size=BULK_BATCH_SIZE
+            )
+
+            # Bulk writes skip model signals; announce the change once.
+            changed_ids = [
+                *deleted_ids,
+                *(challenge.pk for challenge, _ in to_update),
+                *(challenge.pk for challenge in created),
+            ]
+            transaction.on_commit(
+                lambda: challenge_content_changed.send(
+                    sender=Challenge, challenge_ids=changed_ids
+                )
+            )
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 
 
@@ -92,6 +92,34 @@ class UserProgress(models.Model):
             models.Index(fields=["challenge", "status"]),
         ]
 
+    # Status as last read from or written to the database; None for new rows.
+    _stored_status = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_status = instance.__dict__.get("status")
+        return instance
+
+    def save(self, *args, **kwargs):
+        # A first completion is counted on the profile in the same transaction
+        # as the row; post_save receivers read the new totals from
+        # ``completion_totals`` (None for any other save).
+        self.first_completion = (
+            self.status == self.Status.COMPLETED
+            and self._stored_status != self.Status.COMPLETED
+        )
+        self.completion_totals = None
+        if self.first_completion:
+            from .services import ChallengeService
+
+            with transaction.atomic(savepoint=False):
+                self.completion_totals = ChallengeService.record_completion(self)
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+        self._stored_status = self.status
+
     def __str__(self):
         return (
             f"Progress: {self.user.username} - {self.challenge.title} ({self.status})"
@@ -1,6 +1,18 @@
 from rest_framework import serializers
 from .models import Challenge, UserProgress
 
+# Columns the campaign map needs; level text is only served by ``retrieve``.
+CHALLENGE_MAP_FIELDS = [
+    "id",
+    "title",
+    "slug",
+    "order",
+    "xp_reward",
+    "time_limit",
+    "target_time_seconds",
+    "created_for_user",
+]
+
 
 class ChallengePublicSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,5 +1,11 @@
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
-from .models import Challenge, UserProgress
+from .campaign import next_level_slug
+from .models import UserProgress
+from certificates.services import CertificateService
+from learning.leaderboard import LeaderboardService
+from users.models import UserProfile
 from xpoint.services import XPService
 
 
@@ -9,51 +15,6 @@ class ChallengeService:
     Encapsulates logic for progression, locking, hints, and submissions.
     """
 
-    @staticmethod
-    def get_annotated_challenges(user, queryset=None):
-        """
-        Returns a list of challenges annotated with status and stars for the given user.
-        Handles the implicit locking logic (Next level unlocked only if previous is completed).
-        """
-        if queryset is None:
-            queryset = Challenge.objects.all()
-
-        challenges = queryset.order_by("order")
-
-        # optimized: fetch all progress in one query
-        progress_map = {
-            p.challenge_id: p for p in UserProgress.objects.filter(user=user)
-        }
-
-        results = []
-        previous_completed = True  # Level 1 is always unlocked
-
-        for challenge in challenges:
-            p = progress_map.get(challenge.id)
-
-            status = UserProgress.Status.LOCKED
-            stars = 0
-
-            if p:
-                status = p.status
-                stars = p.stars
-
-            # Implicit unlocking logic
-            if status == UserProgress.Status.LOCKED and previous_completed:
-                status = UserProgress.Status.UNLOCKED
-
-            # Prepare data object (similar to what serializer expects)
-            # We preserve the model instance but attach dynamic fields
-            challenge.user_status = status
-            challenge.user_stars = stars
-
-            results.append(challenge)
-
-            # Update flag for next iteration
-            previous_completed = status == UserProgress.Status.COMPLETED
-
-        return results
-
     @staticmethod
     def get_challenge_details(user, challenge):
         """
@@ -75,63 +36,82 @@ class ChallengeService:
             "started_at": progress.started_at,
         }
 
+    @staticmethod
+    def record_completion(progress) -> dict[str, int]:
+        """
+        Counts a first completion on the profile and returns the new counter
+        totals: ``challenges_completed`` and, for certificate-track levels,
+        ``global_levels_completed``. Both move in one UPDATE and are read back
+        in one SELECT. Called by ``UserProgress.save``, which hands the totals
+        to post_save receivers as ``progress.completion_totals``.
+        """
+        counters = ["challenges_completed"]
+        if CertificateService.counts_toward_certificate(progress.challenge_id):
+            counters.append("global_levels_completed")
+        profiles = UserProfile.objects.filter(user_id=progress.user_id)
+        profiles.update(**{counter: F(counter) + 1 for counter in counters})
+        return dict(zip(counters, profiles.values_list(*counters).get()))
+
     @staticmethod
     def process_submission(user, challenge, passed=False):
         """
         Handles success/failure of a code submission.
+
+        Runs as one transaction with a fixed number of queries: the progress
+        row is locked and saved with ``update_fields``, XP is credited with an
+        F-expression and the next level comes from the campaign snapshot.
+        Certificate and achievement checks run on commit.
         """
         if not passed:
             return {"status": "failed"}
 
-        progress, _ = UserProgress.objects.get_or_create(user=user, challenge=challenge)
+        now = timezone.now()
+        xp_earned = 0
+        with transaction.atomic():
+            progress, _ = UserProgress.objects.select_for_update().get_or_create(
+                user=user, challenge=challenge
+            )
+            stars = ChallengeService._calculate_stars(progress, challenge, now)
+            newly_completed = progress.status != UserProgress.Status.COMPLETED
+
+            # Keep the best result on re-submission.
+            if newly_completed or stars > progress.stars:
+                progress.status = UserProgress.Status.COMPLETED
+                progress.completed_at = now
+                progress.stars = max(progress.stars, stars)
+                progress.save(update_fields=["status", "completed_at", "stars"])
+
+                # Award XP only on first completion
+                if newly_completed:
+                    xp_earned = challenge.xp_reward
+                    XPService.award_xp(user, xp_earned, source="challenge_completion")
+                    LeaderboardService.record_completion(user)
 
-        # Calculate Stars based on AI hints and completion time
-        # 3 Stars: No AI hints + fast completion
-        # 2 Stars: 1 AI hint OR moderate time
-        # 1 Star: 2+ AI hints OR very slow
-
-        stars = 3
+        return {
+            "status": "completed" if newly_completed else "already_completed",
+            "xp_earned": xp_earned,
+            "stars": stars,
+            "next_level_slug": next_level_slug(challenge, user),
+        }
 
+    @staticmethod
+    def _calculate_stars(progress, challenge, now):
+        """
+        3 Stars: No AI hints + fast completion
+        2 Stars: 1 AI hint OR moderate time
+        1 Star: 2+ AI hints OR very slow
+        """
         # Penalty for AI hints (-1 star per hint)
-        stars -= progress.ai_hints_purchased
+        stars = 3 - progress.ai_hints_purchased
 
-        # Penalty for slow completion time
+        # Lose 1 star if it took more than 2x the target time
         if progress.started_at:
-            completion_time = (timezone.now() - progress.started_at).total_seconds()
-            # Lose 1 star if took more than 2x target time
+            completion_time = (now - progress.started_at).total_seconds()
             if completion_time > 2 * challenge.target_time_seconds:
                 stars -= 1
 
         # Ensure minimum 1 star
-        stars = max(1, stars)
-
-        newly_completed = progress.status != UserProgress.Status.COMPLETED
-
-        # Update Progress
-        # If already completed, only update if we got more stars?
-        # Typically we just keep the best result.
-        if newly_completed or stars > progress.stars:
-            progress.status = UserProgress.Status.COMPLETED
-            progress.completed_at = timezone.now()
-            progress.stars = max(progress.stars, stars)
-            progress.save()
-
-            # Award XP only on first completion
-            if newly_completed:
-                xp_earned = challenge.xp_reward
-                XPService.add_xp(user, xp_earned, source="challenge_completion")
-
-        next_slug = ChallengeService._get_next_level_slug(challenge, user)
-
-        # Certificate generation is handled automatically by signals.
-        # Eligibility threshold comes from the configured global level set.
-
-        return {
-            "status": "completed" if newly_completed else "already_completed",
-            "xp_earned": xp_earned if newly_completed else 0,
-            "stars": stars,
-            "next_level_slug": next_slug,
-        }
+        return max(1, stars)
 
     @staticmethod
     def purchase_ai_assist(user, challenge):
@@ -158,13 +138,3 @@ class ChallengeService:
         progress.save(update_fields=["ai_hints_purchased"])
 
         return remaining_xp
-
-    @staticmethod
-    def _get_next_level_slug(current_challenge, user):
-        """Get the next level slug (all challenges are global now)."""
-        next_challenge = (
-            Challenge.objects.filter(order__gt=current_challenge.order)
-            .order_by("order")
-            .first()
-        )
-        return next_challenge.slug if next_challenge else None
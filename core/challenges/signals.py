@@ -1,10 +1,87 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from .models import UserProgress
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+from .campaign import (
+    invalidate_campaign_map,
+    invalidate_personal_challenges,
+    invalidate_user_progress,
+)
+from .models import Challenge, UserProgress
 from certificates.services import CertificateService
-import logging
+from certificates.tasks import issue_certificate_task
 
-logger = logging.getLogger(__name__)
+
+# Sent with ``challenge_ids`` whenever challenge content changes, including
+# bulk writes that bypass model signals (e.g. ``load_levels``). Receivers drop
+# caches derived from challenge text: the campaign map and AI context.
+# ``owner_ids`` holds the ``created_for_user`` ids before and after the change
+# (None for global levels); senders that omit it are treated as global.
+challenge_content_changed = Signal()
+
+
+@receiver(pre_save, sender=Challenge)
+def remember_challenge_owner(sender, instance, update_fields=None, **kwargs):
+    # A reassigned level must leave its old owner's (or the global) list.
+    _ = sender, kwargs
+    previous = instance.created_for_user_id
+    if not instance._state.adding and (
+        update_fields is None or "created_for_user" in update_fields
+    ):
+        previous = (
+            Challenge.objects.filter(pk=instance.pk)
+            .values_list("created_for_user_id", flat=True)
+            .first()
+        )
+    instance._previous_owner_id = previous
+
+
+@receiver(post_save, sender=Challenge)
+@receiver(post_delete, sender=Challenge)
+def announce_challenge_change(sender, instance, **kwargs):
+    _ = kwargs
+    owner_ids = {
+        instance.created_for_user_id,
+        getattr(instance, "_previous_owner_id", instance.created_for_user_id),
+    }
+    challenge_content_changed.send(
+        sender=sender, challenge_ids=[instance.id], owner_ids=owner_ids
+    )
+
+
+@receiver(challenge_content_changed)
+def refresh_campaign_map(sender, owner_ids=None, **kwargs):
+    """
+    Publish a new catalog snapshot version whenever a global level changes.
+    Personalized levels are not in the snapshot; only their owners' cached
+    lists are dropped.
+    """
+    _ = sender, kwargs
+    owner_ids = set(owner_ids or {None})
+    for owner_id in owner_ids - {None}:
+        invalidate_personal_challenges(owner_id)
+    if None in owner_ids:
+        invalidate_campaign_map()
+        invalidate_personal_challenges(None)
+
+
+@receiver(post_save, sender=UserProgress)
+@receiver(post_delete, sender=UserProgress)
+def refresh_user_progress(sender, instance, **kwargs):
+    """Drop the cached progress bitmap once a completion is recorded."""
+    _ = sender
+    if kwargs.get("signal") is post_delete or (
+        instance.status == UserProgress.Status.COMPLETED
+    ):
+        invalidate_user_progress(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def reset_new_user_progress(sender, instance, created, **kwargs):
+    # A recycled primary key must never inherit another account's bitmap.
+    _ = sender, kwargs
+    if created:
+        invalidate_user_progress(instance.id)
 
 
 @receiver(post_save, sender=UserProgress)
@@ -12,50 +89,26 @@ def auto_generate_certificate(sender, instance, created, **kwargs):
     """
     Automatically generate certificate when user completes all challenges.
 
-    Triggered after UserProgress is saved with COMPLETED status.
+    Reads the certificate-track total that ``UserProgress.save`` counted for
+    a first completion, and queues a certificate task after commit once the
+    track is complete. Runs no queries.
     """
     # Keep signature compatible with Django signal kwargs.
     _ = sender, created, kwargs
 
-    # Only trigger on completion
-    if instance.status != UserProgress.Status.COMPLETED:
-        return
-
-    user = instance.user
-
-    # Check if user is now eligible for certificate
-    if not CertificateService.is_eligible(user):
+    totals = getattr(instance, "completion_totals", None) or {}
+    completed = totals.get("global_levels_completed")
+    if completed is None:
         return
+    if completed >= CertificateService.get_required_challenges():
+        user_id = instance.user_id
+        transaction.on_commit(lambda: issue_certificate_task.delay(user_id))
 
-    # Check if certificate already exists
-    if CertificateService.has_certificate(user):
-        # Update completion count in case user completed more challenges
-        try:
-            certificate = user.certificate
-            current_count = CertificateService.get_completed_count(user)
-            if current_count != certificate.completion_count:
-                certificate.completion_count = current_count
-                certificate.save(update_fields=["completion_count"])
-                logger.info(
-                    f"Auto-updated certificate for {user.username}: "
-                    f"{certificate.completion_count} challenges"
-                )
-        except Exception as e:
-            logger.error(f"Failed to update certificate for {user.username}: {e}")
-        return
 
-    # Generate new certificate
-    try:
-        certificate = CertificateService.get_or_create_certificate(user)
-        logger.info(
-            f"Auto-generated certificate for {user.username} "
-            f"(ID: {certificate.certificate_id})"
-        )
-    except ValueError as e:
-        # User not eligible (shouldn't happen due to check above, but defensive)
-        logger.warning(f"Certificate generation failed for {user.username}: {e}")
-    except Exception as e:
-        logger.error(
-            f"Unexpected error generating certificate for {user.username}: {e}",
-            exc_info=True,
-        )
+@receiver(post_delete, sender=UserProgress)
+def uncount_certificate_progress(sender, instance, **kwargs):
+    _ = sender, kwargs
+    if instance.status == UserProgress.Status.COMPLETED and (
+        CertificateService.counts_toward_certificate(instance.challenge_id)
+    ):
+        CertificateService.record_removal(instance.user_id)
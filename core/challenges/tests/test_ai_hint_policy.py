@@ -60,14 +60,15 @@ class AIHintPolicyTest(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertIn("between 1 and 3", response.data["error"])
 
-    @patch("requests.post")
-    def test_returns_cached_hint_for_same_level(self, mock_post):
+    @patch("learning.tasks.get_ai_session")
+    def test_returns_cached_hint_for_same_level(self, mock_session):
         self.progress.ai_hints_purchased = 1
         self.progress.save(update_fields=["ai_hints_purchased"])
 
         fake_response = MagicMock()
         fake_response.status_code = 200
         fake_response.json.return_value = {"hint": "Focus on the loop invariant."}
+        mock_post = mock_session.return_value.post
         mock_post.return_value = fake_response
 
         first = self.client.post(
@@ -0,0 +1,152 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from challenges.campaign import (
+    CAMPAIGN_MAP_SCHEMA,
+    PROGRESS_CELL_BITS,
+    get_campaign_snapshot,
+    get_progress,
+)
+from challenges.models import Challenge, UserProgress
+
+
+class CampaignMapTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="mapper", email="m@ex.com")
+        self.other = User.objects.create_user(username="other", email="o@ex.com")
+        self.client.force_authenticate(user=self.user)
+        self.levels = [
+            Challenge.objects.create(
+                title=f"Level {order}",
+                slug=f"level-{order}",
+                order=order,
+                description="D" * 1000,
+                initial_code="pass",
+                test_code="assert True",
+            )
+            for order in (1, 2, 3)
+        ]
+        self.url = reverse("challenge-list")
+
+    def test_warm_listing_runs_no_queries(self):
+        self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["slug"] for item in response.data],
+            ["level-1", "level-2", "level-3"],
+        )
+        self.assertNotIn("test_code", response.data[0])
+        self.assertNotIn("description", response.data[0])
+
+    def test_listing_matches_the_documented_entry(self):
+        response = self.client.get(self.url)
+
+        documented = set(CAMPAIGN_MAP_SCHEMA.child.fields)
+        for item in response.data:
+            self.assertEqual(set(item), documented)
+
+    def test_completion_rebuilds_bitmap_with_one_query(self):
+        self.client.get(self.url)
+        UserProgress.objects.create(
+            user=self.user,
+            challenge=self.levels[0],
+            status=UserProgress.Status.COMPLETED,
+            stars=2,
+        )
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        statuses = [(item["status"], item["stars"]) for item in response.data]
+        self.assertEqual(
+            statuses,
+            [
+                (UserProgress.Status.COMPLETED, 2),
+                (UserProgress.Status.UNLOCKED, 0),
+                (UserProgress.Status.LOCKED, 0),
+            ],
+        )
+
+    def test_catalog_change_publishes_new_snapshot(self):
+        before = get_campaign_snapshot()
+        Challenge.objects.create(title="Level 4", slug="level-4", order=4)
+
+        after = get_campaign_snapshot()
+        self.assertNotEqual(before.version, after.version)
+        self.assertEqual(len(after.records), 4)
+        self.assertIs(get_campaign_snapshot(), after)
+
+    def test_personalized_levels_only_visible_to_owner(self):
+        Challenge.objects.create(
+            title="Mine", slug="mine", order=5, created_for_user=self.user
+        )
+        Challenge.objects.create(
+            title="Theirs", slug="theirs", order=6, created_for_user=self.other
+        )
+
+        slugs = [item["slug"] for item in self.client.get(self.url).data]
+        self.assertIn("mine", slugs)
+        self.assertNotIn("theirs", slugs)
+
+    def test_personalized_levels_stay_out_of_the_snapshot(self):
+        before = get_campaign_snapshot()
+        self.client.get(self.url)
+        mine = Challenge.objects.create(
+            title="Mine", slug="mine", order=2, created_for_user=self.user
+        )
+        for index in range(20):
+            Challenge.objects.create(
+                title=f"T{index}",
+                slug=f"t{index}",
+                order=9,
+                created_for_user=self.other,
+            )
+
+        self.assertIs(get_campaign_snapshot(), before)
+        response = self.client.get(self.url)
+        self.assertEqual(
+            [item["slug"] for item in response.data],
+            ["level-1", "level-2", "mine", "level-3"],
+        )
+
+        # The bitmap grows with the global catalog, not with challenge ids.
+        for challenge in (self.levels[2], mine):
+            UserProgress.objects.create(
+                user=self.user,
+                challenge=challenge,
+                status=UserProgress.Status.COMPLETED,
+                stars=3,
+            )
+        progress = get_progress(self.user.id, before)
+        self.assertEqual(progress.bitmap, 3 << (2 * PROGRESS_CELL_BITS))
+        self.assertEqual(progress.stars(before, mine.id), 3)
+
+    def test_reassigned_level_leaves_the_old_owners_map(self):
+        level = Challenge.objects.create(
+            title="Moved", slug="moved", order=5, created_for_user=self.user
+        )
+        self.assertIn(
+            "moved", [item["slug"] for item in self.client.get(self.url).data]
+        )
+
+        level.created_for_user = self.other
+        level.save()
+
+        slugs = [item["slug"] for item in self.client.get(self.url).data]
+        self.assertNotIn("moved", slugs)
+
+    def test_progress_cached_until_completion(self):
+        snapshot = get_campaign_snapshot()
+        self.assertEqual(get_progress(self.user.id, snapshot).bitmap, 0)
+        UserProgress.objects.create(user=self.user, challenge=self.levels[1])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_progress(self.user.id, snapshot).bitmap, 0)
@@ -1,13 +1,18 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
 from challenges.models import Challenge, UserProgress
 from challenges.levels import LEVELS
 from certificates.models import UserCertificate
 from challenges.services import ChallengeService
+from certificates.tests.test_certificate_rendering import IN_MEMORY_STORAGES
 
 
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
 class CertificateFlowTest(TestCase):
     def setUp(self):
+        # On-commit leaderboard updates land in the shared test cache.
+        self.addCleanup(cache.clear)
         self.user = User.objects.create_user(username="testuser", password="password")
         self.total_levels = len(LEVELS)
         # Create global challenges
@@ -43,9 +48,11 @@ class CertificateFlowTest(TestCase):
         # Submit final level.
         final_level = self.challenges[-1]
 
-        result = ChallengeService.process_submission(
-            self.user, final_level, passed=True
-        )
+        # Certificate work runs once the submission commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            result = ChallengeService.process_submission(
+                self.user, final_level, passed=True
+            )
 
         # Check result
         self.assertEqual(result["status"], "completed")
@@ -57,13 +64,14 @@ class CertificateFlowTest(TestCase):
 
     def test_certificate_on_resubmission(self):
         # Complete all challenges first
-        for challenge in self.challenges:
-            UserProgress.objects.create(
-                user=self.user,
-                challenge=challenge,
-                status=UserProgress.Status.COMPLETED,
-                stars=3,
-            )
+        with self.captureOnCommitCallbacks(execute=True):
+            for challenge in self.challenges:
+                UserProgress.objects.create(
+                    user=self.user,
+                    challenge=challenge,
+                    status=UserProgress.Status.COMPLETED,
+                    stars=3,
+                )
 
         final_level = self.challenges[-1]
 
@@ -87,9 +95,10 @@ class CertificateFlowTest(TestCase):
 
         # Submit penultimate level.
         penultimate_level = self.challenges[-2]
-        result = ChallengeService.process_submission(
-            self.user, penultimate_level, passed=True
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            result = ChallengeService.process_submission(
+                self.user, penultimate_level, passed=True
+            )
 
         self.assertEqual(result["status"], "completed")
         self.assertFalse(UserCertificate.objects.filter(user=self.user).exists())
@@ -0,0 +1,18 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from challenges.models import Challenge
+
+
+class ChallengeListBenchmarkTests(TestCase):
+    def test_benchmark_reports_smaller_payload_and_rolls_back(self):
+        out = StringIO()
+        call_command("benchmark_challenge_list", count=50, stdout=out)
+
+        report = out.getvalue()
+        self.assertIn("legacy", report)
+        self.assertIn("map (warm)", report)
+        self.assertIn("Payload reduced", report)
+        self.assertFalse(Challenge.objects.exists())
@@ -0,0 +1,88 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from challenges.models import Challenge
+from learning.tasks import ai_context_version
+
+
+def make_level(order, **overrides):
+    level = {
+        "title": f"Level {order}",
+        "slug": f"python-{order:03d}",
+        "description": f"Describe {order}",
+        "initial_code": "def solve():\n    pass\n",
+        "test_code": "assert True",
+        "order": order,
+        "xp_reward": order * 10,
+        "target_time_seconds": 120,
+    }
+    level.update(overrides)
+    return level
+
+
+class LoadLevelsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.levels = [make_level(order) for order in range(1, 6)]
+
+    def run_command(self, *args):
+        out = StringIO()
+        with patch(
+            "challenges.management.commands.load_levels.LEVELS", self.levels
+        ), self.captureOnCommitCallbacks(execute=True):
+            call_command("load_levels", *args, stdout=out)
+        return out.getvalue()
+
+    def test_initial_load_creates_all_levels(self):
+        self.run_command()
+
+        self.assertEqual(
+            list(Challenge.objects.values_list("slug", flat=True)),
+            [level["slug"] for level in self.levels],
+        )
+
+    def test_unchanged_levels_run_one_query(self):
+        self.run_command()
+
+        with self.assertNumQueries(1):
+            output = self.run_command()
+        self.assertIn("Unchanged: 5 challenges", output)
+
+    def test_only_changed_levels_are_updated(self):
+        self.run_command()
+        changed = Challenge.objects.get(order=3)
+        self.levels[2] = make_level(3, description="New text")
+        version_before = ai_context_version(changed.id)
+
+        output = self.run_command()
+
+        self.assertIn("Update: Level 3 (description)", output)
+        self.assertIn("Updated: 1 challenges", output)
+        self.assertEqual(Challenge.objects.get(order=3).description, "New text")
+        self.assertNotEqual(ai_context_version(changed.id), version_before)
+
+    def test_dry_run_reports_without_writing(self):
+        self.run_command()
+        self.levels = self.levels[:4] + [make_level(6)]
+
+        output = self.run_command("--dry-run")
+
+        self.assertIn("+ Create: Level 6", output)
+        self.assertIn("- Delete: Level 5", output)
+        self.assertIn("Dry run", output)
+        self.assertTrue(Challenge.objects.filter(order=5).exists())
+        self.assertFalse(Challenge.objects.filter(order=6).exists())
+
+    def test_stale_and_duplicate_rows_removed(self):
+        self.run_command()
+        Challenge.objects.create(title="Dup", slug="dup", order=2)
+        self.levels = self.levels[:4]
+
+        self.run_command()
+
+        self.assertEqual(Challenge.objects.count(), 4)
+        self.assertEqual(Challenge.objects.get(order=2).slug, "python-002")
@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from challenges.campaign import get_campaign_snapshot, get_personal_records
+from challenges.models import Challenge, UserProgress
+from challenges.services import ChallengeService
+from users.models import UserProfile
+
+
+class SubmissionQueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="coder", password="pw")
+        self.first = Challenge.objects.create(
+            title="One", slug="one", order=1, xp_reward=50
+        )
+        self.second = Challenge.objects.create(
+            title="Two", slug="two", order=2, xp_reward=50
+        )
+        # Loaded by the campaign map the player submits from.
+        get_campaign_snapshot()
+        get_personal_records(self.user)
+
+    def test_first_completion_runs_fixed_queries(self):
+        # SAVEPOINT, SELECT ... FOR UPDATE, SAVEPOINT/INSERT/RELEASE from
+        # get_or_create, UPDATE progress, UPDATE/SELECT both completion
+        # counters, UPDATE/SELECT xp, INSERT ledger row, RELEASE.
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertNumQueries(12):
+                result = ChallengeService.process_submission(
+                    self.user, self.first, passed=True
+                )
+
+        self.assertEqual(result["status"], "completed")
+        self.assertEqual(result["next_level_slug"], "two")
+        self.assertEqual(UserProfile.objects.get(user=self.user).xp, 50)
+        # Leaderboard and achievement updates wait for the commit.
+        self.assertEqual(len(callbacks), 3)
+
+    def test_resubmission_does_not_write(self):
+        UserProgress.objects.create(
+            user=self.user,
+            challenge=self.first,
+            status=UserProgress.Status.COMPLETED,
+            stars=3,
+        )
+
+        with self.assertNumQueries(3):
+            result = ChallengeService.process_submission(
+                self.user, self.first, passed=True
+            )
+
+        self.assertEqual(result["status"], "already_completed")
+        self.assertEqual(result["xp_earned"], 0)
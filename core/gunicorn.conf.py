@@ -0,0 +1,18 @@
+"""
+Gunicorn settings for the core web tier, loaded by the Dockerfile's CMD.
+
+Threaded workers keep many requests in flight per process, which the judge
+relies on to queue and batch submissions; a sync worker would hold one.
+``WEB_CONCURRENCY`` also tells the judge how many processes share the host's
+``JUDGE_POOL_SIZE`` fork-servers.
+"""
+
+import os
+
+wsgi_app = "project.wsgi:application"
+bind = "0.0.0.0:8000"
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# Judge requests block a thread for up to JUDGE_WALL_SECONDS.
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+timeout = 120
@@ -0,0 +1,197 @@
+"""
+Django Management Command: Benchmark Judge
+Runs every level's test suite from levels.py against its starter code and
+reports verdict throughput, startup time per verdict and latency for
+cold-started interpreters, the fork-server pool (with and without batching)
+and cached verdicts. Challenges are unsaved, so nothing is written to the
+database.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime, timezone
+from statistics import median
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from challenges.levels import LEVELS
+from challenges.models import Challenge
+from judge.pool import ForkServer, ForkServerPool, Limits, available_cpus
+from judge.service import JudgeService, verdict_cache_key
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class StartupRecorder:
+    """Pool proxy that records each verdict's sandbox startup time."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.size = pool.size
+        self.startup_ms = []
+
+    def execute_batch(self, test_code, codes, limits, on_result=None):
+        def record(index, result):
+            self.startup_ms.append(result.startup_ms)
+            if on_result is not None:
+                on_result(index, result)
+
+        return self.pool.execute_batch(test_code, codes, limits, on_result=record)
+
+    def close(self):
+        self.pool.close()
+
+
+class ColdStartPool:
+    """Starts a fresh interpreter per verdict, as a baseline."""
+
+    def __init__(self, size: int):
+        self.size = size
+
+    def execute_batch(self, test_code, codes, limits, on_result=None):
+        results = []
+        for index, code in enumerate(codes):
+            server = ForkServer()
+            started = time.perf_counter()
+            server.start()
+            spawn_ms = (time.perf_counter() - started) * 1000
+            try:
+                server.run_batch(
+                    test_code, [code], limits, 1, lambda _, r: results.append(r)
+                )
+            finally:
+                server.close()
+            results[-1] = replace(
+                results[-1], startup_ms=results[-1].startup_ms + spawn_ms
+            )
+            if on_result is not None:
+                on_result(index, results[-1])
+        return results
+
+    def close(self):
+        pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark judge verdicts/sec and startup time against the LEVELS suite"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--submissions",
+            type=int,
+            default=600,
+            help="Submissions per variant (cycling through LEVELS)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=32,
+            help="Concurrent submitting clients",
+        )
+        parser.add_argument(
+            "--pool-size",
+            type=int,
+            default=available_cpus(),
+            help="Fork-servers in the pool",
+        )
+
+    def handle(self, *args, **options):
+        submissions = options["submissions"]
+        concurrency = options["concurrency"]
+        pool_size = options["pool_size"]
+        cores = available_cpus()
+        revision = datetime.now(timezone.utc)
+        challenges = [
+            Challenge(
+                id=-level["order"], test_code=level["test_code"], updated_at=revision
+            )
+            for level in LEVELS
+        ]
+        # A trailing statement makes every submission a verdict cache miss.
+        jobs = [
+            (
+                challenges[i % len(LEVELS)],
+                f"{LEVELS[i % len(LEVELS)]['initial_code']}\n_submission = {i}\n",
+            )
+            for i in range(submissions)
+        ]
+        cached_jobs = [(challenge, "pass\n") for challenge, _ in jobs]
+
+        variants = [
+            ("cold start", lambda: ColdStartPool(pool_size), 1, jobs),
+            ("fork-server", lambda: ForkServerPool(pool_size), 1, jobs),
+            ("fork+batch", lambda: ForkServerPool(pool_size), 16, jobs),
+            ("cached", lambda: ForkServerPool(pool_size), 16, cached_jobs),
+        ]
+        limits = Limits.from_settings()
+        results = {}
+        for name, make_pool, batch_size, variant_jobs in variants:
+            pool = make_pool()
+            if isinstance(pool, ForkServerPool):
+                pool.start()
+            recorder = StartupRecorder(pool)
+            judge = JudgeService(
+                pool=recorder,
+                limits=limits,
+                max_queue=submissions,
+                max_per_user=submissions,
+                batch_size=batch_size,
+            )
+            if variant_jobs is cached_jobs:
+                for challenge in challenges:
+                    judge.judge(0, challenge, "pass\n")
+                recorder.startup_ms.clear()
+
+            try:
+                results[name] = self._run(judge, variant_jobs, concurrency)
+                results[name]["startup_ms"] = (
+                    median(recorder.startup_ms) if recorder.startup_ms else 0.0
+                )
+            finally:
+                judge.close()
+                cache.delete_many(
+                    {
+                        verdict_cache_key(challenge, code, limits)
+                        for challenge, code in variant_jobs
+                    }
+                )
+
+        self.stdout.write(
+            self.style.HTTP_INFO(
+                f"Judge benchmark ({len(LEVELS)} levels, {submissions} submissions, "
+                f"concurrency {concurrency}, {pool_size} fork-servers, {cores} cores)"
+            )
+        )
+        self.stdout.write(
+            f"{'variant':<12} {'verdicts/s':>10} {'per core':>9} {'startup ms':>10} "
+            f"{'p50 ms':>8} {'p95 ms':>8}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<12} {result['throughput']:>10.1f} "
+                f"{result['throughput'] / cores:>9.1f} {result['startup_ms']:>10.2f} "
+                f"{result['p50']:>8.1f} {result['p95']:>8.1f}"
+            )
+
+    def _run(self, judge, jobs, concurrency):
+        def submit(index):
+            challenge, code = jobs[index]
+            started = time.perf_counter()
+            judge.judge(index, challenge, code)
+            return (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as clients:
+            latencies = list(clients.map(submit, range(len(jobs))))
+        elapsed = time.perf_counter() - started
+
+        return {
+            "throughput": len(jobs) / elapsed,
+            "p50": median(latencies),
+            "p95": percentile(latencies, 0.95),
+        }
@@ -0,0 +1,243 @@
+"""
+Pool of judge fork-servers.
+
+Each fork-server (see runner.py) is a long-lived zygote with the standard
+library already imported; it forks one sandboxed child per submission, so a
+verdict costs a fork instead of an interpreter start. A whole batch of
+submissions for one challenge is sent to a zygote in a single dispatch and
+results stream back over its stdout pipe as each child finishes.
+"""
+
+import json
+import logging
+import math
+import os
+import queue
+import select
+import signal
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+RUNNER_PATH = str(Path(__file__).resolve().with_name("runner.py"))
+RUNNER_COMMAND = [sys.executable, "-I", "-S", "-B", RUNNER_PATH]
+READY_TIMEOUT = 10
+# Slack on top of the per-child wall limits before a zygote is presumed hung.
+DISPATCH_GRACE_SECONDS = 5
+
+
+def available_cpus() -> int:
+    """
+    CPUs this process may use: the container's cgroup quota (rounded up)
+    when there is one, otherwise the CPUs it is scheduled on.
+    """
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as file:
+            quota, period = file.read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return len(os.sched_getaffinity(0))
+
+
+@dataclass(frozen=True)
+class Limits:
+    cpu_seconds: int = 2
+    memory_mb: int = 256
+    wall_seconds: float = 5.0
+    output_bytes: int = 4096
+
+    @classmethod
+    def from_settings(cls) -> "Limits":
+        return cls(
+            cpu_seconds=settings.JUDGE_CPU_SECONDS,
+            memory_mb=settings.JUDGE_MEMORY_MB,
+            wall_seconds=settings.JUDGE_WALL_SECONDS,
+            output_bytes=settings.JUDGE_OUTPUT_BYTES,
+        )
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "cpu_seconds": self.cpu_seconds,
+            "memory_mb": self.memory_mb,
+            "wall_seconds": self.wall_seconds,
+            "output_bytes": self.output_bytes,
+        }
+
+
+@dataclass(frozen=True)
+class RunResult:
+    status: str
+    message: str = ""
+    duration_ms: float = 0.0
+    output: str = ""
+    startup_ms: float = 0.0
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "RunResult":
+        return cls(
+            status=str(payload["status"]),
+            message=str(payload.get("message", "")),
+            duration_ms=float(payload.get("duration_ms", 0.0)),
+            output=str(payload.get("output", "")),
+            startup_ms=float(payload.get("startup_ms", 0.0)),
+        )
+
+
+class ForkServerError(Exception):
+    pass
+
+
+class ForkServer:
+    """One zygote process. Not thread-safe: the pool hands it to one caller."""
+
+    def __init__(self):
+        self.process = None
+        self._buffer = b""
+
+    def start(self) -> None:
+        self.process = subprocess.Popen(
+            RUNNER_COMMAND,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd="/",
+            env={},
+            close_fds=True,
+            # Own process group, so close() takes every child down with it.
+            start_new_session=True,
+        )
+        self._buffer = b""
+        ready = self._read_line(time.monotonic() + READY_TIMEOUT)
+        if not ready or not ready.get("ready"):
+            self.close()
+            raise ForkServerError("Judge fork-server failed to start")
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def close(self) -> None:
+        if self.process is None:
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            stream.close()
+        self.process = None
+
+    def _read_line(self, deadline: float) -> dict | None:
+        fd = self.process.stdout.fileno()
+        poller = select.poll()
+        poller.register(fd, select.POLLIN)
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not poller.poll(remaining * 1000):
+                return None
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return None
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def run_batch(self, test_code, codes, limits, parallelism, on_result) -> None:
+        """
+        Runs ``codes`` against ``test_code``, calling ``on_result(index,
+        result)`` as each verdict streams in. Raises ForkServerError (after
+        killing the zygote) if it dies or stops answering.
+        """
+        batch = {
+            "test_code": test_code,
+            "limits": limits.as_dict(),
+            "parallelism": parallelism,
+            "jobs": [{"code": code} for code in codes],
+        }
+        rounds = math.ceil(len(codes) / parallelism)
+        deadline = (
+            time.monotonic()
+            + rounds * (limits.wall_seconds + 0.5)
+            + DISPATCH_GRACE_SECONDS
+        )
+        try:
+            self.process.stdin.write((json.dumps(batch) + "\n").encode("utf-8"))
+            self.process.stdin.flush()
+            while True:
+                message = self._read_line(deadline)
+                if message is None:
+                    raise ForkServerError("Judge fork-server stopped responding")
+                if message.get("done"):
+                    return
+                on_result(message["index"], RunResult.from_payload(message))
+        except (OSError, ValueError, KeyError) as exc:
+            self.close()
+            raise ForkServerError("Judge fork-server failed") from exc
+        except ForkServerError:
+            self.close()
+            raise
+
+
+class ForkServerPool:
+    def __init__(self, size: int, parallelism: int = 1):
+        self.size = size
+        self.parallelism = parallelism
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(ForkServer())
+
+    def start(self) -> None:
+        """Starts every zygote up front instead of on first dispatch."""
+        servers = [self._idle.get() for _ in range(self.size)]
+        try:
+            for server in servers:
+                if not server.alive():
+                    server.start()
+        finally:
+            for server in servers:
+                self._idle.put(server)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def execute_batch(self, test_code, codes, limits, on_result=None) -> list:
+        results = [None] * len(codes)
+
+        def deliver(index, result):
+            results[index] = result
+            if on_result is not None:
+                on_result(index, result)
+
+        server = self._idle.get()
+        try:
+            if not server.alive():
+                server.start()
+            server.run_batch(test_code, codes, limits, self.parallelism, deliver)
+        except ForkServerError:
+            logger.exception("Judge fork-server failed; it will be restarted")
+            for index, result in enumerate(results):
+                if result is None:
+                    deliver(
+                        index,
+                        RunResult(
+                            status="unavailable", message="The judge is unavailable"
+                        ),
+                    )
+        finally:
+            self._idle.put(server)
+        return results
+
+    def execute(self, code: str, test_code: str, limits: Limits) -> RunResult:
+        return self.execute_batch(test_code, [code], limits)[0]
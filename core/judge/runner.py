@@ -0,0 +1,553 @@
+"""
+Sandboxed judge fork-server.
+
+Started as ``python -I -S runner.py`` by the fork-server pool, so it must not
+import Django or anything outside the standard library. The process (the
+zygote) pre-imports the standard library modules submissions commonly use,
+then reads batches of jobs from stdin, one JSON line each. Every job runs in
+its own forked child, which applies resource limits, installs an audit hook,
+runs the user code followed by the challenge tests and reports back over a
+private pipe. Comparisons and truth tests in the challenge tests are
+rewritten to run in the runner, on built-in values only, so a submission's
+objects cannot pass a test by overriding ``__eq__`` or ``__bool__``. The zygote streams one JSON result line per job to stdout as
+soon as it is ready, then a ``done`` line per batch.
+
+The zygote never runs user code itself. The rlimits and audit hook are
+defense in depth, not a complete OS sandbox: deployments should still run the
+judge in an unprivileged container.
+"""
+
+import ast
+import io
+import json
+import operator
+import os
+import resource
+import select
+import signal
+import sys
+import time
+from json.encoder import encode_basestring_ascii
+from types import CodeType, FunctionType
+
+# Audit events user code may never trigger.
+BLOCKED_EVENTS = frozenset(
+    {
+        "ctypes.dlopen",
+        "ctypes.dlsym",
+        "ctypes.cdata",
+        "gc.get_objects",
+        "gc.get_referrers",
+        "gc.get_referents",
+        "os.chdir",
+        "os.chmod",
+        "os.chown",
+        "os.exec",
+        "os.fork",
+        "os.forkpty",
+        "os.kill",
+        "os.killpg",
+        "os.link",
+        "os.listdir",
+        "os.mkdir",
+        "os.posix_spawn",
+        "os.putenv",
+        "os.remove",
+        "os.rename",
+        "os.rmdir",
+        "os.scandir",
+        "os.spawn",
+        "os.symlink",
+        "os.system",
+        "os.truncate",
+        "os.unsetenv",
+        "pty.spawn",
+        "shutil.rmtree",
+        "socket.bind",
+        "socket.connect",
+        "socket.getaddrinfo",
+        "socket.sendto",
+        "subprocess.Popen",
+        "sys._current_frames",
+        "sys._getframe",
+        "sys.addaudithook",
+        "sys.setprofile",
+        "sys.settrace",
+    }
+)
+BLOCKED_MODULES = frozenset({"ctypes", "_ctypes", "_posixsubprocess", "mmap"})
+# Attributes that hand out frame objects, and with them the runner's locals.
+BLOCKED_ATTRIBUTES = frozenset({"tb_frame", "gi_frame", "cr_frame", "ag_frame"})
+# Function attributes that would let user code rewrite the runner's helpers.
+FROZEN_ATTRIBUTES = frozenset({"__code__", "__defaults__", "__kwdefaults__"})
+# Only the interpreter's own files (the stdlib) may be opened, for imports.
+READABLE_ROOTS = tuple(
+    {os.path.join(os.path.normpath(p), "") for p in (sys.base_prefix, sys.prefix)}
+)
+WRITE_MODE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_APPEND | os.O_TRUNC
+MESSAGE_LIMIT = 500
+MAX_RESULT_BYTES = 64 * 1024
+# Imported once in the zygote so forked children start with them warm.
+PRELOADED_MODULES = (
+    "bisect",
+    "collections",
+    "dataclasses",
+    "datetime",
+    "decimal",
+    "enum",
+    "fractions",
+    "functools",
+    "heapq",
+    "itertools",
+    "math",
+    "operator",
+    "random",
+    "re",
+    "statistics",
+    "string",
+    "typing",
+)
+
+
+class SandboxViolation(ValueError):
+    # A ValueError so stdlib helpers that probe sys._getframe (namedtuple,
+    # enum, typing) fall back to their defaults instead of failing.
+    pass
+
+
+def apply_limits(limits: dict) -> None:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_limit = int(usage.ru_utime + usage.ru_stime + limits["cpu_seconds"]) + 1
+    # SIGXCPU at the soft limit, SIGKILL one second later if it is ignored.
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 1))
+    memory = limits["memory_mb"] * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+def audit_hook(
+    event,
+    args,
+    blocked_events=BLOCKED_EVENTS,
+    blocked_modules=BLOCKED_MODULES,
+    blocked_attributes=BLOCKED_ATTRIBUTES,
+    frozen_attributes=FROZEN_ATTRIBUTES,
+    write_flags=WRITE_MODE_FLAGS,
+    readable_roots=READABLE_ROOTS,
+    normpath=os.path.normpath,
+    violation=SandboxViolation,
+):
+    # Everything is bound as defaults: user code can rebind module globals.
+    if event in blocked_events:
+        raise violation(f"{event} is not allowed")
+    if event == "import" and args[0].partition(".")[0] in blocked_modules:
+        raise violation(f"import of {args[0]} is not allowed")
+    if event == "object.__getattr__" and args[1] in blocked_attributes:
+        raise violation(f"access to {args[1]} is not allowed")
+    if event == "object.__setattr__" and args[1] in frozen_attributes:
+        raise violation(f"setting {args[1]} is not allowed")
+    if event == "open":
+        path, mode, flags = args
+        if (mode.__class__ is str and any(c in mode for c in "wax+")) or (
+            flags & write_flags
+        ):
+            raise violation("writing files is not allowed")
+        if path.__class__ is bytes:
+            path = path.decode("utf-8", "surrogateescape")
+        if path.__class__ is str and not normpath(path).startswith(readable_roots):
+            raise violation(f"reading {path} is not allowed")
+
+
+# Values the tests may compare: exactly these types, nested in any way.
+# Subclasses and user classes are refused, since they can redefine equality.
+PLAIN_TYPES = (
+    type(None),
+    bool,
+    int,
+    float,
+    complex,
+    str,
+    bytes,
+    list,
+    tuple,
+    dict,
+    set,
+    frozenset,
+)
+PLAIN_TYPE_IDS = frozenset(id(kind) for kind in PLAIN_TYPES)
+NOT_PLAIN_MESSAGE = (
+    "Tests only compare built-in values (None, bool, numbers, str, bytes, "
+    "list, tuple, dict, set)"
+)
+# Indexed by the rewritten tests; only built-in operations.
+COMPARE_OPERATORS = (
+    ("Eq", operator.eq),
+    ("NotEq", operator.ne),
+    ("Lt", operator.lt),
+    ("LtE", operator.le),
+    ("Gt", operator.gt),
+    ("GtE", operator.ge),
+    ("In", lambda left, right, contains=operator.contains: contains(right, left)),
+    (
+        "NotIn",
+        lambda left, right, contains=operator.contains: not contains(right, left),
+    ),
+)
+IDENTITY_OPERATORS = (("Is", operator.is_), ("IsNot", operator.is_not))
+OPERATOR_INDEX = {
+    name: index
+    for index, (name, _) in enumerate(COMPARE_OPERATORS + IDENTITY_OPERATORS)
+}
+COMPARE_NAME = "__judge_compare__"
+TRUTH_NAME = "__judge_truth__"
+TESTS_TEMPLATE = f"def __judge_tests__({COMPARE_NAME}, {TRUTH_NAME}):\n    pass\n"
+
+
+def is_plain(
+    value,
+    type_ids=PLAIN_TYPE_IDS,
+    kind=type,
+    ident=id,
+    mapping=dict,
+    mapping_items=dict.items,
+    containers=(list, tuple, set, frozenset),
+):
+    # Runs after the submission, so everything is bound as a default. The
+    # walk only calls built-in methods of values already known to be plain.
+    stack, seen = [value], set()
+    while stack:
+        item = stack.pop()
+        item_kind = kind(item)
+        if ident(item_kind) not in type_ids:
+            return False
+        if item_kind is mapping or item_kind in containers:
+            if ident(item) in seen:
+                continue
+            seen.add(ident(item))
+            stack.extend(mapping_items(item) if item_kind is mapping else item)
+    return True
+
+
+def check_compare(
+    indexes,
+    *operands,
+    operators=tuple(function for _, function in COMPARE_OPERATORS),
+    identity=tuple(function for _, function in IDENTITY_OPERATORS),
+    plain=is_plain,
+    error=AssertionError,
+    message=NOT_PLAIN_MESSAGE,
+    count=len,
+):
+    """A comparison from the tests; a chain is evaluated eagerly."""
+    for position in range(count(indexes)):
+        left, right = operands[position], operands[position + 1]
+        index = indexes[position]
+        if index >= count(operators):
+            result = identity[index - count(operators)](left, right)
+        elif plain(left) and plain(right):
+            result = operators[index](left, right)
+        else:
+            raise error(message)
+        if not result:
+            return False
+    return True
+
+
+def check_truth(value, plain=is_plain, error=AssertionError, message=NOT_PLAIN_MESSAGE):
+    """A truth test from the tests: ``assert``, ``and``/``or`` and ``not``."""
+    if not plain(value):
+        raise error(message)
+    return not not value
+
+
+class CheckedTests(ast.NodeTransformer):
+    """Routes the tests' comparisons and truth tests through the runner."""
+
+    @staticmethod
+    def call(name, *args):
+        return ast.Call(
+            func=ast.Name(id=name, ctx=ast.Load()), args=list(args), keywords=[]
+        )
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        indexes = tuple(OPERATOR_INDEX[type(op).__name__] for op in node.ops)
+        return self.call(
+            COMPARE_NAME, ast.Constant(indexes), node.left, *node.comparators
+        )
+
+    def visit_Assert(self, node):
+        self.generic_visit(node)
+        node.test = self.call(TRUTH_NAME, node.test)
+        return node
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        node.values = [self.call(TRUTH_NAME, value) for value in node.values]
+        return node
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            node.operand = self.call(TRUTH_NAME, node.operand)
+        return node
+
+
+def compile_tests(test_text: str) -> CodeType:
+    """
+    Compiles the tests as the body of a function that takes the checks as
+    arguments: locals the submission has no way to reach or rebind.
+    """
+    tree = CheckedTests().visit(ast.parse(test_text, "<tests>"))
+    wrapper = ast.parse(TESTS_TEMPLATE)
+    wrapper.body[0].body = tree.body or [ast.Pass()]
+    module = compile(ast.fix_missing_locations(wrapper), "<tests>", "exec")
+    return next(const for const in module.co_consts if type(const) is CodeType)
+
+
+def describe(exc: BaseException, kind=type) -> str:
+    # May run user-defined __str__, so only ever call it under the audit hook.
+    try:
+        return f"{kind(exc).__name__}: {exc}"
+    except BaseException:  # noqa: BLE001
+        return "Error"
+
+
+def run(code_text: str, test_text: str, output_bytes: int) -> dict:
+    # Compile both sources before any user code runs, so a submission cannot
+    # swap out builtins.compile and skip the tests. Everything called after
+    # the submission runs is bound here too: it can rebind builtins and this
+    # module's globals.
+    run_code, perf_counter = exec, time.perf_counter
+    to_text, describe_error = str, describe
+    make_function, compare, truth = FunctionType, check_compare, check_truth
+    try:
+        code = compile(code_text, "<submission>", "exec")
+        tests = compile_tests(test_text)
+    except SyntaxError as exc:
+        return {"status": "error", "message": describe(exc)[:MESSAGE_LIMIT]}
+
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    captured = io.StringIO()
+    sys.stdout = sys.stderr = captured
+    started = perf_counter()
+    try:
+        run_code(code, namespace)
+        make_function(tests, namespace)(compare, truth)
+        status, message = "passed", ""
+    except AssertionError as exc:
+        status, message = "failed", to_text(exc) or "Assertion failed"
+    except MemoryError:
+        status, message = "memory_limit", "Memory limit exceeded"
+    except BaseException as exc:  # noqa: BLE001 - user code may raise anything
+        status, message = "error", describe_error(exc)
+    duration_ms = (perf_counter() - started) * 1000
+
+    return {
+        "status": status,
+        "message": message if message.__class__ is str else "Error",
+        "duration_ms": duration_ms,
+        "output": captured.getvalue()[:output_bytes],
+    }
+
+
+def encode_result(
+    result: dict,
+    encode=encode_basestring_ascii,
+    to_float=float,
+    limit=MESSAGE_LIMIT,
+) -> str:
+    # Hand-rolled on a C encoder captured at import: json.dumps goes through
+    # module-level objects that user code could patch. Runs after the
+    # submission, so every name it calls is bound as a default, like
+    # audit_hook's, rather than looked up in globals or builtins.
+    return (
+        f'{{"status": {encode(result["status"])}, '
+        f'"message": {encode(result["message"][:limit])}, '
+        f'"duration_ms": {to_float(result.get("duration_ms", 0.0)):.3f}, '
+        f'"startup_ms": {to_float(result.get("startup_ms", 0.0)):.3f}, '
+        f'"output": {encode(result.get("output", ""))}}}'
+    )
+
+
+def child_main(
+    job: dict, batch: dict, nonce: str, result_fd: int, forked_at: float
+) -> None:
+    """Runs in the forked child; never returns."""
+    # Bind everything used after the submission runs: it can rebind globals.
+    write, exit_now, run_job, encode = os.write, os._exit, run, encode_result
+    perf_counter = time.perf_counter
+    try:
+        # Only /dev/null on the standard descriptors and the private result
+        # pipe on fd 3; the zygote's pipes and siblings' pipes are closed.
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        os.dup2(result_fd, 3)
+        os.closerange(4, resource.getrlimit(resource.RLIMIT_NOFILE)[0])
+        code, test_code = job["code"], batch["test_code"]
+        # Drop the rest of the batch before any user code runs.
+        batch.clear()
+        apply_limits(job["limits"])
+        # Imports must not try to write .pyc files once writes are blocked.
+        sys.dont_write_bytecode = True
+        # The hook is never removed: finalizers and threads left behind by
+        # the submission stay sandboxed until the process exits.
+        sys.addaudithook(audit_hook)
+        startup_ms = (perf_counter() - forked_at) * 1000
+        try:
+            result = run_job(code, test_code, job["output_bytes"])
+            result["startup_ms"] = startup_ms
+            line = nonce + encode(result)
+        except MemoryError:
+            line = nonce + encode({"status": "memory_limit", "message": ""})
+        write(3, (line + "\n").encode("ascii"))
+    finally:
+        exit_now(0)
+
+
+def parse_child_output(data: bytes, nonce: str, wait_status: int) -> dict:
+    """
+    Picks the nonce-tagged result line out of a child's pipe. Anything else
+    on the pipe was written by user code and is ignored.
+    """
+    prefix = nonce.encode("ascii")
+    for line in data.splitlines():
+        if line.startswith(prefix):
+            try:
+                result = json.loads(line[len(prefix) :])
+            except ValueError:
+                break
+            if isinstance(result, dict) and "status" in result:
+                return result
+            break
+
+    if os.waitstatus_to_exitcode(wait_status) in (-signal.SIGXCPU, -signal.SIGKILL):
+        return {"status": "cpu_limit", "message": "CPU time limit exceeded"}
+    return {"status": "error", "message": "The submission crashed the runner"}
+
+
+class Child:
+    __slots__ = ("index", "pid", "fd", "nonce", "deadline", "chunks")
+
+    def __init__(self, index, pid, fd, nonce, deadline):
+        self.index = index
+        self.pid = pid
+        self.fd = fd
+        self.nonce = nonce
+        self.deadline = deadline
+        self.chunks = []
+
+    def received(self) -> int:
+        return sum(len(chunk) for chunk in self.chunks)
+
+
+def emit(payload: dict) -> None:
+    data = (json.dumps(payload) + "\n").encode("utf-8")
+    while data:
+        data = data[os.write(1, data) :]
+
+
+def run_batch(batch: dict) -> None:
+    limits = batch["limits"]
+    wall_seconds = limits["wall_seconds"]
+    pending = list(enumerate(batch.pop("jobs")))
+    pending.reverse()
+    running = {}  # pid -> Child
+    by_fd = {}
+    poller = select.poll()
+
+    while pending or running:
+        while pending and len(running) < batch["parallelism"]:
+            index, job = pending.pop()
+            job["limits"] = limits
+            job["output_bytes"] = limits["output_bytes"]
+            nonce = os.urandom(16).hex()
+            read_fd, write_fd = os.pipe()
+            forked_at = time.perf_counter()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                # Forget the other jobs (and their nonces) in this copy.
+                pending.clear()
+                running.clear()
+                by_fd.clear()
+                child_main(job, batch, nonce, write_fd, forked_at)
+            os.close(write_fd)
+            poller.register(read_fd, select.POLLIN)
+            child = Child(index, pid, read_fd, nonce, forked_at + wall_seconds)
+            running[pid] = by_fd[read_fd] = child
+
+        # Children that closed their pipe but have not exited yet are polled.
+        timeout = min(child.deadline for child in running.values())
+        timeout -= time.perf_counter()
+        if any(child.fd is None for child in running.values()):
+            timeout = min(timeout, 0.005)
+        for fd, _ in poller.poll(max(timeout, 0) * 1000):
+            child = by_fd[fd]
+            chunk = os.read(fd, 65536)
+            if chunk:
+                if child.received() < MAX_RESULT_BYTES:
+                    child.chunks.append(chunk)
+                continue
+            poller.unregister(fd)
+            os.close(fd)
+            del by_fd[fd]
+            child.fd = None
+
+        now = time.perf_counter()
+        for pid, child in list(running.items()):
+            wait_status = None
+            if child.fd is None:
+                exited, status = os.waitpid(pid, os.WNOHANG)
+                if exited:
+                    wait_status = status
+            if wait_status is None and now < child.deadline:
+                continue
+
+            if wait_status is None:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                if child.fd is not None:
+                    poller.unregister(child.fd)
+                    os.close(child.fd)
+                    del by_fd[child.fd]
+                result = {
+                    "status": "timeout",
+                    "message": f"Time limit of {wall_seconds:g}s exceeded",
+                    "duration_ms": wall_seconds * 1000,
+                }
+            else:
+                result = parse_child_output(
+                    b"".join(child.chunks), child.nonce, wait_status
+                )
+            del running[pid]
+            result["index"] = child.index
+            emit(result)
+
+    emit({"done": True})
+
+
+def read_lines(fd: int = 0):
+    buffer = b""
+    while True:
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            return
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        yield from lines
+
+
+def main() -> None:
+    for name in PRELOADED_MODULES:
+        __import__(name)
+    emit({"ready": True, "pid": os.getpid()})
+    for line in read_lines():
+        if line.strip():
+            run_batch(json.loads(line))
+
+
+if __name__ == "__main__":
+    main()
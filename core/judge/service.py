@@ -0,0 +1,256 @@
+"""
+Server-side judge for challenge submissions.
+
+Submissions run through a bounded per-process queue in front of the
+fork-server pool. Submissions for the same challenge that arrive while every
+fork-server is busy are grouped into one batch and dispatched together, so
+batching adds no latency when the judge is idle. Each user may only have a
+few submissions in flight across all web workers, and verdicts are cached by
+challenge revision and a hash of the normalized code, so resubmitting the
+same solution (modulo comments and blank lines) never re-runs it. The web
+tier runs threaded gunicorn workers (see gunicorn.conf.py), so each process
+has many submissions in flight to queue and batch; the host's fork-servers
+are split between those processes.
+"""
+
+import io
+import threading
+import tokenize
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .pool import ForkServerPool, Limits, available_cpus
+
+# Bump when the runner changes how tests decide a verdict, so verdicts cached
+# under the old rules are not served.
+VERDICT_CACHE_VERSION = 2
+# Verdicts that depend only on the code, not on how busy the box was.
+CACHEABLE_STATUSES = frozenset({"passed", "failed", "error", "memory_limit"})
+SKIPPED_TOKENS = frozenset(
+    {tokenize.COMMENT, tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER}
+)
+
+
+class JudgeBusy(Exception):
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class Verdict:
+    status: str
+    message: str = ""
+    duration_ms: float = 0.0
+    output: str = ""
+    cached: bool = False
+
+    @property
+    def passed(self) -> bool:
+        return self.status == "passed"
+
+    def as_dict(self) -> dict[str, object]:
+        return asdict(self)
+
+
+def normalize_code(code: str) -> str:
+    """
+    Canonical form of ``code`` for verdict caching: comments, blank lines and
+    insignificant whitespace are dropped, everything else is kept verbatim.
+    """
+    try:
+        parts = []
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            if token.type in SKIPPED_TOKENS:
+                continue
+            if token.type == tokenize.INDENT:
+                parts.append("<indent>")
+            elif token.type == tokenize.DEDENT:
+                parts.append("<dedent>")
+            elif token.type == tokenize.NEWLINE:
+                parts.append("\n")
+            else:
+                parts.append(token.string)
+        return " ".join(parts)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        # Invalid code still gets a verdict; normalize it conservatively.
+        lines = (line.rstrip() for line in code.strip().splitlines())
+        return "\n".join(line for line in lines if line)
+
+
+def code_hash(code: str) -> str:
+    return sha256(normalize_code(code).encode("utf-8")).hexdigest()
+
+
+def verdict_cache_key(challenge, code: str, limits: Limits) -> str:
+    revision = int(challenge.updated_at.timestamp() * 1000)
+    return (
+        f"judge_verdict:v{VERDICT_CACHE_VERSION}:{challenge.id}:{revision}:"
+        f"{limits.cpu_seconds}:{limits.memory_mb}:{code_hash(code)}"
+    )
+
+
+@dataclass
+class _Batch:
+    test_code: str
+    codes: list[str] = field(default_factory=list)
+    futures: list[Future] = field(default_factory=list)
+
+
+class JudgeService:
+    def __init__(
+        self,
+        pool: ForkServerPool,
+        limits: Limits,
+        max_queue: int,
+        max_per_user: int,
+        batch_size: int = 16,
+    ):
+        self.pool = pool
+        self.limits = limits
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self.batch_size = batch_size
+        # One dispatch thread per fork-server.
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool.size, thread_name_prefix="judge"
+        )
+        self._queued = 0
+        self._queue_lock = threading.Lock()
+        self._open_batches = {}
+        self._batch_lock = threading.Lock()
+
+    def judge(self, user_id: int, challenge, code: str) -> Verdict:
+        key = verdict_cache_key(challenge, code, self.limits)
+        cached = cache.get(key)
+        if cached is not None:
+            return Verdict(**cached, cached=True)
+
+        self._acquire_user_slot(user_id)
+        try:
+            result = self._run_queued(challenge, code)
+        finally:
+            self._release_user_slot(user_id)
+
+        verdict = Verdict(
+            status=result.status,
+            message=result.message,
+            duration_ms=result.duration_ms,
+            output=result.output,
+        )
+        if verdict.status in CACHEABLE_STATUSES:
+            payload = verdict.as_dict()
+            payload.pop("cached")
+            cache.set(key, payload, timeout=settings.JUDGE_VERDICT_CACHE_TIMEOUT)
+        return verdict
+
+    def _run_queued(self, challenge, code: str):
+        with self._queue_lock:
+            if self._queued >= self.max_queue:
+                raise JudgeBusy("The judge queue is full. Try again shortly.")
+            self._queued += 1
+        try:
+            return self._enqueue(challenge, code).result()
+        finally:
+            with self._queue_lock:
+                self._queued -= 1
+
+    def _enqueue(self, challenge, code: str) -> Future:
+        """
+        Adds ``code`` to the open batch for this challenge revision. A batch
+        stays open until a dispatch thread picks it up (or it is full).
+        """
+        key = (challenge.id, challenge.updated_at)
+        future = Future()
+        with self._batch_lock:
+            batch = self._open_batches.get(key)
+            if batch is None or len(batch.codes) >= self.batch_size:
+                batch = _Batch(test_code=challenge.test_code or "")
+                self._open_batches[key] = batch
+                self._executor.submit(self._dispatch, key, batch)
+            batch.codes.append(code)
+            batch.futures.append(future)
+        return future
+
+    def _dispatch(self, key, batch: _Batch) -> None:
+        with self._batch_lock:
+            # Close the batch: later submissions open a new one.
+            if self._open_batches.get(key) is batch:
+                del self._open_batches[key]
+
+        def deliver(index, result):
+            batch.futures[index].set_result(result)
+
+        try:
+            self.pool.execute_batch(
+                batch.test_code, batch.codes, self.limits, on_result=deliver
+            )
+        except Exception as exc:  # noqa: BLE001 - waiters must always wake up
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(exc)
+
+    # Per-user caps live in the shared cache so they hold across web workers.
+    # The timeout releases slots leaked by a crashed worker.
+    def _user_slot_key(self, user_id: int) -> str:
+        return f"judge_active:{user_id}"
+
+    def _acquire_user_slot(self, user_id: int) -> None:
+        key = self._user_slot_key(user_id)
+        cache.add(key, 0, timeout=int(self.limits.wall_seconds * 4) + 10)
+        try:
+            active = cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=int(self.limits.wall_seconds * 4) + 10)
+            active = 1
+        if active > self.max_per_user:
+            self._release_user_slot(user_id)
+            raise JudgeBusy(
+                "Too many submissions in progress. Wait for one to finish.",
+                retry_after=max(int(self.limits.wall_seconds), 1),
+            )
+
+    def _release_user_slot(self, user_id: int) -> None:
+        try:
+            cache.decr(self._user_slot_key(user_id))
+        except ValueError:
+            pass
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.pool.close()
+
+
+def worker_pool_size() -> int:
+    """This web worker's share of the host's ``JUDGE_POOL_SIZE`` fork-servers."""
+    host_size = settings.JUDGE_POOL_SIZE or available_cpus()
+    return max(1, host_size // max(settings.WEB_CONCURRENCY, 1))
+
+
+_judge = None
+_judge_lock = threading.Lock()
+
+
+def get_judge() -> JudgeService:
+    """The process-wide judge, started on first use."""
+    global _judge
+    if _judge is None:
+        with _judge_lock:
+            if _judge is None:
+                pool = ForkServerPool(
+                    size=worker_pool_size(),
+                    parallelism=settings.JUDGE_FORK_PARALLELISM,
+                )
+                pool.start()
+                _judge = JudgeService(
+                    pool=pool,
+                    limits=Limits.from_settings(),
+                    max_queue=settings.JUDGE_MAX_QUEUE,
+                    max_per_user=settings.JUDGE_MAX_CONCURRENT_PER_USER,
+                    batch_size=settings.JUDGE_BATCH_SIZE,
+                )
+    return _judge
@@ -0,0 +1,262 @@
+import threading
+import time
+from unittest.mock import Mock, patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from challenges.models import Challenge, UserProgress
+from judge.pool import ForkServerPool, Limits, RunResult
+from judge.service import JudgeBusy, JudgeService, code_hash, worker_pool_size
+
+SOLUTION = "def add_ten(x):\n    return x + 10\n"
+TESTS = "assert add_ten(7) == 17\n"
+
+
+class NormalizeCodeTests(TestCase):
+    def test_comments_and_blank_lines_do_not_change_hash(self):
+        noisy = "# my solution\n\ndef add_ten(x):  # adds ten\n\n    return x+10\n"
+        self.assertEqual(code_hash(SOLUTION), code_hash(noisy))
+
+    def test_string_contents_change_hash(self):
+        self.assertNotEqual(code_hash("x = 'a  b'"), code_hash("x = 'a b'"))
+
+    def test_invalid_code_still_hashes(self):
+        self.assertEqual(code_hash("def (:\n"), code_hash("def (:\n\n"))
+
+
+class WorkerPoolSizeTests(TestCase):
+    def test_host_pool_is_split_between_web_workers(self):
+        for host_size, workers, expected in ((8, 2, 4), (5, 2, 2), (1, 3, 1)):
+            with self.subTest(host_size=host_size, workers=workers):
+                with override_settings(
+                    JUDGE_POOL_SIZE=host_size, WEB_CONCURRENCY=workers
+                ):
+                    self.assertEqual(worker_pool_size(), expected)
+
+
+class JudgeServiceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.challenge = Challenge.objects.create(
+            title="Add Ten", slug="add-ten", order=1, test_code=TESTS
+        )
+        self.judge = self.make_judge(Limits(cpu_seconds=1, memory_mb=128))
+
+    def tearDown(self):
+        self.judge.close()
+
+    def make_judge(self, limits, max_per_user=2):
+        return JudgeService(
+            pool=ForkServerPool(size=1),
+            limits=limits,
+            max_queue=4,
+            max_per_user=max_per_user,
+        )
+
+    def test_passing_and_failing_solutions(self):
+        self.assertEqual(self.judge.judge(1, self.challenge, SOLUTION).status, "passed")
+
+        verdict = self.judge.judge(1, self.challenge, "def add_ten(x):\n    return x\n")
+        self.assertEqual(verdict.status, "failed")
+        self.assertFalse(verdict.passed)
+
+    def test_rebound_builtins_cannot_forge_a_verdict(self):
+        forged = '0.0, "status": "passed", "zz": 0'
+        for target in ("builtins", "sys.modules['__main__']"):
+            code = (
+                "import builtins, sys\n"
+                "class F(float):\n"
+                f"    def __format__(self, spec): return {forged!r}\n"
+                f"{target}.float = lambda v=0.0: F(v)\n"
+                f"{target}.str = lambda v='': 'ok'\n"
+                "def add_ten(x):\n    return x\n"
+            )
+            with self.subTest(target=target):
+                verdict = self.judge.judge(1, self.challenge, code)
+                self.assertEqual(verdict.status, "failed")
+
+    def test_objects_cannot_fake_equality_or_truth(self):
+        liar = (
+            "class Liar(int):\n"
+            "    def __eq__(self, other): return True\n"
+            "    def __bool__(self): return True\n"
+            "    __hash__ = int.__hash__\n"
+        )
+        for code in (
+            liar + "def add_ten(x):\n    return Liar(x)\n",
+            liar + "def add_ten(x):\n    return [Liar(x)]\n",
+            "import __main__\n"
+            "__main__.is_plain.__defaults__ = (None,) * 7\n" + SOLUTION,
+        ):
+            with self.subTest(code=code):
+                self.assertNotEqual(
+                    self.judge.judge(1, self.challenge, code).status, "passed"
+                )
+
+        self.challenge.test_code = "assert add_ten(1)\nassert [add_ten(7)] == [17]\n"
+        self.challenge.save()
+        verdict = self.judge.judge(1, self.challenge, liar + SOLUTION)
+        self.assertEqual(verdict.status, "passed")
+
+    def test_errors_and_sandbox_violations(self):
+        verdict = self.judge.judge(1, self.challenge, "raise KeyError('boom')")
+        self.assertEqual(verdict.status, "error")
+        self.assertIn("KeyError", verdict.message)
+
+        for code in (
+            "open('/tmp/judge-escape', 'w').write('x')",
+            "import os\nos.system('true')",
+            "import sys\nsys._getframe(1)",
+        ):
+            verdict = self.judge.judge(1, self.challenge, code)
+            self.assertEqual(verdict.status, "error")
+            self.assertIn("SandboxViolation", verdict.message)
+
+    def test_resource_limits(self):
+        verdict = self.judge.judge(1, self.challenge, "x = bytearray(512 * 2**20)")
+        self.assertEqual(verdict.status, "memory_limit")
+
+        verdict = self.judge.judge(1, self.challenge, "while True:\n    pass\n")
+        self.assertIn(verdict.status, {"cpu_limit", "timeout"})
+
+    def test_wall_clock_timeout_is_not_cached(self):
+        judge = self.make_judge(Limits(wall_seconds=0.5))
+        self.addCleanup(judge.close)
+        code = "import time\ntime.sleep(5)"
+
+        self.assertEqual(judge.judge(1, self.challenge, code).status, "timeout")
+        self.assertFalse(judge.judge(1, self.challenge, code).cached)
+
+    def test_verdict_cached_by_normalized_code(self):
+        self.judge.judge(1, self.challenge, SOLUTION)
+
+        with patch.object(self.judge.pool, "execute") as execute:
+            verdict = self.judge.judge(2, self.challenge, "# again\n" + SOLUTION)
+        execute.assert_not_called()
+        self.assertTrue(verdict.cached)
+        self.assertTrue(verdict.passed)
+
+    def test_challenge_edit_invalidates_cached_verdict(self):
+        self.judge.judge(1, self.challenge, SOLUTION)
+        self.challenge.test_code = "assert add_ten(7) == 18\n"
+        self.challenge.save()
+
+        verdict = self.judge.judge(1, self.challenge, SOLUTION)
+        self.assertFalse(verdict.cached)
+        self.assertEqual(verdict.status, "failed")
+
+    def test_per_user_concurrency_cap(self):
+        judge = self.make_judge(Limits(), max_per_user=1)
+        self.addCleanup(judge.close)
+        cache.set("judge_active:7", 1)
+
+        with self.assertRaises(JudgeBusy):
+            judge.judge(7, self.challenge, SOLUTION)
+        self.assertEqual(cache.get("judge_active:7"), 1)
+
+        self.assertTrue(judge.judge(8, self.challenge, SOLUTION).passed)
+        self.assertEqual(cache.get("judge_active:8"), 0)
+
+
+class ForkServerPoolTests(TestCase):
+    def setUp(self):
+        self.pool = ForkServerPool(size=1, parallelism=2)
+        self.pool.start()
+        self.addCleanup(self.pool.close)
+
+    def test_results_stream_back_as_children_finish(self):
+        order = []
+        results = self.pool.execute_batch(
+            TESTS,
+            ["import time\ntime.sleep(0.5)\n" + SOLUTION, SOLUTION, "pass"],
+            Limits(),
+            on_result=lambda index, result: order.append(index),
+        )
+
+        self.assertEqual(
+            [result.status for result in results], ["passed", "passed", "error"]
+        )
+        self.assertEqual(order[-1], 0)
+        self.assertTrue(all(result.startup_ms >= 0 for result in results))
+
+    def test_dead_fork_server_is_restarted(self):
+        server = self.pool._idle.queue[0]
+        server.process.kill()
+        server.process.wait()
+
+        self.assertEqual(self.pool.execute(SOLUTION, TESTS, Limits()).status, "passed")
+        self.assertTrue(server.alive())
+
+
+class RecordingPool:
+    size = 1
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+
+    def execute_batch(self, test_code, codes, limits, on_result):
+        self.batches.append(list(codes))
+        self.release.wait(5)
+        for index in range(len(codes)):
+            on_result(index, RunResult(status="passed"))
+
+    def close(self):
+        pass
+
+
+class BatchingTests(TestCase):
+    def test_submissions_queued_behind_a_busy_pool_share_one_dispatch(self):
+        pool = RecordingPool()
+        judge = JudgeService(pool=pool, limits=Limits(), max_queue=8, max_per_user=8)
+        self.addCleanup(judge.close)
+        challenge = Challenge(id=1, test_code=TESTS, updated_at=None)
+
+        first = judge._enqueue(challenge, "a")
+        while not pool.batches:
+            time.sleep(0.001)
+        rest = [judge._enqueue(challenge, code) for code in ("b", "c", "d")]
+        pool.release.set()
+
+        self.assertTrue(all(f.result(5).status == "passed" for f in [first, *rest]))
+        self.assertEqual(pool.batches, [["a"], ["b", "c", "d"]])
+
+
+class SubmitEndpointTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="coder", email="c@ex.com")
+        self.client.force_authenticate(user=self.user)
+        Challenge.objects.create(
+            title="Add Ten", slug="add-ten", order=1, xp_reward=50, test_code=TESTS
+        )
+        self.url = reverse("challenge-submit", kwargs={"slug": "add-ten"})
+
+    def test_failing_code_does_not_complete_challenge(self):
+        response = self.client.post(self.url, {"code": "def add_ten(x): return x"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["verdict"]["status"], "failed")
+        self.assertFalse(
+            UserProgress.objects.filter(
+                user=self.user, status=UserProgress.Status.COMPLETED
+            ).exists()
+        )
+
+        response = self.client.post(self.url, {"code": SOLUTION})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "completed")
+
+    def test_busy_judge_returns_429(self):
+        judge = Mock()
+        judge.judge.side_effect = JudgeBusy("busy", retry_after=3)
+        with patch("learning.views.get_judge", return_value=judge):
+            response = self.client.post(self.url, {"code": SOLUTION})
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "3")
@@ -0,0 +1,585 @@
+"""
+Live leaderboard backed by a Redis sorted set.
+
+Every ranked user is a ZSET member whose score packs XP and completed-level
+count into one number, so rank lookups are O(log n) and updates are a single
+atomic ZINCRBY. A companion XP histogram answers percentile queries in
+O(buckets). The periodic rebuild only reconciles drift: updates that land
+while it reads the database are logged and replayed onto the rebuilt set.
+Updates only touch a set that has been built, so one lost to a flush or
+eviction is rebuilt in full rather than recreated from increments alone.
+"""
+
+import logging
+import math
+
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from challenges.models import UserProgress
+from project.caching import run_once
+from project.media import build_file_url
+from users.models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_KEY = "leaderboard:xp"
+HISTOGRAM_KEY = "leaderboard:xp_histogram"
+# Completed-level count occupies the low 16 bits of the score; XP the rest.
+SCORE_SCALE = 1 << 16
+# Members are zero-padded inverted user ids: Redis orders equal scores by
+# member in reverse lexicographic order, which becomes ascending user id.
+MEMBER_BASE = 10**12 - 1
+REBUILD_CHUNK_SIZE = 1000
+REBUILD_LOCK_TIMEOUT = 60 * 5
+# Histogram buckets are quarter-octaves of XP (~19% wide), so a few dozen
+# buckets cover every realistic XP total with bounded percentile error.
+BUCKETS_PER_OCTAVE = 4
+MAX_BUCKET = BUCKETS_PER_OCTAVE * 32
+# Players whose histogram position puts them in the top K get an exact rank.
+EXACT_RANK_TOP_K = 1000
+
+
+def composite_score(xp: int, completed: int) -> int:
+    return max(xp, 0) * SCORE_SCALE + min(max(completed, 0), SCORE_SCALE - 1)
+
+
+def split_score(score: float) -> tuple[int, int]:
+    """Returns ``(xp, completed_levels)`` for a composite score."""
+    return divmod(int(score), SCORE_SCALE)
+
+
+def xp_bucket(xp: int) -> int:
+    if xp <= 0:
+        return 0
+    return min(int(math.log2(xp) * BUCKETS_PER_OCTAVE) + 1, MAX_BUCKET)
+
+
+def bucket_bounds(bucket: int) -> tuple[float, float]:
+    """Returns the ``[lower, upper)`` XP range covered by ``bucket``."""
+    if bucket == 0:
+        return 0.0, 1.0
+    return (
+        2 ** ((bucket - 1) / BUCKETS_PER_OCTAVE),
+        2 ** (bucket / BUCKETS_PER_OCTAVE),
+    )
+
+
+def member_for(user_id: int) -> str:
+    return f"{MEMBER_BASE - user_id:012d}"
+
+
+def pending_key(key: str) -> str:
+    return f"{key}:pending"
+
+
+def built_key(key: str) -> str:
+    return f"{key}:built"
+
+
+def user_id_for(member) -> int:
+    if isinstance(member, bytes):
+        member = member.decode()
+    return MEMBER_BASE - int(member)
+
+
+def _open_pending_log(client, key: str) -> None:
+    """
+    Starts logging increments to ``key`` until the next ``replace``. The log
+    holds a sentinel so it exists while empty; it expires with the rebuild
+    lock if the rebuild dies.
+    """
+    pipe = client.pipeline(transaction=True)
+    pipe.delete(pending_key(key))
+    pipe.rpush(pending_key(key), "")
+    pipe.expire(pending_key(key), REBUILD_LOCK_TIMEOUT)
+    pipe.execute()
+
+
+def _swap_and_replay(client, key: str, staging_key: str, has_items: bool, incr):
+    """
+    Moves ``staging_key`` over ``key``, marks it built and re-applies the
+    logged increments in one transaction; retried if an increment is logged
+    in between.
+    """
+
+    def swap(pipe):
+        logged = pipe.lrange(pending_key(key), 1, -1)
+        pipe.multi()
+        if has_items:
+            pipe.rename(staging_key, key)
+        else:
+            pipe.delete(key)
+        pipe.set(built_key(key), 1)
+        for index in range(0, len(logged), 2):
+            incr(pipe, logged[index], int(logged[index + 1]))
+        pipe.delete(pending_key(key))
+
+    client.transaction(swap, pending_key(key))
+
+
+def _incr_if_built(client, key: str, amounts: dict, incr) -> None:
+    """
+    Applies ``amounts`` to ``key`` only while it is marked built, so updates
+    to a flushed or evicted store cannot recreate it partially. Either way
+    they are logged (RPUSHX) while a rebuild has the pending log open.
+    """
+
+    def apply(pipe):
+        built = pipe.exists(built_key(key))
+        pipe.multi()
+        for member, amount in amounts.items():
+            if built:
+                incr(pipe, member, amount)
+            pipe.rpushx(pending_key(key), member, amount)
+
+    client.transaction(apply, built_key(key))
+
+
+def _log_pending(key: str, amounts: dict) -> None:
+    logged = cache.get(pending_key(key))
+    if logged is not None:
+        logged.extend(amounts.items())
+        cache.set(pending_key(key), logged, timeout=REBUILD_LOCK_TIMEOUT)
+
+
+class RedisSortedSet:
+    """Thin wrapper over the ZSET commands the leaderboard needs."""
+
+    def __init__(self, client, key: str):
+        self.client = client
+        self.key = key
+
+    def incr(self, member: str, amount: int) -> None:
+        self.incr_many({member: amount})
+
+    def incr_many(self, amounts: dict[str, int]) -> None:
+        _incr_if_built(
+            self.client,
+            self.key,
+            amounts,
+            lambda pipe, member, amount: pipe.zincrby(self.key, amount, member),
+        )
+
+    def remove(self, member: str) -> None:
+        self.client.zrem(self.key, member)
+
+    def is_built(self) -> bool:
+        return bool(self.client.exists(built_key(self.key)))
+
+    def rank(self, member: str) -> int | None:
+        return self.client.zrevrank(self.key, member)
+
+    def score(self, member: str) -> float | None:
+        return self.client.zscore(self.key, member)
+
+    def range(self, start: int, stop: int) -> list[tuple[str, float]]:
+        return self.client.zrevrange(self.key, start, stop, withscores=True)
+
+    def count(self) -> int:
+        return self.client.zcard(self.key)
+
+    def begin_rebuild(self) -> None:
+        _open_pending_log(self.client, self.key)
+
+    def replace(self, scores: dict[str, int]) -> None:
+        """
+        Atomically swaps in a freshly built set via RENAME and replays the
+        increments logged since ``begin_rebuild``.
+        """
+        staging_key = f"{self.key}:rebuild"
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(staging_key)
+        items = list(scores.items())
+        for index in range(0, len(items), REBUILD_CHUNK_SIZE):
+            pipe.zadd(staging_key, dict(items[index : index + REBUILD_CHUNK_SIZE]))
+        pipe.execute()
+        _swap_and_replay(
+            self.client,
+            self.key,
+            staging_key,
+            bool(items),
+            lambda pipe, member, amount: pipe.zincrby(self.key, amount, member),
+        )
+
+
+class CacheSortedSet:
+    """
+    Sorted set kept as a dict in the Django cache. Used by the test suite
+    (locmem cache); operations are O(n) and not atomic.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def _load(self) -> dict[str, float]:
+        return cache.get(self.key) or {}
+
+    def _ordered(self) -> list[tuple[str, float]]:
+        return sorted(
+            self._load().items(), key=lambda item: (item[1], item[0]), reverse=True
+        )
+
+    def incr(self, member: str, amount: int) -> None:
+        self.incr_many({member: amount})
+
+    def incr_many(self, amounts: dict[str, int]) -> None:
+        _log_pending(self.key, amounts)
+        scores = cache.get(self.key)
+        if scores is None:
+            return
+        for member, amount in amounts.items():
+            scores[member] = scores.get(member, 0) + amount
+        cache.set(self.key, scores, timeout=None)
+
+    def remove(self, member: str) -> None:
+        scores = cache.get(self.key)
+        if scores is not None:
+            scores.pop(member, None)
+            cache.set(self.key, scores, timeout=None)
+
+    def is_built(self) -> bool:
+        return cache.get(self.key) is not None
+
+    def rank(self, member: str) -> int | None:
+        for index, (candidate, _) in enumerate(self._ordered()):
+            if candidate == member:
+                return index
+        return None
+
+    def score(self, member: str) -> float | None:
+        return self._load().get(member)
+
+    def range(self, start: int, stop: int) -> list[tuple[str, float]]:
+        ordered = self._ordered()
+        return ordered[start : None if stop == -1 else stop + 1]
+
+    def count(self) -> int:
+        return len(self._load())
+
+    def begin_rebuild(self) -> None:
+        cache.set(pending_key(self.key), [], timeout=REBUILD_LOCK_TIMEOUT)
+
+    def replace(self, scores: dict[str, int]) -> None:
+        scores = dict(scores)
+        for member, amount in cache.get(pending_key(self.key)) or []:
+            scores[member] = scores.get(member, 0) + amount
+        cache.set(self.key, scores, timeout=None)
+        cache.delete(pending_key(self.key))
+
+
+class RedisCounterHash:
+    """Redis hash of integer counters (the XP histogram)."""
+
+    def __init__(self, client, key: str):
+        self.client = client
+        self.key = key
+
+    def incr_many(self, amounts: dict[int, int]) -> None:
+        _incr_if_built(
+            self.client,
+            self.key,
+            amounts,
+            lambda pipe, field, amount: pipe.hincrby(self.key, field, amount),
+        )
+
+    def get_all(self) -> dict[int, int]:
+        return {
+            int(field): int(value)
+            for field, value in self.client.hgetall(self.key).items()
+        }
+
+    def begin_rebuild(self) -> None:
+        _open_pending_log(self.client, self.key)
+
+    def replace(self, counts: dict[int, int]) -> None:
+        staging_key = f"{self.key}:rebuild"
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(staging_key)
+        if counts:
+            pipe.hset(staging_key, mapping=counts)
+        pipe.execute()
+        _swap_and_replay(
+            self.client,
+            self.key,
+            staging_key,
+            bool(counts),
+            lambda pipe, field, amount: pipe.hincrby(self.key, field, amount),
+        )
+
+
+class CacheCounterHash:
+    """Counter hash kept as a dict in the Django cache (test suite)."""
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def incr_many(self, amounts: dict[int, int]) -> None:
+        _log_pending(self.key, amounts)
+        counts = cache.get(self.key)
+        if counts is None:
+            return
+        for field, amount in amounts.items():
+            counts[field] = counts.get(field, 0) + amount
+        cache.set(self.key, counts, timeout=None)
+
+    def get_all(self) -> dict[int, int]:
+        return cache.get(self.key) or {}
+
+    def begin_rebuild(self) -> None:
+        cache.set(pending_key(self.key), [], timeout=REBUILD_LOCK_TIMEOUT)
+
+    def replace(self, counts: dict[int, int]) -> None:
+        counts = dict(counts)
+        for field, amount in cache.get(pending_key(self.key)) or []:
+            counts[field] = counts.get(field, 0) + amount
+        cache.set(self.key, counts, timeout=None)
+        cache.delete(pending_key(self.key))
+
+
+_redis_client = None
+
+
+def get_redis_client():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.from_url(settings.LEADERBOARD_REDIS_URL)
+    return _redis_client
+
+
+def get_store(key: str = LEADERBOARD_KEY):
+    if getattr(settings, "LEADERBOARD_STORE", "redis") == "cache":
+        return CacheSortedSet(key)
+    return RedisSortedSet(get_redis_client(), key)
+
+
+def get_histogram(key: str = HISTOGRAM_KEY):
+    if getattr(settings, "LEADERBOARD_STORE", "redis") == "cache":
+        return CacheCounterHash(key)
+    return RedisCounterHash(get_redis_client(), key)
+
+
+class LeaderboardService:
+    """
+    Service layer for the live XP leaderboard.
+    Ordering matches the historical query: XP desc, completed levels desc, id asc.
+    """
+
+    @staticmethod
+    def is_ranked(user) -> bool:
+        return user.is_active and not user.is_staff and not user.is_superuser
+
+    @staticmethod
+    def _apply_after_commit(
+        scores: dict[int, int], buckets: dict[int, int] | None = None
+    ) -> None:
+        def _apply():
+            try:
+                get_store().incr_many(
+                    {member_for(user_id): amount for user_id, amount in scores.items()}
+                )
+                if buckets:
+                    get_histogram().incr_many(buckets)
+            except redis.RedisError as exc:
+                logger.warning("Leaderboard update failed, awaiting rebuild: %s", exc)
+
+        transaction.on_commit(_apply)
+
+    @staticmethod
+    def record_new_player(user) -> None:
+        if LeaderboardService.is_ranked(user):
+            LeaderboardService._apply_after_commit({user.id: 0}, {xp_bucket(0): 1})
+
+    @staticmethod
+    def record_xp_change(user, amount: int, new_total: int) -> None:
+        if not amount or not LeaderboardService.is_ranked(user):
+            return
+        old_bucket, new_bucket = xp_bucket(new_total - amount), xp_bucket(new_total)
+        buckets = {old_bucket: -1, new_bucket: 1} if old_bucket != new_bucket else {}
+        LeaderboardService._apply_after_commit({user.id: amount * SCORE_SCALE}, buckets)
+
+    @staticmethod
+    def record_xp_changes(changes: dict[int, tuple[int, int]]) -> None:
+        """
+        Bulk variant of ``record_xp_change`` for ``{user_id: (amount,
+        new_total)}``: one query picks out the ranked users and the whole
+        batch reaches Redis in a single pipeline after commit.
+        """
+        changes = {user_id: change for user_id, change in changes.items() if change[0]}
+        if not changes:
+            return
+        ranked = get_user_model().objects.filter(
+            id__in=changes, is_active=True, is_staff=False, is_superuser=False
+        )
+        scores: dict[int, int] = {}
+        buckets: dict[int, int] = {}
+        for user_id in ranked.values_list("id", flat=True):
+            amount, new_total = changes[user_id]
+            scores[user_id] = amount * SCORE_SCALE
+            old_bucket, new_bucket = xp_bucket(new_total - amount), xp_bucket(new_total)
+            if old_bucket != new_bucket:
+                buckets[old_bucket] = buckets.get(old_bucket, 0) - 1
+                buckets[new_bucket] = buckets.get(new_bucket, 0) + 1
+        if scores:
+            LeaderboardService._apply_after_commit(scores, buckets)
+
+    @staticmethod
+    def record_completion(user) -> None:
+        if LeaderboardService.is_ranked(user):
+            LeaderboardService._apply_after_commit({user.id: 1})
+
+    @staticmethod
+    def rebuild() -> int:
+        """
+        Recomputes every ranked user's score from the database and swaps the
+        set in one step. Reconciles any drift from missed incremental updates;
+        increments applied while the database is read are replayed on top
+        (one committed just before the read starts can be counted twice, until
+        the next rebuild).
+        """
+        store, histogram = get_store(), get_histogram()
+        store.begin_rebuild()
+        histogram.begin_rebuild()
+        User = get_user_model()
+        rows = (
+            User.objects.filter(is_active=True, is_staff=False, is_superuser=False)
+            .annotate(
+                completed_count=Count(
+                    "challenge_progress",
+                    filter=Q(challenge_progress__status=UserProgress.Status.COMPLETED),
+                )
+            )
+            .values_list("id", "profile__xp", "completed_count")
+        )
+        scores = {}
+        buckets: dict[int, int] = {}
+        for user_id, xp, completed in rows.iterator(chunk_size=REBUILD_CHUNK_SIZE):
+            scores[member_for(user_id)] = composite_score(xp or 0, completed)
+            bucket = xp_bucket(xp or 0)
+            buckets[bucket] = buckets.get(bucket, 0) + 1
+        store.replace(scores)
+        histogram.replace(buckets)
+        return len(scores)
+
+    @staticmethod
+    def ensure_built() -> None:
+        """
+        Cold-start rebuild. Only one worker rebuilds; the others wait for it
+        instead of each running the full aggregate.
+        """
+        if not get_store().is_built():
+            run_once(
+                LEADERBOARD_KEY,
+                LeaderboardService.rebuild,
+                timeout=REBUILD_LOCK_TIMEOUT,
+                wait=True,
+            )
+
+    @staticmethod
+    def total() -> int:
+        return get_store().count()
+
+    @staticmethod
+    def _hydrate(rows, first_rank: int) -> list[dict[str, object]]:
+        User = get_user_model()
+        user_ids = [user_id_for(member) for member, _ in rows]
+        users = User.objects.select_related("profile").in_bulk(user_ids)
+
+        entries = []
+        for position, (member, score) in enumerate(rows):
+            user = users.get(user_id_for(member))
+            if user is None:
+                continue
+            try:
+                avatar_url = build_file_url(user.profile.avatar, rendition="thumb")
+            except UserProfile.DoesNotExist:
+                avatar_url = None
+            xp, completed = split_score(score)
+            entries.append(
+                {
+                    "rank": first_rank + position,
+                    "username": user.username,
+                    "avatar": avatar_url,
+                    "completed_levels": completed,
+                    "xp": xp,
+                }
+            )
+        return entries
+
+    @staticmethod
+    def get_page(offset: int = 0, limit: int = 100) -> list[dict[str, object]]:
+        rows = get_store().range(offset, offset + limit - 1)
+        return LeaderboardService._hydrate(rows, first_rank=offset + 1)
+
+    @staticmethod
+    def get_standing(user_id: int) -> dict[str, int] | None:
+        store = get_store()
+        member = member_for(user_id)
+        rank = store.rank(member)
+        if rank is None:
+            return None
+        xp, completed = split_score(store.score(member) or 0)
+        return {"rank": rank + 1, "xp": xp, "completed_levels": completed}
+
+    @staticmethod
+    def get_around(user_id: int, radius: int = 5) -> list[dict[str, object]]:
+        rank = get_store().rank(member_for(user_id))
+        if rank is None:
+            return []
+        start = max(rank - radius, 0)
+        rows = get_store().range(start, rank + radius)
+        return LeaderboardService._hydrate(rows, first_rank=start + 1)
+
+    @staticmethod
+    def get_rank_summary(user) -> dict[str, object] | None:
+        """
+        Rank and percentile for ``user`` from the XP histogram.
+
+        Reads only Redis: the histogram gives the number of players above in
+        O(buckets); players that may be in the top ``EXACT_RANK_TOP_K`` get an
+        exact ZSET rank, everyone else an interpolated estimate. Returns
+        ``None`` for unranked users or before the first rebuild.
+        """
+        if not LeaderboardService.is_ranked(user):
+            return None
+        try:
+            return LeaderboardService._rank_summary(user)
+        except redis.RedisError as exc:
+            logger.warning("Rank lookup failed for user %s: %s", user.id, exc)
+            return None
+
+    @staticmethod
+    def _rank_summary(user) -> dict[str, object] | None:
+        counts = get_histogram().get_all()
+        total = sum(max(count, 0) for count in counts.values())
+        if not total:
+            return None
+
+        xp = user.profile.xp
+        bucket = xp_bucket(xp)
+        higher = sum(max(count, 0) for field, count in counts.items() if field > bucket)
+        in_bucket = max(counts.get(bucket, 0), 0)
+
+        if higher + in_bucket <= EXACT_RANK_TOP_K:
+            rank = get_store().rank(member_for(user.id))
+            if rank is not None:
+                return {
+                    "rank": rank + 1,
+                    "percentile": round(100 * (total - rank) / total, 1),
+                    "exact": True,
+                    "total_players": total,
+                }
+
+        lower, upper = bucket_bounds(bucket)
+        share_above = min(max((upper - xp) / (upper - lower), 0.0), 1.0)
+        above = min(higher + int(in_bucket * share_above), total - 1)
+        return {
+            "rank": above + 1,
+            "percentile": round(100 * (total - above) / total, 1),
+            "exact": False,
+            "total_players": total,
+        }
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from challenges.signals import challenge_content_changed
+from users.models import UserProfile
+from .leaderboard import LeaderboardService
+from .tasks import invalidate_ai_context
+
+
+@receiver(post_save, sender=UserProfile)
+def add_new_player_to_leaderboard(sender, instance, created, **kwargs):
+    _ = sender, kwargs
+    if created:
+        LeaderboardService.record_new_player(instance.user)
+
+
+@receiver(challenge_content_changed)
+def drop_stale_ai_context(sender, challenge_ids, **kwargs):
+    _ = sender, kwargs
+    invalidate_ai_context(challenge_ids)
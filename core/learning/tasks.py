@@ -3,22 +3,47 @@ import logging
 import os
 import time
 from hashlib import sha256
+from uuid import uuid4
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from celery import shared_task
-from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.core.cache import cache
-from django.db.models import Count, Q
+from django.utils import timezone
 
-from challenges.models import UserProgress
-from users.models import UserProfile
+from notifications.utils import notify_via_ws
+from project.caching import get_marker_store
+from project.task_results import EphemeralResultTask
+from .leaderboard import LeaderboardService
 
 logger = logging.getLogger(__name__)
-LEADERBOARD_CACHE_KEY = "leaderboard_data"
-LEADERBOARD_CACHE_TIMEOUT = 60 * 10
 AI_HINT_CACHE_TIMEOUT = 60 * 60 * 24 * 30
 AI_ANALYSIS_CACHE_TIMEOUT = 60 * 60
+# Upper bound for an in-flight marker; matches the slowest AI request timeout
+# so a crashed worker can never block a key for longer than one attempt.
+AI_INFLIGHT_TIMEOUT = 90
+AI_TASK_STATE_TIMEOUT = 60 * 10
+
+
+_ai_session: requests.Session | None = None
+
+
+def get_ai_session() -> requests.Session:
+    """
+    Process-wide HTTP session for AI service calls. Keeps connections alive
+    across tasks; sized for the gevent pool of the dedicated AI worker.
+    """
+    global _ai_session
+    if _ai_session is None:
+        pool_size = getattr(settings, "AI_HTTP_POOL_SIZE", 10)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _ai_session = session
+    return _ai_session
 
 
 def _build_internal_headers(path: str) -> dict[str, str]:
@@ -39,69 +64,137 @@ def _build_internal_headers(path: str) -> dict[str, str]:
     return headers
 
 
+def _ai_context_version_key(challenge_id: int) -> str:
+    return f"ai_context_version:{challenge_id}"
+
+
+def ai_context_version(challenge_id: int) -> str:
+    """
+    Version token of a challenge's text. Part of every AI cache key so hints
+    and analyses written against old level text are never served again.
+    """
+    return cache.get(_ai_context_version_key(challenge_id)) or "0"
+
+
+def invalidate_ai_context(challenge_ids) -> None:
+    version = uuid4().hex[:12]
+    cache.set_many(
+        {
+            _ai_context_version_key(challenge_id): version
+            for challenge_id in challenge_ids
+        },
+        timeout=None,
+    )
+
+
+def ai_hint_cache_key(user_id: int, challenge_id: int, hint_level: int) -> str:
+    version = ai_context_version(challenge_id)
+    return f"ai_hint:{user_id}:{challenge_id}:{version}:level:{hint_level}"
+
+
 def _analysis_cache_key(challenge_id: int, user_code: str) -> str:
     code_hash = sha256((user_code or "").encode("utf-8")).hexdigest()
-    return f"ai_analysis:{challenge_id}:{code_hash}"
-
-
-def build_leaderboard_data(limit: int = 100) -> list[dict[str, object]]:
-    User = get_user_model()
-    users = (
-        User.objects.annotate(
-            completed_count=Count(
-                "challenge_progress",
-                filter=Q(
-                    challenge_progress__status=UserProgress.Status.COMPLETED,
-                ),
-            )
-        )
-        .select_related("profile")
-        .filter(is_active=True, is_staff=False, is_superuser=False)
-        .order_by("-profile__xp", "-completed_count", "id")[:limit]
-    )
+    version = ai_context_version(challenge_id)
+    return f"ai_analysis:{challenge_id}:{version}:{code_hash}"
+
+
+def inflight_cache_key(result_cache_key: str) -> str:
+    """
+    Single-flight marker for an AI result cache key. Holds the id of the task
+    currently computing that result so duplicate requests can attach to it.
+    """
+    return f"{result_cache_key}:inflight"
+
+
+def ai_task_state_key(task_id: str) -> str:
+    return f"ai_task_state:{task_id}"
 
-    data = []
-    for user in users:
-        try:
-            profile = user.profile
-            avatar_url = profile.avatar.url if profile.avatar else None
-            xp = profile.xp
-        except UserProfile.DoesNotExist:
-            avatar_url = None
-            xp = 0
-
-        data.append(
-            {
-                "username": user.username,
-                "avatar": avatar_url,
-                "completed_levels": user.completed_count,
-                "xp": xp,
-            }
-        )
-    return data
 
+def _ai_task_subscribers_key(task_id: str) -> str:
+    return f"ai_task_subscribers:{task_id}"
 
-@shared_task
+
+def set_ai_task_state(task_id: str | None, state: dict) -> None:
+    """
+    Short-lived task status/result kept in Redis so status polls never have to
+    touch the Celery result backend.
+    """
+    if task_id:
+        cache.set(ai_task_state_key(task_id), state, timeout=AI_TASK_STATE_TIMEOUT)
+
+
+def add_ai_task_subscriber(task_id: str, user_id: int) -> None:
+    """
+    Registers a user to be notified when the task completes. Each subscriber
+    gets its own slot from an atomic counter so concurrent attaches never
+    overwrite each other.
+    """
+    counter_key = _ai_task_subscribers_key(task_id)
+    cache.add(counter_key, 0, timeout=AI_TASK_STATE_TIMEOUT)
+    slot = cache.incr(counter_key)
+    cache.set(f"{counter_key}:{slot}", user_id, timeout=AI_TASK_STATE_TIMEOUT)
+
+
+def _pop_ai_task_subscribers(task_id: str) -> set[int]:
+    counter_key = _ai_task_subscribers_key(task_id)
+    slot_count = cache.get(counter_key) or 0
+    slot_keys = [f"{counter_key}:{slot}" for slot in range(1, slot_count + 1)]
+    subscribers = set(cache.get_many(slot_keys).values())
+    cache.delete_many([counter_key, *slot_keys])
+    return subscribers
+
+
+def complete_ai_task(task_id: str | None, task_type: str, result: dict) -> None:
+    """
+    Stores the final task state and pushes it to every subscribed user's
+    notifications channel, which the chat service relays over
+    /ws/notifications.
+    """
+    if not task_id:
+        return
+
+    state = {
+        "status": "success" if result.get("ok") else "failed",
+        "date_done": timezone.now().isoformat(),
+    }
+    if result.get("ok"):
+        state["result"] = result.get("payload", {})
+    else:
+        state["error"] = result.get("error", "AI task failed")
+    set_ai_task_state(task_id, state)
+
+    message = {
+        "type": "ai_task_completed",
+        "task_id": task_id,
+        "task_type": task_type,
+        **state,
+    }
+    for user_id in _pop_ai_task_subscribers(task_id):
+        notify_via_ws(user_id, message)
+
+
+@shared_task(base=EphemeralResultTask)
 def update_leaderboard_cache():
     """
-    Periodic task to calculate and cache the leaderboard.
-    Returns a summary dict stored in the Celery result backend.
+    Periodic reconciliation of the live leaderboard.
+    Incremental updates keep the sorted set current; this rebuild only
+    repairs drift (missed updates, direct profile edits, deactivated users).
     """
-    logger.info("Starting leaderboard calculation task...")
+    logger.info("Starting leaderboard reconciliation task...")
 
     try:
-        data = build_leaderboard_data()
-        cache.set(LEADERBOARD_CACHE_KEY, data, timeout=LEADERBOARD_CACHE_TIMEOUT)
-        logger.info("Leaderboard updated successfully.")
-        return {"status": "success", "entries": len(data)}
+        entries = LeaderboardService.rebuild()
+        logger.info("Leaderboard rebuilt with %s entries.", entries)
+        return {"status": "success", "entries": entries}
 
     except Exception as e:
         logger.exception("Leaderboard task failed: %s", str(e))
         return {"status": "error", "error": str(e)}
 
 
-@shared_task
+@shared_task(bind=True, base=EphemeralResultTask)
 def generate_ai_hint_task(
+    self,
     user_id: int,
     challenge_id: int,
     challenge_slug: str,
@@ -117,36 +210,47 @@ def generate_ai_hint_task(
         "user_xp": user_xp,
     }
     headers = _build_internal_headers("/hints")
-    cache_key = f"ai_hint:{user_id}:{challenge_id}:level:{hint_level}"
+    cache_key = ai_hint_cache_key(user_id, challenge_id, hint_level)
+    set_ai_task_state(self.request.id, {"status": "running"})
 
     try:
-        resp = requests.post(
+        resp = get_ai_session().post(
             f"{ai_url}/hints",
             json=payload,
             headers=headers,
             timeout=30,
         )
         if resp.status_code != 200:
-            return {
+            result = {
                 "ok": False,
                 "error": "AI Service Error",
                 "status_code": resp.status_code,
             }
-
-        body = resp.json()
-        hint_text = body.get("hint")
-        if isinstance(hint_text, str) and hint_text.strip():
-            cache.set(cache_key, hint_text, timeout=AI_HINT_CACHE_TIMEOUT)
-        body.setdefault("hint_level", hint_level)
-        body.setdefault("max_hints", 3)
-        return {"ok": True, "payload": body}
+        else:
+            body = resp.json()
+            hint_text = body.get("hint")
+            if isinstance(hint_text, str) and hint_text.strip():
+                cache.set(cache_key, hint_text, timeout=AI_HINT_CACHE_TIMEOUT)
+            body.setdefault("hint_level", hint_level)
+            body.setdefault("max_hints", 3)
+            result = {"ok": True, "payload": body}
     except requests.exceptions.RequestException as exc:
         logger.error("AI hint task failed: %s", exc)
-        return {"ok": False, "error": "AI Service Unavailable", "status_code": 503}
+        result = {"ok": False, "error": "AI Service Unavailable", "status_code": 503}
+    finally:
+        # A newer request may own the marker if this task outlived it.
+        get_marker_store().delete_if_equal(
+            inflight_cache_key(cache_key), self.request.id
+        )
+
+    complete_ai_task(self.request.id, "hint", result)
+    return result
 
 
-@shared_task
-def generate_ai_analysis_task(challenge_id: int, challenge_slug: str, user_code: str):
+@shared_task(bind=True, base=EphemeralResultTask)
+def generate_ai_analysis_task(
+    self, challenge_id: int, challenge_slug: str, user_code: str
+):
     ai_url = os.getenv("AI_SERVICE_URL", "http://ai:8002")
     payload = {
         "user_code": user_code or "",
@@ -154,24 +258,33 @@ def generate_ai_analysis_task(challenge_id: int, challenge_slug: str, user_code:
     }
     headers = _build_internal_headers("/analyze")
     cache_key = _analysis_cache_key(challenge_id, user_code)
+    set_ai_task_state(self.request.id, {"status": "running"})
 
     try:
-        resp = requests.post(
+        resp = get_ai_session().post(
             f"{ai_url}/analyze",
             json=payload,
             headers=headers,
             timeout=60,
         )
         if resp.status_code != 200:
-            return {
+            result = {
                 "ok": False,
                 "error": "AI Service Error",
                 "status_code": resp.status_code,
             }
-
-        body = resp.json()
-        cache.set(cache_key, body, timeout=AI_ANALYSIS_CACHE_TIMEOUT)
-        return {"ok": True, "payload": body}
+        else:
+            body = resp.json()
+            cache.set(cache_key, body, timeout=AI_ANALYSIS_CACHE_TIMEOUT)
+            result = {"ok": True, "payload": body}
     except requests.exceptions.RequestException as exc:
         logger.error("AI analysis task failed: %s", exc)
-        return {"ok": False, "error": "AI Service Unavailable", "status_code": 503}
+        result = {"ok": False, "error": "AI Service Unavailable", "status_code": 503}
+    finally:
+        # A newer request may own the marker if this task outlived it.
+        get_marker_store().delete_if_equal(
+            inflight_cache_key(cache_key), self.request.id
+        )
+
+    complete_ai_task(self.request.id, "analysis", result)
+    return result
@@ -0,0 +1,230 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from challenges.models import Challenge, UserProgress
+from challenges.services import ChallengeService
+from learning import leaderboard
+from learning.leaderboard import (
+    LeaderboardService,
+    bucket_bounds,
+    composite_score,
+    get_histogram,
+    member_for,
+    split_score,
+    user_id_for,
+    xp_bucket,
+)
+from xpoint.services import XPService
+
+
+class LeaderboardScoreTests(APITestCase):
+    def test_composite_score_round_trip(self):
+        self.assertEqual(split_score(composite_score(1234, 7)), (1234, 7))
+
+    def test_member_round_trip_and_tie_order(self):
+        self.assertEqual(user_id_for(member_for(42)), 42)
+        # Reverse lexicographic member order must yield ascending user id.
+        self.assertGreater(member_for(1), member_for(2))
+
+    def test_xp_bucket_contains_xp(self):
+        for xp in (0, 1, 7, 100, 1234, 99999):
+            lower, upper = bucket_bounds(xp_bucket(xp))
+            self.assertLessEqual(lower, xp)
+            self.assertLess(xp, upper)
+
+
+class LeaderboardServiceTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create_user(username=f"p{i}", email=f"p{i}@ex.com")
+            for i in range(5)
+        ]
+        for index, user in enumerate(self.users):
+            user.profile.xp = index * 100
+            user.profile.save(update_fields=["xp"])
+        self.staff = User.objects.create_user(
+            username="staff", email="staff@ex.com", is_staff=True
+        )
+        LeaderboardService.rebuild()
+        self.client.force_authenticate(user=self.users[0])
+
+    def test_rebuild_excludes_staff_and_orders_by_xp(self):
+        page = LeaderboardService.get_page()
+        self.assertEqual(
+            [entry["username"] for entry in page], ["p4", "p3", "p2", "p1", "p0"]
+        )
+        self.assertEqual([entry["rank"] for entry in page], [1, 2, 3, 4, 5])
+
+    def test_xp_change_updates_rank_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            XPService.add_xp(self.users[0], 1000, source="test")
+
+        standing = LeaderboardService.get_standing(self.users[0].id)
+        self.assertEqual(standing, {"rank": 1, "xp": 1000, "completed_levels": 0})
+
+    def test_completion_breaks_xp_ties(self):
+        challenge = Challenge.objects.create(
+            title="C1", slug="c1", order=1, xp_reward=100
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            ChallengeService.process_submission(self.users[3], challenge, passed=True)
+
+        page = LeaderboardService.get_page(limit=2)
+        # p3 now has 400 XP like p4 but one more completed level.
+        self.assertEqual(page[0]["username"], "p3")
+        self.assertEqual(page[0]["completed_levels"], 1)
+        self.assertEqual(
+            UserProgress.objects.get(user=self.users[3]).status,
+            UserProgress.Status.COMPLETED,
+        )
+
+    def test_equal_scores_order_by_id(self):
+        self.users[2].profile.xp = 400
+        self.users[2].profile.save(update_fields=["xp"])
+        LeaderboardService.rebuild()
+
+        page = LeaderboardService.get_page(limit=2)
+        self.assertEqual([entry["username"] for entry in page], ["p2", "p4"])
+
+    def test_increments_during_a_rebuild_are_replayed(self):
+        player = self.users[1]
+        score = leaderboard.composite_score
+        granted = []
+
+        def score_then_grant(xp, completed):
+            # An XP grant committed after the rebuild read the database.
+            if not granted:
+                granted.append(True)
+                with self.captureOnCommitCallbacks(execute=True):
+                    LeaderboardService.record_xp_change(player, 50, 150)
+            return score(xp, completed)
+
+        with patch.object(leaderboard, "composite_score", score_then_grant):
+            LeaderboardService.rebuild()
+
+        self.assertEqual(LeaderboardService.get_standing(player.id)["xp"], 150)
+        counts = get_histogram().get_all()
+        self.assertEqual((counts[xp_bucket(100)], counts[xp_bucket(150)]), (0, 1))
+
+    def test_empty_leaderboard_is_built_once(self):
+        User.objects.update(is_active=False)
+        cache.clear()
+        LeaderboardService.ensure_built()
+
+        with patch.object(LeaderboardService, "rebuild") as rebuild:
+            LeaderboardService.ensure_built()
+
+        rebuild.assert_not_called()
+        self.assertEqual(LeaderboardService.total(), 0)
+
+    def test_updates_to_a_flushed_board_trigger_a_full_rebuild(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            XPService.add_xp(self.users[0], 1000, source="test")
+
+        self.assertFalse(leaderboard.get_store().is_built())
+        with patch.object(
+            LeaderboardService, "rebuild", wraps=LeaderboardService.rebuild
+        ) as rebuild:
+            LeaderboardService.ensure_built()
+        rebuild.assert_called_once()
+
+        self.assertEqual(LeaderboardService.total(), 5)
+        standing = LeaderboardService.get_standing(self.users[0].id)
+        self.assertEqual(standing, {"rank": 1, "xp": 1000, "completed_levels": 0})
+
+    def test_view_paginates(self):
+        response = self.client.get(reverse("leaderboard"), {"offset": 3, "limit": 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["username"], "p1")
+        self.assertEqual(response.data[0]["rank"], 4)
+
+    def test_standing_view_returns_rank_and_window(self):
+        self.client.force_authenticate(user=self.users[2])
+        response = self.client.get(reverse("leaderboard-standing"), {"radius": 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["rank"], 3)
+        self.assertEqual(response.data["total_players"], 5)
+        self.assertEqual(
+            [entry["username"] for entry in response.data["around"]],
+            ["p3", "p2", "p1"],
+        )
+
+    def test_standing_view_for_unranked_user(self):
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get(reverse("leaderboard-standing"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["rank"])
+        self.assertEqual(response.data["around"], [])
+
+
+class RankSummaryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = []
+        for index in range(10):
+            user = User.objects.create_user(
+                username=f"r{index}", email=f"r{index}@ex.com"
+            )
+            user.profile.xp = index * 100
+            user.profile.save(update_fields=["xp"])
+            self.users.append(user)
+        LeaderboardService.rebuild()
+
+    def test_top_players_get_exact_rank(self):
+        summary = LeaderboardService.get_rank_summary(self.users[7])
+
+        self.assertEqual(
+            summary,
+            {"rank": 3, "percentile": 80.0, "exact": True, "total_players": 10},
+        )
+
+    def test_other_players_get_histogram_estimate(self):
+        with patch("learning.leaderboard.EXACT_RANK_TOP_K", 0):
+            summary = LeaderboardService.get_rank_summary(self.users[7])
+
+        self.assertFalse(summary["exact"])
+        self.assertEqual(summary["total_players"], 10)
+        self.assertLessEqual(abs(summary["rank"] - 3), 1)
+
+    def test_rank_summary_reads_no_database(self):
+        user = User.objects.select_related("profile").get(pk=self.users[4].pk)
+        with self.assertNumQueries(0):
+            LeaderboardService.get_rank_summary(user)
+
+    def test_xp_change_moves_histogram_bucket(self):
+        before = get_histogram().get_all()
+        with self.captureOnCommitCallbacks(execute=True):
+            XPService.add_xp(self.users[1], 5000, source="test")
+
+        after = get_histogram().get_all()
+        self.assertEqual(after[xp_bucket(100)], before[xp_bucket(100)] - 1)
+        self.assertEqual(after[xp_bucket(5100)], before.get(xp_bucket(5100), 0) + 1)
+
+    def test_new_player_joins_histogram(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(username="fresh", email="fresh@ex.com")
+
+        self.assertEqual(sum(get_histogram().get_all().values()), 11)
+        self.assertEqual(LeaderboardService.total(), 11)
+
+    def test_rank_endpoint_and_current_user_embed(self):
+        self.client.force_authenticate(user=self.users[9])
+
+        response = self.client.get(reverse("leaderboard-rank"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["rank"], 1)
+
+        response = self.client.get(reverse("get_current_user"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["rank"]["rank"], 1)
@@ -1,8 +1,11 @@
+from django.conf import settings
 from django.test import TestCase
 from django.contrib.auth.models import User
 from django.core.cache import cache
 from challenges.models import Challenge, UserProgress
-from learning.tasks import update_leaderboard_cache
+from learning.leaderboard import LeaderboardService
+from learning.tasks import get_ai_session, update_leaderboard_cache
+from project.queue_metrics import get_wait_metrics, record_wait_sample
 
 
 class LearningTaskTests(TestCase):
@@ -31,8 +34,7 @@ class LearningTaskTests(TestCase):
         # Run the task synchronously
         update_leaderboard_cache()
 
-        leaderboard_data = cache.get("leaderboard_data")
-        self.assertIsNotNone(leaderboard_data)
+        leaderboard_data = LeaderboardService.get_page()
         self.assertEqual(len(leaderboard_data), 2)
 
         # user1 should be first (2 completions)
@@ -42,3 +44,32 @@ class LearningTaskTests(TestCase):
         # user2 should be second (1 completion)
         self.assertEqual(leaderboard_data[1]["username"], "user2")
         self.assertEqual(leaderboard_data[1]["completed_levels"], 1)
+
+
+class AITaskQueueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_ai_tasks_are_routed_to_dedicated_queue(self):
+        from project.celery import app
+
+        for task_name in (
+            "learning.tasks.generate_ai_hint_task",
+            "learning.tasks.generate_ai_analysis_task",
+        ):
+            route = app.amqp.router.route({}, task_name)
+            self.assertEqual(route["queue"].name, settings.AI_TASK_QUEUE)
+
+    def test_ai_session_is_shared(self):
+        self.assertIs(get_ai_session(), get_ai_session())
+
+    def test_wait_metrics_aggregate_samples(self):
+        record_wait_sample("ai", 100)
+        record_wait_sample("ai", 300)
+
+        metrics = get_wait_metrics("ai")
+        self.assertEqual(metrics["samples"], 2)
+        self.assertEqual(metrics["avg_wait_ms"], 200.0)
+        self.assertEqual(metrics["last_wait_ms"], 300)
+        self.assertEqual(metrics["max_wait_ms"], 300)
+        self.assertIsNone(get_wait_metrics("celery")["avg_wait_ms"])
@@ -1,9 +1,21 @@
 import os
+from unittest.mock import MagicMock, patch
+
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from rest_framework import status
 from rest_framework.test import APITestCase
-from challenges.models import Challenge
+from challenges.models import Challenge, UserProgress
+from learning.tasks import (
+    add_ai_task_subscriber,
+    ai_hint_cache_key,
+    complete_ai_task,
+    generate_ai_analysis_task,
+    inflight_cache_key,
+    set_ai_task_state,
+)
+from learning.views import _analysis_cache_key
 
 
 class LearningViewTests(APITestCase):
@@ -68,3 +80,166 @@ class LearningViewTests(APITestCase):
         data = {"title": "New"}
         response = self.client.post(url, data, format="json")
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class AIRequestCoalescingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="coder", password="password")
+        self.other_user = User.objects.create_user(
+            username="classmate", password="password"
+        )
+        self.challenge = Challenge.objects.create(
+            title="L1", slug="l1", order=1, description="D", test_code="t"
+        )
+        self.url = reverse("challenge-ai-analyze", kwargs={"slug": "l1"})
+
+    @patch("learning.views.generate_ai_analysis_task.apply_async")
+    def test_duplicate_analysis_attaches_to_inflight_task(self, mock_apply):
+        marker = inflight_cache_key(_analysis_cache_key(self.challenge.id, "x = 1"))
+        cache.set(marker, "existing-task-id")
+
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.post(self.url, {"user_code": "x = 1"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["task_id"], "existing-task-id")
+        self.assertTrue(response.data["coalesced"])
+        mock_apply.assert_not_called()
+
+        status_url = reverse(
+            "challenge-ai-task-status", kwargs={"task_id": "existing-task-id"}
+        )
+        self.assertEqual(self.client.get(status_url).status_code, status.HTTP_200_OK)
+
+    @patch("learning.views.generate_ai_analysis_task.apply_async")
+    def test_first_analysis_claims_marker_with_task_id(self, mock_apply):
+        mock_apply.side_effect = lambda kwargs, task_id: MagicMock(id=task_id)
+
+        self.client.force_authenticate(user=self.user)
+        with self.settings(CELERY_TASK_ALWAYS_EAGER=False):
+            first = self.client.post(self.url, {"user_code": "x = 2"}, format="json")
+            second = self.client.post(self.url, {"user_code": "x = 2"}, format="json")
+
+        self.assertEqual(mock_apply.call_count, 1)
+        self.assertFalse(first.data["coalesced"])
+        self.assertTrue(second.data["coalesced"])
+        self.assertEqual(first.data["task_id"], second.data["task_id"])
+        marker = inflight_cache_key(_analysis_cache_key(self.challenge.id, "x = 2"))
+        self.assertEqual(cache.get(marker), first.data["task_id"])
+
+    @patch("learning.tasks.notify_via_ws")
+    @patch("learning.tasks.get_ai_session")
+    def test_completed_task_releases_marker(self, mock_session, mock_notify):
+        mock_session.return_value.post.return_value = MagicMock(
+            status_code=200, json=lambda: {"review": "Findings"}
+        )
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.url, {"user_code": "x = 3"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        marker = inflight_cache_key(_analysis_cache_key(self.challenge.id, "x = 3"))
+        self.assertIsNone(cache.get(marker))
+
+    @patch("learning.tasks.notify_via_ws")
+    @patch("learning.tasks.get_ai_session")
+    def test_stale_task_keeps_a_newer_marker(self, mock_session, mock_notify):
+        mock_session.return_value.post.return_value = MagicMock(
+            status_code=200, json=lambda: {"review": "Findings"}
+        )
+        # The old task outlived its marker and a newer request claimed it.
+        marker = inflight_cache_key(_analysis_cache_key(self.challenge.id, "x = 4"))
+        cache.set(marker, "newer-task-id")
+
+        generate_ai_analysis_task.apply(
+            kwargs={
+                "challenge_id": self.challenge.id,
+                "challenge_slug": "l1",
+                "user_code": "x = 4",
+            },
+            task_id="old-task-id",
+        )
+
+        self.assertEqual(cache.get(marker), "newer-task-id")
+
+    @patch("learning.views.generate_ai_hint_task.apply_async")
+    def test_uncached_hint_is_queued(self, mock_apply):
+        mock_apply.side_effect = lambda kwargs, task_id: MagicMock(id=task_id)
+        UserProgress.objects.create(
+            user=self.user, challenge=self.challenge, ai_hints_purchased=1
+        )
+
+        self.client.force_authenticate(user=self.user)
+        url = reverse("challenge-ai-hint", kwargs={"slug": "l1"})
+        with self.settings(CELERY_TASK_ALWAYS_EAGER=False):
+            response = self.client.post(url, {"hint_level": 1}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(response.data["coalesced"])
+        self.assertEqual(mock_apply.call_args.kwargs["kwargs"]["hint_level"], 1)
+        marker = inflight_cache_key(
+            ai_hint_cache_key(self.user.id, self.challenge.id, 1)
+        )
+        self.assertEqual(cache.get(marker), response.data["task_id"])
+
+
+class AITaskCompletionPushTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="coder", password="password")
+        self.other_user = User.objects.create_user(
+            username="classmate", password="password"
+        )
+        Challenge.objects.create(title="L1", slug="l1", order=1, test_code="t")
+
+    @patch("learning.tasks.notify_via_ws")
+    def test_completion_is_pushed_to_every_subscriber(self, mock_notify):
+        add_ai_task_subscriber("task-1", self.user.id)
+        add_ai_task_subscriber("task-1", self.other_user.id)
+
+        complete_ai_task("task-1", "analysis", {"ok": True, "payload": {"review": "R"}})
+
+        notified = {call.args[0] for call in mock_notify.call_args_list}
+        self.assertEqual(notified, {self.user.id, self.other_user.id})
+        message = mock_notify.call_args_list[0].args[1]
+        self.assertEqual(message["type"], "ai_task_completed")
+        self.assertEqual(message["task_id"], "task-1")
+        self.assertEqual(message["status"], "success")
+        self.assertEqual(message["result"], {"review": "R"})
+
+    @patch("learning.tasks.notify_via_ws")
+    @patch("learning.tasks.get_ai_session")
+    def test_eager_analysis_notifies_requesting_user(self, mock_session, mock_notify):
+        mock_session.return_value.post.return_value = MagicMock(
+            status_code=200, json=lambda: {"review": "Findings"}
+        )
+
+        self.client.force_authenticate(user=self.user)
+        url = reverse("challenge-ai-analyze", kwargs={"slug": "l1"})
+        self.client.post(url, {"user_code": "y = 1"}, format="json")
+
+        mock_notify.assert_called_once()
+        self.assertEqual(mock_notify.call_args.args[0], self.user.id)
+
+    @patch("learning.views.AsyncResult")
+    def test_status_poll_is_served_from_cached_state(self, mock_async_result):
+        self.client.force_authenticate(user=self.user)
+        with self.settings(CELERY_TASK_ALWAYS_EAGER=False), patch(
+            "learning.views.generate_ai_analysis_task.apply_async"
+        ) as mock_apply:
+            mock_apply.side_effect = lambda kwargs, task_id: MagicMock(id=task_id)
+            url = reverse("challenge-ai-analyze", kwargs={"slug": "l1"})
+            task_id = self.client.post(url, {"user_code": "z"}, format="json").data[
+                "task_id"
+            ]
+
+        status_url = reverse("challenge-ai-task-status", kwargs={"task_id": task_id})
+        queued = self.client.get(status_url)
+        self.assertEqual(queued.data["status"], "queued")
+
+        set_ai_task_state(task_id, {"status": "success", "result": {"review": "R"}})
+        done = self.client.get(status_url)
+        self.assertEqual(done.data["status"], "success")
+        self.assertEqual(done.data["result"], {"review": "R"})
+        mock_async_result.assert_not_called()
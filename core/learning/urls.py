@@ -1,12 +1,27 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import ChallengeViewSet, LeaderboardView
+from .views import (
+    ChallengeViewSet,
+    LeaderboardRankView,
+    LeaderboardStandingView,
+    LeaderboardView,
+)
 
 router = DefaultRouter()
 router.register(r"challenges", ChallengeViewSet, basename="challenge")
 
 urlpatterns = [
     path("challenges/leaderboard/", LeaderboardView.as_view(), name="leaderboard"),
+    path(
+        "challenges/leaderboard/me/",
+        LeaderboardStandingView.as_view(),
+        name="leaderboard-standing",
+    ),
+    path(
+        "challenges/leaderboard/rank/",
+        LeaderboardRankView.as_view(),
+        name="leaderboard-rank",
+    ),
     path("", include(router.urls)),
 ]
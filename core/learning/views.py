@@ -1,49 +1,122 @@
 import logging
-from hashlib import sha256
+from uuid import uuid4
 
 from celery.result import AsyncResult
 from django.conf import settings
 from django.core.cache import cache
 from django.db.models import Q
-from drf_spectacular.utils import OpenApiTypes, extend_schema, inline_serializer
+from drf_spectacular.utils import (
+    OpenApiParameter,
+    OpenApiTypes,
+    extend_schema,
+    inline_serializer,
+)
 from rest_framework import decorators, serializers, status, viewsets
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from challenges.campaign import CAMPAIGN_MAP_SCHEMA, build_campaign_map
 from challenges.models import Challenge, UserProgress
-from challenges.serializers import ChallengeAdminSerializer, ChallengePublicSerializer
+from challenges.serializers import (
+    ChallengeAdminSerializer,
+    ChallengePublicSerializer,
+)
 from challenges.services import ChallengeService
+from judge.service import JudgeBusy, get_judge
+from project.caching import get_marker_store, get_or_compute
 from project.internal_auth import authorize_internal_request
+from .leaderboard import LeaderboardService
 from .tasks import (
-    LEADERBOARD_CACHE_KEY,
-    LEADERBOARD_CACHE_TIMEOUT,
-    build_leaderboard_data,
+    AI_INFLIGHT_TIMEOUT,
+    _analysis_cache_key,
+    add_ai_task_subscriber,
+    ai_hint_cache_key,
+    ai_task_state_key,
     generate_ai_analysis_task,
     generate_ai_hint_task,
+    inflight_cache_key,
+    set_ai_task_state,
 )
 
 logger = logging.getLogger(__name__)
 AI_TASK_META_TIMEOUT = 60 * 60 * 24
+LEADERBOARD_PAGE_SIZE = 100
+# Hydrated pages are briefly cached; ranks themselves are always live.
+LEADERBOARD_PAGE_CACHE_TIMEOUT = 15
+LEADERBOARD_MAX_RADIUS = 25
 
 
-def _analysis_cache_key(challenge_id: int, user_code: str) -> str:
-    code_hash = sha256((user_code or "").encode("utf-8")).hexdigest()
-    return f"ai_analysis:{challenge_id}:{code_hash}"
+def _parse_int(value, default, min_value=None, max_value=None):
+    try:
+        parsed = int(value)
+    except (TypeError, ValueError):
+        return default
+    if min_value is not None:
+        parsed = max(min_value, parsed)
+    if max_value is not None:
+        parsed = min(max_value, parsed)
+    return parsed
 
 
-def _task_meta_cache_key(task_id: str) -> str:
-    return f"ai_task_meta:{task_id}"
+def _task_meta_cache_key(task_id: str, user_id: int) -> str:
+    # Scoped per user: several users may attach to the same coalesced task.
+    return f"ai_task_meta:{task_id}:{user_id}"
 
 
 def _store_ai_task_meta(task_id: str, user_id: int, task_type: str) -> None:
     cache.set(
-        _task_meta_cache_key(task_id),
+        _task_meta_cache_key(task_id, user_id),
         {"user_id": user_id, "task_type": task_type},
         timeout=AI_TASK_META_TIMEOUT,
     )
 
 
+def _enqueue_single_flight(
+    task, result_cache_key: str, user_id: int, task_type: str, task_kwargs: dict
+) -> tuple[AsyncResult, bool]:
+    """
+    Enqueue an AI task unless an identical one is already in flight.
+
+    The in-flight marker is claimed atomically (``SET NX``) before the task is
+    published, so concurrent duplicates attach to the winner's task id
+    instead of triggering another LLM call. Returns ``(async_result, coalesced)``.
+    """
+    markers = get_marker_store()
+    marker_key = inflight_cache_key(result_cache_key)
+    task_id = str(uuid4())
+
+    if not markers.add(marker_key, task_id, timeout=AI_INFLIGHT_TIMEOUT):
+        existing_task_id = markers.get(marker_key)
+        if existing_task_id:
+            _store_ai_task_meta(existing_task_id, user_id, task_type)
+            add_ai_task_subscriber(existing_task_id, user_id)
+            logger.info(
+                "Coalesced %s request onto in-flight task %s",
+                task_type,
+                existing_task_id,
+            )
+            return task.AsyncResult(existing_task_id), True
+        # The running task finished between add() and get(); claim again.
+        markers.set(marker_key, task_id, timeout=AI_INFLIGHT_TIMEOUT)
+
+    _store_ai_task_meta(task_id, user_id, task_type)
+    add_ai_task_subscriber(task_id, user_id)
+    set_ai_task_state(task_id, {"status": "queued"})
+    async_result = task.apply_async(kwargs=task_kwargs, task_id=task_id)
+    return async_result, False
+
+
+def _queued_response(async_result: AsyncResult, coalesced: bool) -> Response:
+    if not coalesced and getattr(settings, "CELERY_TASK_ALWAYS_EAGER", False):
+        return _build_ai_result_response(async_result.result)
+
+    return Response(
+        {"task_id": async_result.id, "status": "queued", "coalesced": coalesced},
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
 def _task_status_label(async_result: AsyncResult) -> str:
     if async_result.status in {"PENDING", "RECEIVED"}:
         return "queued"
@@ -134,23 +207,13 @@ class ChallengeViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @extend_schema(
-        responses={200: ChallengePublicSerializer(many=True)},
-        description="List all available challenges with user-specific progress annotations.",
+        responses={200: CAMPAIGN_MAP_SCHEMA},
+        description="List the campaign map with user-specific progress annotations (no level text).",
     )
     def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        annotated_challenges = ChallengeService.get_annotated_challenges(
-            request.user, queryset
-        )
-
-        data = []
-        for item in annotated_challenges:
-            serializer = self.get_serializer(item)
-            challenge_data = serializer.data
-            challenge_data["status"] = item.user_status
-            challenge_data["stars"] = item.user_stars
-            data.append(challenge_data)
-
+        # Served from the in-process catalog snapshot and the cached progress
+        # bitmap; full level text is only returned by ``retrieve``.
+        data = build_campaign_map(request.user)
         return Response(data, status=status.HTTP_200_OK)
 
     @extend_schema(
@@ -176,42 +239,55 @@ class ChallengeViewSet(viewsets.ModelViewSet):
         request=inline_serializer(
             name="ChallengeSubmissionRequest",
             fields={
-                "passed": serializers.BooleanField(),
+                "code": serializers.CharField(),
             },
         ),
         responses={
             200: OpenApiTypes.OBJECT,
             400: OpenApiTypes.OBJECT,
+            429: OpenApiTypes.OBJECT,
         },
-        description="Submit client-side validation result and update challenge progress.",
+        description="Run the submitted code against the challenge tests on the server and update challenge progress.",
     )
     @decorators.action(detail=True, methods=["post"])
     def submit(self, request, slug=None):
         challenge = self.get_object()
 
-        raw_passed = request.data.get("passed", None)
-        if raw_passed is None:
-            raw_passed = request.query_params.get("passed", None)
+        code = request.data.get("code")
+        if not isinstance(code, str) or not code.strip():
+            return Response(
+                {"error": "code is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(code.encode("utf-8")) > settings.JUDGE_MAX_CODE_BYTES:
+            return Response(
+                {"error": "Submission is too large."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        if isinstance(raw_passed, bool):
-            passed = raw_passed
-        elif isinstance(raw_passed, str):
-            passed = raw_passed.strip().lower() in {"1", "true", "yes", "on"}
-        elif isinstance(raw_passed, (int, float)):
-            passed = raw_passed == 1
-        else:
-            passed = False
+        try:
+            verdict = get_judge().judge(request.user.id, challenge, code)
+        except JudgeBusy as exc:
+            return Response(
+                {"error": str(exc)},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(exc.retry_after)},
+            )
 
-        if not passed:
+        if not verdict.passed:
             return Response(
                 {
                     "status": "failed",
-                    "error": "Client-side validation failed.",
+                    "error": verdict.message or "Tests failed.",
+                    "verdict": verdict.as_dict(),
                 },
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        result = ChallengeService.process_submission(request.user, challenge, passed)
+        result = ChallengeService.process_submission(
+            request.user, challenge, passed=True
+        )
+        result["verdict"] = verdict.as_dict()
         return Response(result, status=status.HTTP_200_OK)
 
     @extend_schema(
@@ -322,7 +398,7 @@ class ChallengeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_402_PAYMENT_REQUIRED,
             )
 
-        cache_key = f"ai_hint:{user.id}:{challenge.id}:level:{hint_level}"
+        cache_key = ai_hint_cache_key(user.id, challenge.id, hint_level)
         cached_hint = cache.get(cache_key)
         if cached_hint is not None:
             return Response(
@@ -335,23 +411,21 @@ class ChallengeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_200_OK,
             )
 
-        async_result = generate_ai_hint_task.delay(
-            user_id=user.id,
-            challenge_id=challenge.id,
-            challenge_slug=challenge.slug,
-            user_code=request.data.get("user_code", ""),
-            hint_level=hint_level,
-            user_xp=user.profile.xp,
-        )
-        _store_ai_task_meta(async_result.id, user.id, "hint")
-
-        if getattr(settings, "CELERY_TASK_ALWAYS_EAGER", False):
-            return _build_ai_result_response(async_result.result)
-
-        return Response(
-            {"task_id": async_result.id, "status": "queued"},
-            status=status.HTTP_202_ACCEPTED,
+        async_result, coalesced = _enqueue_single_flight(
+            generate_ai_hint_task,
+            cache_key,
+            user.id,
+            "hint",
+            task_kwargs={
+                "user_id": user.id,
+                "challenge_id": challenge.id,
+                "challenge_slug": challenge.slug,
+                "user_code": request.data.get("user_code", ""),
+                "hint_level": hint_level,
+                "user_xp": user.profile.xp,
+            },
         )
+        return _queued_response(async_result, coalesced)
 
     @extend_schema(
         request=inline_serializer(
@@ -378,20 +452,18 @@ class ChallengeViewSet(viewsets.ModelViewSet):
                 cached_analysis = {**cached_analysis, "cached": True}
             return Response(cached_analysis, status=status.HTTP_200_OK)
 
-        async_result = generate_ai_analysis_task.delay(
-            challenge_id=challenge.id,
-            challenge_slug=challenge.slug,
-            user_code=user_code,
-        )
-        _store_ai_task_meta(async_result.id, request.user.id, "analysis")
-
-        if getattr(settings, "CELERY_TASK_ALWAYS_EAGER", False):
-            return _build_ai_result_response(async_result.result)
-
-        return Response(
-            {"task_id": async_result.id, "status": "queued"},
-            status=status.HTTP_202_ACCEPTED,
+        async_result, coalesced = _enqueue_single_flight(
+            generate_ai_analysis_task,
+            cache_key,
+            request.user.id,
+            "analysis",
+            task_kwargs={
+                "challenge_id": challenge.id,
+                "challenge_slug": challenge.slug,
+                "user_code": user_code,
+            },
         )
+        return _queued_response(async_result, coalesced)
 
     @extend_schema(
         responses={
@@ -408,7 +480,10 @@ class ChallengeViewSet(viewsets.ModelViewSet):
             ),
             404: OpenApiTypes.OBJECT,
         },
-        description="Poll the status of an AI hint or analysis task for the current user.",
+        description=(
+            "Poll the status of an AI hint or analysis task for the current user. "
+            "Completion is also pushed as an `ai_task_completed` event on /ws/notifications."
+        ),
     )
     @decorators.action(
         detail=False,
@@ -416,14 +491,28 @@ class ChallengeViewSet(viewsets.ModelViewSet):
         url_path=r"ai-tasks/(?P<task_id>[^/.]+)/status",
     )
     def ai_task_status(self, request, task_id=None):
-        task_meta = cache.get(_task_meta_cache_key(task_id)) or {}
+        task_meta = cache.get(_task_meta_cache_key(task_id, request.user.id)) or {}
         if task_meta.get("user_id") != request.user.id:
             return Response(
                 {"error": "Task not found"},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        async_result = AsyncResult(task_id)
+        task_state = cache.get(ai_task_state_key(task_id))
+        if task_state is not None:
+            return Response(
+                {"task_id": task_id, "date_done": None, **task_state},
+                status=status.HTTP_200_OK,
+            )
+
+        # Fallback for tasks whose cached state has expired; AI tasks keep
+        # their results in the ephemeral Redis backend, not the results table.
+        ai_task = (
+            generate_ai_hint_task
+            if task_meta.get("task_type") == "hint"
+            else generate_ai_analysis_task
+        )
+        async_result = ai_task.AsyncResult(task_id)
         response_data = {
             "task_id": task_id,
             "status": _task_status_label(async_result),
@@ -497,6 +586,22 @@ class ChallengeViewSet(viewsets.ModelViewSet):
             )
 
 
+LEADERBOARD_ENTRY_FIELDS = {
+    "rank": serializers.IntegerField(),
+    "username": serializers.CharField(),
+    "avatar": serializers.URLField(allow_null=True),
+    "completed_levels": serializers.IntegerField(),
+    "xp": serializers.IntegerField(),
+}
+
+LEADERBOARD_RANK_FIELDS = {
+    "rank": serializers.IntegerField(allow_null=True),
+    "percentile": serializers.FloatField(allow_null=True),
+    "exact": serializers.BooleanField(),
+    "total_players": serializers.IntegerField(),
+}
+
+
 class LeaderboardView(APIView):
     """
     View to retrieve the global user leaderboard.
@@ -505,25 +610,124 @@ class LeaderboardView(APIView):
     permission_classes = [IsAuthenticated]
 
     @extend_schema(
+        parameters=[
+            OpenApiParameter("offset", OpenApiTypes.INT, description="Default 0"),
+            OpenApiParameter(
+                "limit", OpenApiTypes.INT, description="Default and max 100"
+            ),
+        ],
         responses={
             200: inline_serializer(
                 name="LeaderboardEntry",
+                fields=LEADERBOARD_ENTRY_FIELDS,
+                many=True,
+            )
+        },
+        description="Get a page of the global leaderboard, served from the live ranking set.",
+    )
+    def get(self, request):
+        offset = _parse_int(request.query_params.get("offset"), 0, 0, None)
+        limit = _parse_int(
+            request.query_params.get("limit"),
+            LEADERBOARD_PAGE_SIZE,
+            1,
+            LEADERBOARD_PAGE_SIZE,
+        )
+
+        def build_page():
+            LeaderboardService.ensure_built()
+            return LeaderboardService.get_page(offset, limit)
+
+        data = get_or_compute(
+            f"leaderboard_page:{offset}:{limit}",
+            build_page,
+            LEADERBOARD_PAGE_CACHE_TIMEOUT,
+        )
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class LeaderboardStandingView(APIView):
+    """
+    View to retrieve the current user's rank and the players around them.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "radius", OpenApiTypes.INT, description="Default 5, max 25"
+            ),
+        ],
+        responses={
+            200: inline_serializer(
+                name="LeaderboardStanding",
                 fields={
-                    "username": serializers.CharField(),
-                    "avatar": serializers.URLField(allow_null=True),
-                    "completed_levels": serializers.IntegerField(),
+                    "rank": serializers.IntegerField(allow_null=True),
                     "xp": serializers.IntegerField(),
+                    "completed_levels": serializers.IntegerField(),
+                    "total_players": serializers.IntegerField(),
+                    "around": inline_serializer(
+                        name="LeaderboardAroundEntry",
+                        fields=LEADERBOARD_ENTRY_FIELDS,
+                        many=True,
+                    ),
                 },
-                many=True,
             )
         },
-        description="Get global leaderboard data (limited to top 100 users, cached and refreshed by the backend worker).",
+        description="Get the current user's leaderboard rank with a window of neighbouring players.",
     )
     def get(self, request):
-        cached_data = cache.get(LEADERBOARD_CACHE_KEY)
-        if cached_data is not None:
-            return Response(cached_data, status=status.HTTP_200_OK)
+        radius = _parse_int(
+            request.query_params.get("radius"), 5, 0, LEADERBOARD_MAX_RADIUS
+        )
 
-        data = build_leaderboard_data()
-        cache.set(LEADERBOARD_CACHE_KEY, data, timeout=LEADERBOARD_CACHE_TIMEOUT)
-        return Response(data, status=status.HTTP_200_OK)
+        LeaderboardService.ensure_built()
+        standing = LeaderboardService.get_standing(request.user.id)
+        if standing is None:
+            # Staff and inactive accounts are not ranked.
+            standing = {
+                "rank": None,
+                "xp": request.user.profile.xp,
+                "completed_levels": 0,
+            }
+        return Response(
+            {
+                **standing,
+                "total_players": LeaderboardService.total(),
+                "around": LeaderboardService.get_around(request.user.id, radius),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class LeaderboardRankView(APIView):
+    """
+    View to retrieve the current user's rank and percentile.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        responses={
+            200: inline_serializer(
+                name="LeaderboardRank",
+                fields=LEADERBOARD_RANK_FIELDS,
+            )
+        },
+        description=(
+            "Get the current user's rank and percentile. Exact for the top "
+            "players, estimated from the XP histogram for everyone else."
+        ),
+    )
+    def get(self, request):
+        LeaderboardService.ensure_built()
+        summary = LeaderboardService.get_rank_summary(request.user)
+        if summary is None:
+            summary = {
+                "rank": None,
+                "percentile": None,
+                "exact": False,
+                "total_players": LeaderboardService.total(),
+            }
+        return Response(summary, status=status.HTTP_200_OK)
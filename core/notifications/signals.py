@@ -12,23 +12,28 @@ from .tasks import send_push_notification_task
     sender=Post.likes.through,
     dispatch_uid="create_like_notification_signal",
 )
-def create_like_notification(sender, instance, action, pk_set, **kwargs):
+def create_like_notification(sender, instance, action, reverse, pk_set, **kwargs):
     _ = sender, kwargs
     if action == "post_add":
-        for user_id in pk_set:
-            actor = User.objects.get(pk=user_id)
+        # Likes can be added from either side of the relation.
+        if reverse:
+            posts = Post.objects.filter(pk__in=pk_set).select_related("user")
+            likes = [(instance, post) for post in posts]
+        else:
+            likes = [(User.objects.get(pk=user_id), instance) for user_id in pk_set]
+        for actor, post in likes:
             # Don't notify if user likes their own post
-            if actor != instance.user:
+            if actor != post.user:
                 Notification.objects.create(
-                    recipient=instance.user,
+                    recipient=post.user,
                     actor=actor,
                     verb="liked your post",
-                    target=instance,
+                    target=post,
                 )
                 send_push_notification_task.delay(
-                    instance.user.id,
+                    post.user.id,
                     title="New Like!",
-                    body=f"{actor.username} liked your post: {instance.caption[:30]}...",
+                    body=f"{actor.username} liked your post: {post.caption[:30]}...",
                 )
 
 
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.9 on 2026-10-19 14:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_likes(apps, _schema_editor):
+    Post = apps.get_model("posts", "Post")
+    likes = (
+        Post.likes.through.objects.filter(post_id=OuterRef("pk"))
+        .values("post_id")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    Post.objects.update(likes_count=Coalesce(Subquery(likes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0003_delete_comment"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="post",
+            options={"ordering": ["-created_at", "-id"]},
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing_likes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="posts_post_created_a7e5d4_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="posts_post_user_id_0b6047_idx",
+            ),
+        ),
+    ]
@@ -5,13 +5,34 @@ from django.contrib.auth.models import User
 class Post(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="posts")
     image = models.ImageField(upload_to="posts/")
+    # Resized WebP copies of ``image`` (see project.images).
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     caption = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     likes = models.ManyToManyField(User, related_name="liked_posts", blank=True)
+    # Denormalized size of ``likes``, kept in step by posts.signals.
+    likes_count = models.PositiveIntegerField(default=0)
 
     class Meta:
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"]),
+            models.Index(fields=["user", "-created_at", "-id"]),
+        ]
+
+    # Only written by queryset updates (F() likes in posts.signals, the
+    # rendition task); saving an instance loaded earlier must not revert them.
+    UPDATE_ONLY_FIELDS = ("likes_count", "image_renditions")
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.UPDATE_ONLY_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user.username} - {self.created_at}"
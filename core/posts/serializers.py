@@ -1,14 +1,16 @@
 from rest_framework import serializers
 from .models import Post
 from users.serializers import UserSummarySerializer
-from drf_spectacular.utils import extend_schema_field
+from drf_spectacular.utils import extend_schema_field, OpenApiTypes
+from project.images import RENDITIONS
+from project.media import build_file_url
 
 
 class PostSerializer(serializers.ModelSerializer):
     user = UserSummarySerializer(read_only=True)
     is_liked = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
-    image_url = serializers.ImageField(source="image", read_only=True)
+    image_url = serializers.SerializerMethodField()
+    image_urls = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
@@ -17,25 +19,34 @@ class PostSerializer(serializers.ModelSerializer):
             "user",
             "image",
             "image_url",
+            "image_urls",
             "caption",
             "created_at",
             "likes_count",
             "is_liked",
         ]
-        read_only_fields = ["user", "created_at", "likes_count", "image_url"]
+        read_only_fields = ["user", "created_at", "likes_count"]
         extra_kwargs = {"image": {"write_only": True, "required": False}}
 
     @extend_schema_field(bool)
     def get_is_liked(self, obj):
-        if hasattr(obj, "is_liked"):
-            return bool(obj.is_liked)
+        liked_post_ids = self.context.get("liked_post_ids")
+        if liked_post_ids is not None:
+            return obj.id in liked_post_ids
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return obj.likes.filter(id=request.user.id).exists()
         return False
 
-    @extend_schema_field(int)
-    def get_likes_count(self, obj):
-        if hasattr(obj, "likes_count"):
-            return int(obj.likes_count)
-        return obj.likes.count()
+    @extend_schema_field(OpenApiTypes.URI)
+    def get_image_url(self, obj):
+        return build_file_url(obj.image, self.context.get("request"), "feed")
+
+    @extend_schema_field({"type": "object", "additionalProperties": {"type": "string"}})
+    def get_image_urls(self, obj):
+        """Every rendition; each is the original image until it is ready."""
+        request = self.context.get("request")
+        return {
+            rendition: build_file_url(obj.image, request, rendition)
+            for rendition in RENDITIONS
+        }
@@ -0,0 +1,130 @@
+"""
+Post signals: the denormalized like counter and the home timelines.
+
+Every change goes through ``m2m_changed`` on ``Post.likes`` (from either
+side) as a single F-expression UPDATE, so the feed never has to count the
+likes table. Likes removed by deleting the liking user cascade without
+``m2m_changed`` and are subtracted just before the user goes.
+
+New posts and follows reach the home timelines (see timeline.py) through
+tasks queued after commit; edits drop the cached post summaries. New or
+replaced images get their renditions (see project.images) the same way.
+"""
+
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from project.images import needs_renditions
+from users.models import UserFollow
+from .models import Post
+from .timeline import invalidate_summaries
+
+Like = Post.likes.through
+
+
+def shift_likes_count(deltas: Counter) -> None:
+    """Applies ``{post_id: delta}``, one UPDATE per distinct delta."""
+    by_delta = {}
+    for post_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(post_id)
+    for delta, post_ids in by_delta.items():
+        Post.objects.filter(pk__in=post_ids).update(
+            likes_count=Greatest(F("likes_count") + delta, 0)
+        )
+    invalidate_summaries(list(deltas))
+
+
+def _likes_to_remove(instance, reverse, pk_set) -> Counter:
+    """Post ids losing a like, read before the rows are deleted."""
+    if reverse:
+        likes = Like.objects.filter(user_id=instance.pk)
+        if pk_set is not None:
+            likes = likes.filter(post_id__in=pk_set)
+    else:
+        likes = Like.objects.filter(post_id=instance.pk)
+        if pk_set is not None:
+            likes = likes.filter(user_id__in=pk_set)
+    return Counter(likes.values_list("post_id", flat=True))
+
+
+@receiver(m2m_changed, sender=Like, dispatch_uid="count_post_likes")
+def count_post_likes(sender, instance, action, reverse, pk_set, **kwargs):
+    _ = sender, kwargs
+    if action == "post_add" and pk_set:
+        # ``pk_set`` holds only the rows that were actually inserted.
+        if reverse:
+            shift_likes_count(Counter(pk_set))
+        else:
+            shift_likes_count(Counter({instance.pk: len(pk_set)}))
+    elif action in ("pre_remove", "pre_clear"):
+        # ``remove()`` reports every requested id, liked or not, so count the
+        # rows that really exist.
+        instance._likes_to_remove = _likes_to_remove(instance, reverse, pk_set)
+    elif action in ("post_remove", "post_clear"):
+        removed = instance.__dict__.pop("_likes_to_remove", Counter())
+        shift_likes_count(Counter({post_id: -n for post_id, n in removed.items()}))
+
+
+@receiver(pre_delete, sender=User, dispatch_uid="uncount_deleted_user_likes")
+def uncount_deleted_user_likes(sender, instance, **kwargs):
+    _ = sender, kwargs
+    liked = Like.objects.filter(user_id=instance.pk).values_list("post_id", flat=True)
+    shift_likes_count(Counter({post_id: -1 for post_id in liked}))
+
+
+# ──── Home timelines ────
+
+
+@receiver(post_save, sender=Post, dispatch_uid="fan_out_new_post")
+def fan_out_new_post(sender, instance, created, **kwargs):
+    _ = sender, kwargs
+    if created:
+        from .tasks import fan_out_post_task
+
+        post_id = instance.pk
+        transaction.on_commit(lambda: fan_out_post_task.delay(post_id))
+    else:
+        invalidate_summaries([instance.pk])
+
+
+@receiver(post_save, sender=Post, dispatch_uid="schedule_post_image_renditions")
+def schedule_post_image_renditions(sender, instance, **kwargs):
+    _ = sender, kwargs
+    if needs_renditions(instance, "image"):
+        from .tasks import render_post_image_task
+
+        post_id = instance.pk
+        transaction.on_commit(lambda: render_post_image_task.delay(post_id))
+
+
+@receiver(post_delete, sender=Post, dispatch_uid="forget_deleted_post")
+def forget_deleted_post(sender, instance, **kwargs):
+    _ = sender, kwargs
+    # Timelines keep the id; hydration skips posts that no longer exist.
+    invalidate_summaries([instance.pk])
+
+
+@receiver(post_save, sender=UserFollow, dispatch_uid="merge_followed_author")
+def merge_followed_author(sender, instance, created, **kwargs):
+    _ = sender, kwargs
+    if created:
+        from .tasks import merge_followed_author_task
+
+        args = instance.follower_id, instance.following_id
+        transaction.on_commit(lambda: merge_followed_author_task.delay(*args))
+
+
+@receiver(post_delete, sender=UserFollow, dispatch_uid="drop_unfollowed_author")
+def drop_unfollowed_author(sender, instance, **kwargs):
+    _ = sender, kwargs
+    from .tasks import drop_unfollowed_author_task
+
+    args = instance.follower_id, instance.following_id
+    transaction.on_commit(lambda: drop_unfollowed_author_task.delay(*args))
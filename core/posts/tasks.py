@@ -0,0 +1,49 @@
+import logging
+
+import redis
+from celery import shared_task
+
+from project.images import render_renditions
+from . import timeline
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def fan_out_post_task(post_id):
+    """Pushes a new post into its followers' home timelines."""
+    author_id = (
+        Post.objects.filter(pk=post_id).values_list("user_id", flat=True).first()
+    )
+    if author_id is None:
+        return {"status": "not_found", "post_id": post_id}
+    try:
+        reached = timeline.fan_out(post_id, author_id)
+    except redis.RedisError as exc:
+        # Timelines that missed the post are repaired when they expire.
+        logger.warning("Timeline fan-out failed for post %s: %s", post_id, exc)
+        return {"status": "failed", "post_id": post_id}
+    return {"status": "fanned_out", "followers": reached}
+
+
+@shared_task
+def merge_followed_author_task(user_id, author_id):
+    timeline.merge_author(user_id, author_id)
+
+
+@shared_task
+def drop_unfollowed_author_task(user_id, author_id):
+    timeline.drop_author(user_id, author_id)
+
+
+@shared_task
+def render_post_image_task(post_id):
+    """Makes the resized renditions of a post's image."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return {"status": "not_found", "post_id": post_id}
+    if not render_renditions(post, "image"):
+        return {"status": "unchanged", "post_id": post_id}
+    timeline.invalidate_summaries([post_id])
+    return {"status": "rendered", "post_id": post_id}
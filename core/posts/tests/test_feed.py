@@ -0,0 +1,160 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from posts.models import Post
+from posts.tests.test_views import IN_MEMORY_STORAGES
+
+
+def make_post(user, caption="", created_at=None):
+    post = Post.objects.create(
+        user=user,
+        caption=caption,
+        image=SimpleUploadedFile("p.jpg", b"jpeg", content_type="image/jpeg"),
+    )
+    if created_at is not None:
+        Post.objects.filter(pk=post.pk).update(created_at=created_at)
+    return post
+
+
+def likes_count(post):
+    return Post.objects.values_list("likes_count", flat=True).get(pk=post.pk)
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class LikesCountTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="pw")
+        self.fans = [
+            User.objects.create_user(username=f"fan{i}", password="pw")
+            for i in range(3)
+        ]
+        self.post = make_post(self.author)
+
+    def test_counter_follows_adds_and_removes_from_both_sides(self):
+        self.post.likes.add(*self.fans)
+        self.assertEqual(likes_count(self.post), 3)
+
+        # Re-adding and removing a non-like change nothing.
+        self.post.likes.add(self.fans[0])
+        self.post.likes.remove(self.author)
+        self.assertEqual(likes_count(self.post), 3)
+
+        self.fans[0].liked_posts.remove(self.post)
+        self.assertEqual(likes_count(self.post), 2)
+
+        other = make_post(self.author)
+        self.fans[0].liked_posts.add(self.post, other)
+        self.assertEqual((likes_count(self.post), likes_count(other)), (3, 1))
+
+        self.fans[0].liked_posts.clear()
+        self.assertEqual((likes_count(self.post), likes_count(other)), (2, 0))
+
+        self.post.likes.clear()
+        self.assertEqual(likes_count(self.post), 0)
+
+    def test_saving_a_stale_instance_keeps_the_count(self):
+        self.post.likes.add(*self.fans)
+
+        self.post.caption = "edited"
+        self.post.save()
+
+        self.assertEqual(likes_count(self.post), 3)
+
+    def test_deleting_a_fan_uncounts_their_likes(self):
+        self.post.likes.add(*self.fans)
+
+        self.fans[1].delete()
+
+        self.assertEqual(likes_count(self.post), 2)
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class FeedTests(APITestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user(username="viewer", password="pw")
+        self.author = User.objects.create_user(username="author", password="pw")
+        now = timezone.now()
+        # Pairs share a timestamp, so the id has to break the tie.
+        self.posts = [
+            make_post(self.author, f"p{i}", now - timedelta(minutes=i // 2))
+            for i in range(7)
+        ]
+        self.client.force_authenticate(user=self.viewer)
+
+    def read_feed(self, page_size):
+        url = reverse("post-list")
+        params = {"page_size": page_size}
+        seen = []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += [post["id"] for post in response.data["results"]]
+            url, params = response.data["next"], None
+        return seen
+
+    def test_cursor_walks_the_feed_newest_first_without_gaps(self):
+        expected = [
+            post.pk
+            for post in sorted(
+                Post.objects.all(), key=lambda p: (p.created_at, p.pk), reverse=True
+            )
+        ]
+
+        self.assertEqual(self.read_feed(page_size=2), expected)
+        self.assertEqual(self.read_feed(page_size=50), expected)
+
+    def test_new_posts_do_not_shift_later_pages(self):
+        first = self.client.get(reverse("post-list"), {"page_size": 3}).data
+        make_post(self.author, "fresh")
+
+        second = self.client.get(first["next"]).data
+
+        ids = [post["id"] for post in first["results"] + second["results"]]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertNotIn("fresh", [post["caption"] for post in second["results"]])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(reverse("post-list"), {"cursor": "garbage"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_costs_three_queries_however_many_likes(self):
+        fans = [
+            User.objects.create_user(username=f"fan{i}", password="pw")
+            for i in range(5)
+        ]
+        for post in self.posts:
+            post.likes.add(*fans)
+        self.posts[0].likes.add(self.viewer)
+        self.posts[3].likes.add(self.viewer)
+
+        # Posts with authors and profiles, then the viewer's likes and follows
+        # among them.
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("post-list"))
+
+        liked = {post["id"] for post in response.data["results"] if post["is_liked"]}
+        self.assertEqual(liked, {self.posts[0].pk, self.posts[3].pk})
+        self.assertEqual(
+            {post["likes_count"] for post in response.data["results"]}, {5, 6}
+        )
+
+    def test_like_toggle_reads_the_counter_instead_of_counting(self):
+        post = self.posts[0]
+        post.likes.add(self.author)
+        url = reverse("post-like", kwargs={"pk": post.pk})
+
+        response = self.client.post(url)
+        self.assertEqual(response.data, {"is_liked": True, "likes_count": 2})
+        self.assertEqual(likes_count(post), 2)
+
+        response = self.client.post(url)
+        self.assertEqual(response.data, {"is_liked": False, "likes_count": 1})
+        self.assertEqual(likes_count(post), 1)
@@ -0,0 +1,134 @@
+from unittest.mock import patch
+
+import redis
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from posts import timeline
+from posts.tests.test_feed import make_post
+from posts.tests.test_views import IN_MEMORY_STORAGES
+from users.models import UserFollow
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class HomeTimelineTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.reader = User.objects.create_user(username="reader", password="pw")
+        self.author = User.objects.create_user(username="author", password="pw")
+        self.stranger = User.objects.create_user(username="stranger", password="pw")
+        self.follow(self.reader, self.author)
+        self.client.force_authenticate(user=self.reader)
+
+    def follow(self, follower, following):
+        with self.captureOnCommitCallbacks(execute=True):
+            return UserFollow.objects.create(follower=follower, following=following)
+
+    def publish(self, user, caption=""):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_post(user, caption)
+
+    def read(self, **params):
+        response = self.client.get(reverse("post-timeline"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def captions(self, data):
+        return [post["caption"] for post in data["results"]]
+
+    def test_cold_timeline_is_rebuilt_from_follows(self):
+        self.publish(self.author, "followed")
+        self.publish(self.stranger, "stranger")
+        self.publish(self.reader, "own")
+
+        self.assertEqual(self.captions(self.read()), ["own", "followed"])
+
+    def test_new_posts_are_fanned_out_to_built_timelines(self):
+        self.read()
+
+        post = self.publish(self.author, "fresh")
+
+        store = timeline.get_store()
+        self.assertEqual(store.page(self.reader.id, None, 10), [post.pk])
+        self.assertEqual(store.page(self.author.id, None, 10), [])  # never read
+        data = self.read()
+        self.assertEqual(self.captions(data), ["fresh"])
+        self.assertTrue(data["results"][0]["user"]["is_following"])
+        self.assertFalse(data["results"][0]["is_liked"])
+
+    def test_celebrity_posts_are_merged_on_read(self):
+        self.publish(self.author, "before")
+        self.read()
+
+        with patch.object(timeline, "FANOUT_MAX_FOLLOWERS", 0):
+            post = self.publish(self.author, "famous")
+
+        self.assertNotIn(post.pk, timeline.get_store().page(self.reader.id, None, 10))
+        self.assertEqual(self.captions(self.read()), ["famous", "before"])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        self.publish(self.stranger, "new friend")
+        self.read()
+
+        follow = self.follow(self.reader, self.stranger)
+        self.assertEqual(self.captions(self.read()), ["new friend"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            follow.delete()
+        self.assertEqual(self.captions(self.read()), [])
+
+    def test_cursor_pages_and_warm_reads_cost_two_queries(self):
+        for index in range(5):
+            self.publish(self.author, f"p{index}")
+        for index in range(20):
+            self.follow(
+                self.reader,
+                User.objects.create_user(username=f"f{index}", password="pw"),
+            )
+        self.read(page_size=2)
+
+        # Timeline and post summaries come from the cache; the viewer's likes
+        # and follows among the page are one query each.
+        with self.assertNumQueries(2):
+            first = self.read(page_size=2)
+        self.assertEqual(self.captions(first), ["p4", "p3"])
+
+        second = self.client.get(first["next"]).data
+        third = self.client.get(second["next"]).data
+        self.assertEqual(self.captions(second), ["p2", "p1"])
+        self.assertEqual(self.captions(third), ["p0"])
+        self.assertIsNone(third["next"])
+
+    def test_likes_and_edits_refresh_cached_summaries(self):
+        post = self.publish(self.author, "draft")
+        self.read()
+
+        post.likes.add(self.reader)
+        post.caption = "final"
+        post.save()
+
+        [result] = self.read()["results"]
+        self.assertEqual(result["caption"], "final")
+        self.assertEqual(result["likes_count"], 1)
+        self.assertTrue(result["is_liked"])
+
+    def test_deleted_posts_are_skipped(self):
+        post = self.publish(self.author, "gone")
+        self.publish(self.author, "kept")
+        self.read()
+
+        post.delete()
+
+        self.assertEqual(self.captions(self.read()), ["kept"])
+
+    def test_store_outage_falls_back_to_the_database(self):
+        self.publish(self.author, "followed")
+
+        with patch.object(
+            timeline, "get_store", side_effect=redis.ConnectionError("down")
+        ):
+            self.assertEqual(self.captions(self.read()), ["followed"])
@@ -3,11 +3,18 @@ from PIL import Image
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.test import override_settings
 from rest_framework import status
 from rest_framework.test import APITestCase
 from posts.models import Post
 
+IN_MEMORY_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
 
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
 class PostViewTests(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="author", password="password")
@@ -41,7 +48,8 @@ class PostViewTests(APITestCase):
         self.client.force_authenticate(user=None)  # Publicly readable
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNone(response.data["next"])
 
     def test_filter_by_username(self):
         Post.objects.create(
@@ -53,8 +61,8 @@ class PostViewTests(APITestCase):
 
         url = reverse("post-list")
         response = self.client.get(url, {"username": "author"})
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["user"]["username"], "author")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["user"]["username"], "author")
 
     def test_like_action(self):
         post = Post.objects.create(
@@ -0,0 +1,312 @@
+"""
+Home timeline: newest posts from the accounts a user follows.
+
+Each user's timeline is a Redis sorted set of post ids (scored by id, so a
+page is one ``ZREVRANGEBYSCORE`` below the cursor) capped at
+``TIMELINE_MAX_LENGTH``. New posts are fanned out on write to every
+follower's set by a Celery task. Authors with more than
+``FANOUT_MAX_FOLLOWERS`` followers are not fanned out; their posts are merged
+in on read with one indexed query. A missing timeline is rebuilt from the
+database on first read, and pages are hydrated from a per-post summary
+cache, so reads cost O(page size) however many accounts a user follows.
+"""
+
+import logging
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from project.caching import run_once
+from users.models import UserFollow
+from .models import Post
+from .serializers import PostSerializer
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_MAX_LENGTH = 800
+# Timelines of users who stop reading expire; the next read rebuilds them.
+TIMELINE_TTL = 60 * 60 * 24 * 7
+FANOUT_MAX_FOLLOWERS = 10_000
+FANOUT_CHUNK_SIZE = 1000
+CELEBRITIES_KEY = "timeline:celebrities"
+SUMMARY_CACHE_TIMEOUT = 60 * 10
+REBUILD_LOCK_TIMEOUT = 30
+
+
+def timeline_key(user_id: int) -> str:
+    return f"timeline:{user_id}"
+
+
+def summary_key(post_id: int) -> str:
+    return f"post_summary:{post_id}"
+
+
+class RedisTimelineStore:
+    """Timeline sorted sets and the celebrity set in Redis."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def exists(self, user_id: int) -> bool:
+        return bool(self.client.exists(timeline_key(user_id)))
+
+    def push(self, user_ids, post_ids) -> None:
+        """
+        Adds ``post_ids`` to those of ``user_ids``' timelines that are built,
+        trimming each; unbuilt ones pick the posts up when rebuilt. The keys
+        are watched, so a timeline that expires before the write is not
+        recreated without its sentinel; the transaction is retried instead.
+        """
+        keys = [timeline_key(user_id) for user_id in user_ids]
+        members = {post_id: post_id for post_id in post_ids}
+        if not keys or not members:
+            return
+
+        def add(pipe):
+            # Read in one round trip on another connection: the keys are
+            # already watched, so any change after this read aborts EXEC.
+            check = self.client.pipeline(transaction=False)
+            for key in keys:
+                check.exists(key)
+            built = [key for key, found in zip(keys, check.execute()) if found]
+            pipe.multi()
+            for key in built:
+                pipe.zadd(key, members)
+                pipe.zremrangebyrank(key, 0, -TIMELINE_MAX_LENGTH - 1)
+
+        self.client.transaction(add, *keys)
+
+    def remove(self, user_id: int, post_ids) -> None:
+        if post_ids:
+            self.client.zrem(timeline_key(user_id), *post_ids)
+
+    def replace(self, user_id: int, post_ids) -> None:
+        key = timeline_key(user_id)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(key)
+        # A sentinel keeps an empty timeline from looking unbuilt.
+        pipe.zadd(key, {0: 0, **{post_id: post_id for post_id in post_ids}})
+        pipe.expire(key, TIMELINE_TTL)
+        pipe.execute()
+
+    def page(self, user_id: int, before: int | None, count: int) -> list[int]:
+        key = timeline_key(user_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrevrangebyscore(
+            key, f"({before}" if before else "+inf", "(0", start=0, num=count
+        )
+        pipe.expire(key, TIMELINE_TTL)
+        post_ids, _ = pipe.execute()
+        return [int(post_id) for post_id in post_ids]
+
+    def add_celebrity(self, user_id: int) -> None:
+        self.client.sadd(CELEBRITIES_KEY, user_id)
+
+    def celebrities(self) -> set[int]:
+        return {int(user_id) for user_id in self.client.smembers(CELEBRITIES_KEY)}
+
+
+class CacheTimelineStore:
+    """
+    Timelines kept as lists in the Django cache. Used by the test suite
+    (locmem cache); operations are O(n) and not atomic.
+    """
+
+    def exists(self, user_id: int) -> bool:
+        return cache.get(timeline_key(user_id)) is not None
+
+    def push(self, user_ids, post_ids) -> None:
+        for user_id in user_ids:
+            key = timeline_key(user_id)
+            current = cache.get(key)
+            if current is None:
+                continue
+            merged = set(current) | set(post_ids)
+            trimmed = sorted(merged, reverse=True)[:TIMELINE_MAX_LENGTH]
+            cache.set(key, trimmed, timeout=TIMELINE_TTL)
+
+    def remove(self, user_id: int, post_ids) -> None:
+        key = timeline_key(user_id)
+        current = cache.get(key)
+        if current is not None:
+            remaining = [post_id for post_id in current if post_id not in post_ids]
+            cache.set(key, remaining, timeout=TIMELINE_TTL)
+
+    def replace(self, user_id: int, post_ids) -> None:
+        cache.set(
+            timeline_key(user_id), sorted(post_ids, reverse=True), timeout=TIMELINE_TTL
+        )
+
+    def page(self, user_id: int, before: int | None, count: int) -> list[int]:
+        post_ids = cache.get(timeline_key(user_id)) or []
+        return [post_id for post_id in post_ids if not before or post_id < before][
+            :count
+        ]
+
+    def add_celebrity(self, user_id: int) -> None:
+        cache.set(CELEBRITIES_KEY, self.celebrities() | {user_id}, timeout=None)
+
+    def celebrities(self) -> set[int]:
+        return cache.get(CELEBRITIES_KEY) or set()
+
+
+_redis_client = None
+
+
+def get_redis_client():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.from_url(settings.TIMELINE_REDIS_URL)
+    return _redis_client
+
+
+def get_store():
+    if getattr(settings, "TIMELINE_STORE", "redis") == "cache":
+        return CacheTimelineStore()
+    return RedisTimelineStore(get_redis_client())
+
+
+def _newest_post_ids(authors, before: int | None, count: int) -> list[int]:
+    posts = Post.objects.filter(authors)
+    if before:
+        posts = posts.filter(pk__lt=before)
+    return list(posts.order_by("-pk").values_list("pk", flat=True)[:count])
+
+
+def _home_authors(user_id: int) -> Q:
+    """The user and everyone they follow."""
+    followed = UserFollow.objects.filter(follower_id=user_id).values("following_id")
+    return Q(user_id=user_id) | Q(user_id__in=followed)
+
+
+def rebuild(user_id: int) -> None:
+    """Reloads a timeline from the database; the one join per cold timeline."""
+    post_ids = _newest_post_ids(_home_authors(user_id), None, TIMELINE_MAX_LENGTH)
+    get_store().replace(user_id, post_ids)
+
+
+def fan_out(post_id: int, author_id: int) -> int:
+    """
+    Pushes a new post to its author's and followers' timelines. Returns the
+    number of followers reached; 0 for celebrity authors, whose posts are
+    read from the database instead.
+    """
+    store = get_store()
+    store.push([author_id], [post_id])
+    followers = UserFollow.objects.filter(following_id=author_id).values_list(
+        "follower_id", flat=True
+    )
+    # Counting stops just past the threshold, so celebrities cost no more.
+    if followers[: FANOUT_MAX_FOLLOWERS + 1].count() > FANOUT_MAX_FOLLOWERS:
+        store.add_celebrity(author_id)
+        return 0
+
+    written = 0
+    chunk = []
+    for follower_id in followers.iterator(chunk_size=FANOUT_CHUNK_SIZE):
+        chunk.append(follower_id)
+        if len(chunk) >= FANOUT_CHUNK_SIZE:
+            store.push(chunk, [post_id])
+            written += len(chunk)
+            chunk = []
+    store.push(chunk, [post_id])
+    return written + len(chunk)
+
+
+def merge_author(user_id: int, author_id: int) -> None:
+    """Backfills a newly followed author into a built timeline."""
+    author = Q(user_id=author_id)
+    get_store().push([user_id], _newest_post_ids(author, None, TIMELINE_MAX_LENGTH))
+
+
+def drop_author(user_id: int, author_id: int) -> None:
+    """Removes an unfollowed author's posts from a timeline."""
+    author = Q(user_id=author_id)
+    get_store().remove(
+        user_id, set(_newest_post_ids(author, None, TIMELINE_MAX_LENGTH))
+    )
+
+
+def _followed_celebrities(user_id: int, store) -> list[int]:
+    celebrities = store.celebrities()
+    if not celebrities:
+        return []
+    return list(
+        UserFollow.objects.filter(
+            follower_id=user_id, following_id__in=celebrities
+        ).values_list("following_id", flat=True)
+    )
+
+
+def read_page(user_id: int, before: int | None = None, count: int = 20):
+    """
+    Returns ``(post_ids, has_more)`` for the page of ``user_id``'s timeline
+    below the post id ``before``, newest first.
+    """
+    try:
+        store = get_store()
+        if not store.exists(user_id):
+            run_once(
+                timeline_key(user_id),
+                lambda: rebuild(user_id),
+                timeout=REBUILD_LOCK_TIMEOUT,
+                wait=True,
+            )
+        post_ids = store.page(user_id, before, count + 1)
+        celebrities = _followed_celebrities(user_id, store)
+    except redis.RedisError as exc:
+        logger.warning("Timeline store unavailable, reading the database: %s", exc)
+        post_ids = _newest_post_ids(_home_authors(user_id), before, count + 1)
+        celebrities = []
+
+    if celebrities:
+        fanned_in = _newest_post_ids(Q(user_id__in=celebrities), before, count + 1)
+        post_ids = sorted(set(post_ids) | set(fanned_in), reverse=True)
+    return post_ids[:count], len(post_ids) > count
+
+
+def post_summaries(post_ids, request=None) -> list[tuple[int, dict]]:
+    """
+    ``(author_id, serialized post)`` for ``post_ids``, in order, without the
+    viewer-specific fields. Cached per post; misses are loaded in one query.
+    Posts deleted since they were timelined are skipped.
+    """
+    cached = cache.get_many([summary_key(post_id) for post_id in post_ids])
+    summaries = {
+        post_id: cached[summary_key(post_id)]
+        for post_id in post_ids
+        if summary_key(post_id) in cached
+    }
+    missing = [post_id for post_id in post_ids if post_id not in summaries]
+    if missing:
+        posts = Post.objects.filter(pk__in=missing).select_related(
+            "user", "user__profile"
+        )
+        context = {
+            "request": request,
+            "liked_post_ids": frozenset(),
+            "following_ids": frozenset(),
+        }
+        serializer = PostSerializer(posts, many=True, context=context)
+        fresh = {}
+        for post, data in zip(posts, serializer.data):
+            data = dict(data)
+            data.pop("is_liked")
+            data["user"] = {
+                key: value
+                for key, value in data["user"].items()
+                if key != "is_following"
+            }
+            fresh[post.pk] = (post.user_id, data)
+        cache.set_many(
+            {summary_key(post_id): summary for post_id, summary in fresh.items()},
+            timeout=SUMMARY_CACHE_TIMEOUT,
+        )
+        summaries.update(fresh)
+    return [summaries[post_id] for post_id in post_ids if post_id in summaries]
+
+
+def invalidate_summaries(post_ids) -> None:
+    cache.delete_many([summary_key(post_id) for post_id in post_ids])
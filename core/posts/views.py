@@ -2,9 +2,19 @@ from rest_framework import viewsets, permissions, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from drf_spectacular.utils import extend_schema, OpenApiTypes, inline_serializer
-from django.db.models import BooleanField, Count, Exists, OuterRef, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+from drf_spectacular.utils import (
+    extend_schema,
+    OpenApiParameter,
+    OpenApiTypes,
+    inline_serializer,
+)
+from django.db import transaction
+from users.models import UserFollow
+from . import timeline as home_timeline
 from .models import Post
+from .pagination import PostCursorPagination
 from .serializers import PostSerializer
 from .permissions import IsOwnerOrReadOnly
 
@@ -18,25 +28,86 @@ class PostViewSet(viewsets.ModelViewSet):
     serializer_class = PostSerializer
     parser_classes = [JSONParser, MultiPartParser, FormParser]
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    pagination_class = PostCursorPagination
 
     def get_queryset(self):
-        queryset = (
-            super().get_queryset().annotate(likes_count=Count("likes", distinct=True))
-        )
-        if self.request.user.is_authenticated:
-            like_exists = Post.likes.through.objects.filter(
-                post_id=OuterRef("pk"), user_id=self.request.user.id
-            )
-            queryset = queryset.annotate(is_liked=Exists(like_exists))
-        else:
-            queryset = queryset.annotate(
-                is_liked=Value(False, output_field=BooleanField())
-            )
+        queryset = super().get_queryset()
         username = self.request.query_params.get("username")
         if username:
             queryset = queryset.filter(user__username=username)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        context = {
+            **self.get_serializer_context(),
+            **self._viewer_context(
+                [post.pk for post in page], {post.user_id for post in page}
+            ),
+        }
+        serializer = self.get_serializer_class()(page, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
+
+    def _viewer_context(self, post_ids, author_ids):
+        """
+        Which of the posts the viewer liked and which of their authors the
+        viewer follows, one ``IN`` query each.
+        """
+        user = self.request.user
+        if not user.is_authenticated or not post_ids:
+            return {"liked_post_ids": frozenset(), "following_ids": frozenset()}
+        liked = Post.likes.through.objects.filter(
+            user_id=user.id, post_id__in=post_ids
+        ).values_list("post_id", flat=True)
+        following = UserFollow.objects.filter(
+            follower_id=user.id, following_id__in=author_ids
+        ).values_list("following_id", flat=True)
+        return {
+            "liked_post_ids": frozenset(liked),
+            "following_ids": frozenset(following),
+        }
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("cursor", int, description="Id of the last post seen."),
+            OpenApiParameter("page_size", int),
+        ],
+        responses={200: PostSerializer(many=True)},
+        description="Home timeline: the user's and followed accounts' posts, newest first.",
+    )
+    @action(
+        detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated]
+    )
+    def timeline(self, request):
+        try:
+            before = int(request.query_params.get("cursor") or 0) or None
+        except ValueError:
+            raise NotFound("Invalid cursor")
+        post_ids, has_more = home_timeline.read_page(
+            request.user.id, before, self.paginator.get_page_size(request)
+        )
+        summaries = home_timeline.post_summaries(post_ids, request)
+        viewer = self._viewer_context(
+            post_ids, {author_id for author_id, _ in summaries}
+        )
+        results = [
+            {
+                **data,
+                "user": {
+                    **data["user"],
+                    "is_following": author_id in viewer["following_ids"],
+                },
+                "is_liked": data["id"] in viewer["liked_post_ids"],
+            }
+            for author_id, data in summaries
+        ]
+        next_link = None
+        if has_more:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), "cursor", post_ids[-1]
+            )
+        return Response({"next": next_link, "results": results})
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
@@ -58,17 +129,26 @@ class PostViewSet(viewsets.ModelViewSet):
     )
     def like(self, request, pk=None):
         post = self.get_object()
-        like_qs = post.likes.through.objects.filter(
-            post_id=post.id, user_id=request.user.id
-        )
-        if like_qs.exists():
-            like_qs.delete()
-            liked = False
-        else:
-            post.likes.add(request.user)
-            liked = True
+        with transaction.atomic():
+            # Locking the post serializes toggles on it, so a double click
+            # cannot like twice; the counter UPDATE would take this lock anyway.
+            likes_count = (
+                Post.objects.select_for_update()
+                .values_list("likes_count", flat=True)
+                .get(pk=post.pk)
+            )
+            liked = not post.likes.through.objects.filter(
+                post_id=post.id, user_id=request.user.id
+            ).exists()
+            # Both go through m2m_changed, which keeps likes_count in step.
+            if liked:
+                post.likes.add(request.user)
+                likes_count += 1
+            else:
+                post.likes.remove(request.user)
+                likes_count -= 1
 
         return Response(
-            {"is_liked": liked, "likes_count": post.likes.count()},
+            {"is_liked": liked, "likes_count": likes_count},
             status=status.HTTP_200_OK,
         )
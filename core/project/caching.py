@@ -0,0 +1,199 @@
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = 30
+COLD_WAIT_TIMEOUT = 5.0
+COLD_WAIT_INTERVAL = 0.05
+
+_DELETE_IF_EQUAL_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """
+    Cached value plus the metadata needed for early and stale refreshes.
+    """
+
+    value: Any
+    fresh_until: float
+    compute_seconds: float
+
+
+def _lock_key(key: str) -> str:
+    return f"{key}:refresh-lock"
+
+
+def _should_refresh(entry: CacheEntry, beta: float) -> bool:
+    """
+    Probabilistic early expiration (XFetch): the closer the entry is to going
+    stale, and the longer it took to compute, the likelier a reader refreshes
+    it early, so expiries are spread out instead of hitting all at once.
+    """
+    jitter = entry.compute_seconds * beta * -math.log(1.0 - random.random())
+    return time.time() + jitter >= entry.fresh_until
+
+
+def _compute_and_store(
+    key: str, compute: Callable[[], Any], timeout: int, stale_timeout: int
+) -> Any:
+    started = time.monotonic()
+    value = compute()
+    elapsed = time.monotonic() - started
+    cache.set(
+        key,
+        CacheEntry(value, time.time() + timeout, elapsed),
+        timeout=timeout + stale_timeout,
+    )
+    return value
+
+
+def get_or_compute(
+    key: str,
+    compute: Callable[[], Any],
+    timeout: int,
+    stale_timeout: int | None = None,
+    beta: float = 1.0,
+) -> Any:
+    """
+    Cache-aside read with stampede protection.
+
+    - Single-flight: only the worker that wins ``cache.add`` on a refresh lock
+      recomputes; the rest keep serving what is cached.
+    - Stale-while-revalidate: entries stay readable for ``stale_timeout``
+      seconds past ``timeout`` and are served while one worker refreshes.
+    - Probabilistic early expiration: fresh entries are occasionally refreshed
+      shortly before they go stale (see ``_should_refresh``).
+
+    On a cold miss, callers that lose the lock wait briefly for the winner's
+    value before computing it themselves. ``cache.delete(key)`` still works as
+    a hard invalidation. Exceptions from ``compute`` propagate uncached.
+    """
+    if stale_timeout is None:
+        stale_timeout = timeout
+
+    entry = cache.get(key)
+    if not isinstance(entry, CacheEntry):
+        entry = None
+
+    if entry is not None and not _should_refresh(entry, beta):
+        return entry.value
+
+    lock_key = _lock_key(key)
+    if cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        try:
+            return _compute_and_store(key, compute, timeout, stale_timeout)
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        return entry.value
+
+    deadline = time.monotonic() + COLD_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(COLD_WAIT_INTERVAL)
+        entry = cache.get(key)
+        if isinstance(entry, CacheEntry):
+            return entry.value
+        if cache.get(lock_key) is None:
+            break
+
+    logger.warning("Cache refresh for %s did not finish in time; computing", key)
+    return _compute_and_store(key, compute, timeout, stale_timeout)
+
+
+def run_once(
+    key: str, func: Callable[[], Any], timeout: int = LOCK_TIMEOUT, wait: bool = False
+) -> bool:
+    """
+    Runs ``func`` unless another worker already holds the lock for ``key``.
+    With ``wait``, a caller that loses the lock blocks (up to
+    ``COLD_WAIT_TIMEOUT``) until the winner releases it. Returns whether it ran.
+    """
+    lock_key = _lock_key(key)
+    if cache.add(lock_key, 1, timeout=timeout):
+        try:
+            func()
+        finally:
+            cache.delete(lock_key)
+        return True
+
+    if wait:
+        deadline = time.monotonic() + COLD_WAIT_TIMEOUT
+        while time.monotonic() < deadline and cache.get(lock_key) is not None:
+            time.sleep(COLD_WAIT_INTERVAL)
+    return False
+
+
+class RedisMarkerStore:
+    """
+    Single-flight markers as plain strings in Redis. ``delete_if_equal``
+    deletes a marker only while it still holds the given token, so one that
+    expired and was claimed again by someone else is left alone.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def add(self, key: str, token: str, timeout: int) -> bool:
+        return bool(self.client.set(key, token, nx=True, ex=timeout))
+
+    def get(self, key: str) -> str | None:
+        return self.client.get(key)
+
+    def set(self, key: str, token: str, timeout: int) -> None:
+        self.client.set(key, token, ex=timeout)
+
+    def delete_if_equal(self, key: str, token: str) -> bool:
+        return bool(self.client.eval(_DELETE_IF_EQUAL_SCRIPT, 1, key, token))
+
+
+class CacheMarkerStore:
+    """
+    Markers kept in the Django cache. Used by the test suite (locmem cache);
+    ``delete_if_equal`` is a get-then-delete and not atomic.
+    """
+
+    def add(self, key: str, token: str, timeout: int) -> bool:
+        return cache.add(key, token, timeout=timeout)
+
+    def get(self, key: str) -> str | None:
+        return cache.get(key)
+
+    def set(self, key: str, token: str, timeout: int) -> None:
+        cache.set(key, token, timeout=timeout)
+
+    def delete_if_equal(self, key: str, token: str) -> bool:
+        if cache.get(key) == token:
+            return cache.delete(key)
+        return False
+
+
+_redis_client = None
+
+
+def get_redis_client():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.from_url(settings.MARKER_REDIS_URL, decode_responses=True)
+    return _redis_client
+
+
+def get_marker_store():
+    if getattr(settings, "MARKER_STORE", "redis") == "cache":
+        return CacheMarkerStore()
+    return RedisMarkerStore(get_redis_client())
@@ -19,6 +19,10 @@ app.autodiscover_tasks()
 # Also discover tasks from the project package itself (project/tasks.py)
 app.autodiscover_tasks(["project"])
 
+# Broker wait-time/queue-depth instrumentation and stored-argument redaction
+# (both connect Celery signals).
+from project import queue_metrics, task_results  # noqa: E402,F401
+
 logger = logging.getLogger(__name__)
 
 
@@ -0,0 +1,136 @@
+"""
+Resized renditions of uploaded images.
+
+Uploads are stored as sent and the request returns at once; a Celery task
+then derives one WebP per size in ``RENDITIONS``, each capped to that many
+pixels on its longer side, with EXIF orientation applied and all metadata
+dropped. Each rendition is recorded in the model's ``<field>_renditions``
+JSON field under the name the storage saved it as (Cloudinary adds a random
+suffix), next to the source it came from, so a re-run only writes the
+renditions missing from that record and never probes the storage.
+``build_file_url`` serves a rendition only while that source is still the
+field's current file, and the original until then. A source that cannot be
+decoded is recorded with an ``error`` instead, so it is not retried on
+every save.
+"""
+
+import io
+import json
+import logging
+from hashlib import sha256
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Longest side in pixels; smaller images are never upscaled.
+RENDITIONS = {"thumb": 320, "feed": 1080, "full": 2048}
+RENDITION_DIR = "renditions"
+WEBP_QUALITY = 80
+# Part of every rendition name: bump it when the encoding below changes so
+# new renditions never reuse files written the old way.
+RENDITION_VERSION = 1
+
+
+def renditions_field(field_name: str) -> str:
+    return f"{field_name}_renditions"
+
+
+def recorded_renditions(file_field) -> dict[str, str]:
+    """Rendition names made from the field's current file, if any."""
+    recorded = getattr(
+        file_field.instance, renditions_field(file_field.field.name), None
+    )
+    if not recorded or recorded.get("source") != file_field.name:
+        return {}
+    return recorded
+
+
+def missing_renditions(instance, field_name: str) -> list[str]:
+    """Renditions still to be made from the field's current file."""
+    file = getattr(instance, field_name)
+    if not file:
+        return []
+    recorded = recorded_renditions(file)
+    if "error" in recorded:
+        return []
+    return [rendition for rendition in RENDITIONS if rendition not in recorded]
+
+
+def needs_renditions(instance, field_name: str) -> bool:
+    return bool(missing_renditions(instance, field_name))
+
+
+def rendition_name(source: str, rendition: str) -> str:
+    inputs = {
+        "source": source,
+        "rendition": rendition,
+        "size": RENDITIONS[rendition],
+        "quality": WEBP_QUALITY,
+        "version": RENDITION_VERSION,
+    }
+    payload = json.dumps(inputs, sort_keys=True, separators=(",", ":"))
+    digest = sha256(payload.encode("utf-8")).hexdigest()[:32]
+    return f"{RENDITION_DIR}/{digest}.webp"
+
+
+def encode_webp(image: Image.Image, size: int) -> bytes:
+    resized = image.copy()
+    resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    # No ``exif``/``icc_profile`` arguments, so no metadata is written.
+    resized.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def _open_source(file) -> Image.Image:
+    with file.open("rb"):
+        image = Image.open(file)
+        # Decode JPEGs at the smallest scale that still covers the largest
+        # rendition instead of at full resolution.
+        largest = max(RENDITIONS.values())
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    return image.convert("RGBA" if has_alpha else "RGB")
+
+
+def _record(instance, field_name: str, recorded: dict) -> bool:
+    # Only if the field still holds the file the renditions were made from.
+    updated = (
+        type(instance)
+        .objects.filter(pk=instance.pk, **{field_name: recorded["source"]})
+        .update(**{renditions_field(field_name): recorded})
+    )
+    setattr(instance, renditions_field(field_name), recorded)
+    return bool(updated)
+
+
+def render_renditions(instance, field_name: str) -> bool:
+    """
+    Writes the missing renditions of ``instance.<field_name>`` and records
+    them. Returns True if renditions were recorded; False when they were
+    already current, the field is empty or the file is not a usable image
+    (recorded as an error).
+    """
+    file = getattr(instance, field_name)
+    missing = missing_renditions(instance, field_name)
+    if not missing:
+        return False
+
+    try:
+        image = _open_source(file)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as exc:
+        logger.warning("Cannot render %s %s: %s", field_name, file.name, exc)
+        _record(instance, field_name, {"source": file.name, "error": str(exc)})
+        return False
+
+    recorded = {"source": file.name, **recorded_renditions(file)}
+    for rendition in missing:
+        data = encode_webp(image, RENDITIONS[rendition])
+        # Keep the name the storage returns; it need not be the one asked for.
+        recorded[rendition] = file.storage.save(
+            rendition_name(file.name, rendition), ContentFile(data)
+        )
+    return _record(instance, field_name, recorded)
@@ -2,6 +2,8 @@ from urllib.parse import urlparse
 
 from django.conf import settings
 
+from project.images import recorded_renditions
+
 
 def _is_absolute_url(url: str) -> bool:
     parsed = urlparse(url)
@@ -24,12 +26,17 @@ def build_media_url(raw_url: str, request=None) -> str | None:
     return f"{settings.BACKEND_URL.rstrip('/')}{raw_url}"
 
 
-def build_file_url(file_field, request=None) -> str | None:
+def build_file_url(file_field, request=None, rendition=None) -> str | None:
+    """
+    URL of ``file_field``, or of its ``rendition`` (see project.images) once
+    one has been made from the current file.
+    """
     if not file_field:
         return None
 
     try:
-        raw_url = file_field.url
+        name = rendition and recorded_renditions(file_field).get(rendition)
+        raw_url = file_field.storage.url(name) if name else file_field.url
     except Exception:
         return None
 
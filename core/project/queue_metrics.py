@@ -0,0 +1,96 @@
+import logging
+import time
+
+from celery.signals import before_task_publish, task_prerun
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+ENQUEUED_AT_HEADER = "enqueued_at"
+WAIT_METRICS_WINDOW = 60 * 60 * 24  # Counters reset a day after the first sample
+
+
+def _wait_key(queue: str, field: str) -> str:
+    return f"celery_queue_wait:{queue}:{field}"
+
+
+@before_task_publish.connect(dispatch_uid="stamp_task_enqueued_at")
+def stamp_enqueued_at(headers=None, **kwargs):
+    """
+    Stamps every published task with its enqueue time so the worker can
+    measure how long it waited in the broker.
+    """
+    if headers is not None:
+        headers.setdefault(ENQUEUED_AT_HEADER, time.time())
+
+
+@task_prerun.connect(dispatch_uid="record_task_wait_time")
+def record_wait_time(task=None, **kwargs):
+    if task is None:
+        return
+
+    enqueued_at = getattr(task.request, ENQUEUED_AT_HEADER, None)
+    if not enqueued_at:
+        return
+
+    delivery_info = getattr(task.request, "delivery_info", None) or {}
+    queue = delivery_info.get("routing_key") or "celery"
+    wait_ms = max(int((time.time() - float(enqueued_at)) * 1000), 0)
+
+    try:
+        record_wait_sample(queue, wait_ms)
+    except Exception as exc:
+        logger.warning("Failed to record wait time for queue %s: %s", queue, exc)
+
+
+def record_wait_sample(queue: str, wait_ms: int) -> None:
+    for field in ("count", "total_ms"):
+        cache.add(_wait_key(queue, field), 0, timeout=WAIT_METRICS_WINDOW)
+    cache.incr(_wait_key(queue, "count"))
+    cache.incr(_wait_key(queue, "total_ms"), wait_ms)
+    cache.set(_wait_key(queue, "last_ms"), wait_ms, timeout=WAIT_METRICS_WINDOW)
+    if wait_ms > (cache.get(_wait_key(queue, "max_ms")) or 0):
+        cache.set(_wait_key(queue, "max_ms"), wait_ms, timeout=WAIT_METRICS_WINDOW)
+
+
+def get_wait_metrics(queue: str) -> dict[str, int | float | None]:
+    values = cache.get_many(
+        [
+            _wait_key(queue, field)
+            for field in ("count", "total_ms", "last_ms", "max_ms")
+        ]
+    )
+    count = values.get(_wait_key(queue, "count")) or 0
+    total_ms = values.get(_wait_key(queue, "total_ms")) or 0
+    return {
+        "samples": count,
+        "avg_wait_ms": round(total_ms / count, 1) if count else None,
+        "last_wait_ms": values.get(_wait_key(queue, "last_ms")),
+        "max_wait_ms": values.get(_wait_key(queue, "max_ms")),
+    }
+
+
+def get_queue_depth(app, queue: str) -> int | None:
+    """
+    Number of messages waiting in the broker for ``queue``.
+    """
+    try:
+        with app.connection_for_read() as connection:
+            declared = connection.default_channel.queue_declare(
+                queue=queue, passive=True
+            )
+            return declared.message_count
+    except Exception as exc:
+        logger.warning("Failed to read depth of queue %s: %s", queue, exc)
+        return None
+
+
+def get_queue_metrics(app, queues: list[str]) -> list[dict[str, object]]:
+    return [
+        {
+            "queue": queue,
+            "depth": get_queue_depth(app, queue),
+            **get_wait_metrics(queue),
+        }
+        for queue in queues
+    ]
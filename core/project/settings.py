@@ -63,6 +63,7 @@ INSTALLED_APPS = [
     "posts",
     "notifications",
     "achievements",
+    "judge",
 ]
 
 staticfiles_index = INSTALLED_APPS.index("django.contrib.staticfiles")
@@ -380,21 +381,96 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
 
-# Celery Result Backend — django-db stores results in PostgreSQL
-CELERY_RESULT_BACKEND = "django-db"
+# Celery Result Backends (tiered)
+# - CELERY_RESULT_BACKEND: durable store (django-db = PostgreSQL) for tasks that
+#   need an audit trail. Set to a redis:// URL to keep every result in Redis.
+# - EPHEMERAL_RESULT_BACKEND: Redis with a short TTL for high-volume tasks
+#   (AI hints/analysis, leaderboard) built on project.task_results.EphemeralResultTask.
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "django-db")
+EPHEMERAL_RESULT_BACKEND = os.getenv(
+    "EPHEMERAL_RESULT_BACKEND", os.getenv("REDIS_URL", "redis://redis:6379/0")
+)
+EPHEMERAL_RESULT_EXPIRES = int(os.getenv("EPHEMERAL_RESULT_EXPIRES", str(60 * 15)))
 CELERY_CACHE_BACKEND = "django-cache"  # Cache backend for result metadata
 CELERY_RESULT_EXTENDED = True  # Store task args, kwargs, worker, etc.
 CELERY_RESULT_EXPIRES = 60 * 60 * 24  # Auto-expire results after 24 hours
+CELERY_RESULT_DB_RETENTION_DAYS = int(os.getenv("CELERY_RESULT_DB_RETENTION_DAYS", "7"))
+CELERY_RESULT_CLEANUP_BATCH_SIZE = int(
+    os.getenv("CELERY_RESULT_CLEANUP_BATCH_SIZE", "1000")
+)
+# Arguments masked in stored args/kwargs (everything else is truncated).
+CELERY_REDACTED_TASK_ARGUMENTS = [
+    "user_code",
+    "otp",
+    "password",
+    "token",
+    "access_token",
+    "refresh_token",
+]
 CELERY_TASK_TRACK_STARTED = True  # Track STARTED state in result backend
 CELERY_TASK_STORE_ERRORS_EVEN_IF_IGNORED = True  # Always persist error tracebacks
 
+# Dedicated queue for long-running AI calls. Its worker runs a gevent pool so
+# hundreds of LLM waits share one process instead of one prefork child each:
+#   celery -A project worker -Q ai -P gevent -c 200 --prefetch-multiplier=1
+AI_TASK_QUEUE = os.getenv("AI_TASK_QUEUE", "ai")
+AI_HTTP_POOL_SIZE = int(os.getenv("AI_HTTP_POOL_SIZE", "200"))
+CELERY_TASK_DEFAULT_QUEUE = "celery"
+CELERY_TASK_ROUTES = {
+    "learning.tasks.generate_ai_hint_task": {"queue": AI_TASK_QUEUE},
+    "learning.tasks.generate_ai_analysis_task": {"queue": AI_TASK_QUEUE},
+}
+
+# Live leaderboard: a Redis sorted set updated on every XP change and
+# challenge completion. The periodic rebuild below only reconciles drift.
+LEADERBOARD_STORE = os.getenv("LEADERBOARD_STORE", "redis")
+LEADERBOARD_REDIS_URL = os.getenv(
+    "LEADERBOARD_REDIS_URL", os.getenv("REDIS_URL", "redis://redis:6379/0")
+)
+
+# Home timelines: per-user Redis sorted sets of post ids, fanned out on write.
+TIMELINE_STORE = os.getenv("TIMELINE_STORE", "redis")
+TIMELINE_REDIS_URL = os.getenv(
+    "TIMELINE_REDIS_URL", os.getenv("REDIS_URL", "redis://redis:6379/0")
+)
+
+# Single-flight markers (project.caching.get_marker_store): plain-string
+# tokens in Redis, released by an atomic compare-and-delete.
+MARKER_STORE = os.getenv("MARKER_STORE", "redis")
+MARKER_REDIS_URL = os.getenv(
+    "MARKER_REDIS_URL", os.getenv("REDIS_URL", "redis://redis:6379/0")
+)
+
+# Server-side judge: submissions run in rlimited children forked from
+# pre-warmed fork-servers. JUDGE_POOL_SIZE counts fork-servers per host and is
+# split between the WEB_CONCURRENCY gunicorn workers; unset, it is one per
+# CPU the container may use.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "2"))
+JUDGE_POOL_SIZE = int(os.getenv("JUDGE_POOL_SIZE", "0")) or None
+JUDGE_FORK_PARALLELISM = int(os.getenv("JUDGE_FORK_PARALLELISM", "1"))
+JUDGE_BATCH_SIZE = int(os.getenv("JUDGE_BATCH_SIZE", "16"))
+JUDGE_MAX_QUEUE = int(os.getenv("JUDGE_MAX_QUEUE", "256"))
+JUDGE_MAX_CONCURRENT_PER_USER = int(os.getenv("JUDGE_MAX_CONCURRENT_PER_USER", "2"))
+JUDGE_CPU_SECONDS = int(os.getenv("JUDGE_CPU_SECONDS", "2"))
+JUDGE_MEMORY_MB = int(os.getenv("JUDGE_MEMORY_MB", "256"))
+JUDGE_WALL_SECONDS = float(os.getenv("JUDGE_WALL_SECONDS", "5"))
+JUDGE_OUTPUT_BYTES = int(os.getenv("JUDGE_OUTPUT_BYTES", "4096"))
+JUDGE_MAX_CODE_BYTES = int(os.getenv("JUDGE_MAX_CODE_BYTES", "50000"))
+JUDGE_VERDICT_CACHE_TIMEOUT = int(
+    os.getenv("JUDGE_VERDICT_CACHE_TIMEOUT", str(60 * 60 * 24))
+)
+
 # Celery Beat
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 
 CELERY_BEAT_SCHEDULE = {
-    "update-leaderboard-every-5-minutes": {
+    "reconcile-leaderboard-hourly": {
         "task": "learning.tasks.update_leaderboard_cache",
-        "schedule": 300.0,  # 5 minutes
+        "schedule": 60 * 60,  # Every hour
+    },
+    "reconcile-xp-ledger-daily": {
+        "task": "xpoint.tasks.reconcile_xp_ledger_task",
+        "schedule": 60 * 60 * 24,  # Every 24 hours
     },
     "cleanup-celery-results-daily": {
         "task": "project.tasks.cleanup_old_task_results",
@@ -417,5 +493,10 @@ if "test" in sys.argv:
     CELERY_TASK_ALWAYS_EAGER = True
     CELERY_BROKER_URL = "memory://"
     CELERY_RESULT_BACKEND = "cache+memory://"
+    EPHEMERAL_RESULT_BACKEND = "cache+memory://"
+    LEADERBOARD_STORE = "cache"
+    TIMELINE_STORE = "cache"
+    MARKER_STORE = "cache"
+    JUDGE_POOL_SIZE = 1
     # Use memory email backend
     EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
@@ -0,0 +1,89 @@
+import inspect
+import logging
+
+from celery import Task, current_app
+from celery.app.backends import by_url
+from celery.signals import before_task_publish
+from celery.utils.saferepr import saferepr
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+REDACTED = "<redacted>"
+ARGS_REPR_MAXSIZE = 256
+
+_ephemeral_backend = None
+
+
+def get_ephemeral_backend(app=None):
+    """
+    Short-TTL Redis result backend shared by every ``EphemeralResultTask``.
+    """
+    global _ephemeral_backend
+    if _ephemeral_backend is None:
+        app = app or current_app
+        backend_cls, url = by_url(settings.EPHEMERAL_RESULT_BACKEND, app.loader)
+        _ephemeral_backend = backend_cls(
+            app=app, url=url, expires=settings.EPHEMERAL_RESULT_EXPIRES
+        )
+    return _ephemeral_backend
+
+
+class EphemeralResultTask(Task):
+    """
+    Base class for high-volume tasks (AI, leaderboard) whose results are only
+    read for a few minutes. Results go to Redis with a short TTL instead of
+    the durable ``CELERY_RESULT_BACKEND``, which is kept for tasks that need
+    an audit trail.
+    """
+
+    @property
+    def backend(self):
+        return self._backend or get_ephemeral_backend(self.app)
+
+    @backend.setter
+    def backend(self, value):
+        self._backend = value
+
+
+def redact_task_arguments(task, args, kwargs) -> tuple[str, str]:
+    """
+    Builds ``argsrepr``/``kwargsrepr`` with sensitive arguments (user code,
+    OTPs, tokens) masked and everything else truncated.
+    """
+    redacted_names = set(settings.CELERY_REDACTED_TASK_ARGUMENTS)
+    args = list(args or ())
+    kwargs = dict(kwargs or {})
+
+    if task is not None:
+        try:
+            parameters = list(inspect.signature(task.run).parameters)
+        except (TypeError, ValueError):
+            parameters = []
+        for index, name in enumerate(parameters[: len(args)]):
+            if name in redacted_names:
+                args[index] = REDACTED
+
+    for name in kwargs:
+        if name in redacted_names:
+            kwargs[name] = REDACTED
+
+    return (
+        saferepr(tuple(args), ARGS_REPR_MAXSIZE),
+        saferepr(kwargs, ARGS_REPR_MAXSIZE),
+    )
+
+
+@before_task_publish.connect(dispatch_uid="redact_task_arguments")
+def redact_published_arguments(sender=None, body=None, headers=None, **kwargs):
+    """
+    Replaces the argument representations stored with extended results so
+    full ``user_code`` strings and secrets never reach the results table.
+    """
+    if headers is None or not isinstance(body, (tuple, list)) or len(body) < 2:
+        return
+
+    task = current_app.tasks.get(sender)
+    argsrepr, kwargsrepr = redact_task_arguments(task, body[0], body[1])
+    headers["argsrepr"] = argsrepr
+    headers["kwargsrepr"] = kwargsrepr
@@ -2,6 +2,7 @@ import logging
 from datetime import timedelta
 
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
@@ -10,15 +11,32 @@ logger = logging.getLogger(__name__)
 @shared_task(name="project.tasks.cleanup_old_task_results")
 def cleanup_old_task_results():
     """
-    Periodic task to purge Celery task results older than 7 days
+    Periodic task to purge Celery task results older than the retention window
     from the django_celery_results database table.
-    Keeps the results table from growing unbounded.
+    Deletes in primary-key batches so each statement holds its locks briefly
+    instead of one large DELETE over the whole backlog.
     """
     from django_celery_results.models import TaskResult
 
-    cutoff = timezone.now() - timedelta(days=7)
-    deleted_count, _ = TaskResult.objects.filter(date_done__lt=cutoff).delete()
+    retention_days = getattr(settings, "CELERY_RESULT_DB_RETENTION_DAYS", 7)
+    batch_size = getattr(settings, "CELERY_RESULT_CLEANUP_BATCH_SIZE", 1000)
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    expired = TaskResult.objects.filter(date_done__lt=cutoff).order_by("pk")
+
+    deleted_count = 0
+    batches = 0
+    while True:
+        batch_ids = list(expired.values_list("pk", flat=True)[:batch_size])
+        if not batch_ids:
+            break
+        deleted, _ = TaskResult.objects.filter(pk__in=batch_ids).delete()
+        deleted_count += deleted
+        batches += 1
+
     logger.info(
-        "Cleaned up %d old task result(s) (older than %s)", deleted_count, cutoff
+        "Cleaned up %d old task result(s) in %d batch(es) (older than %s)",
+        deleted_count,
+        batches,
+        cutoff,
     )
-    return {"deleted": deleted_count, "cutoff": str(cutoff)}
+    return {"deleted": deleted_count, "batches": batches, "cutoff": str(cutoff)}
@@ -0,0 +1,75 @@
+import time
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from project.caching import CacheEntry, get_or_compute, run_once
+
+
+class GetOrComputeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_miss_computes_once_then_serves_cache(self):
+        compute = Mock(return_value={"total": 1})
+
+        self.assertEqual(get_or_compute("k", compute, 60), {"total": 1})
+        self.assertEqual(get_or_compute("k", compute, 60), {"total": 1})
+        compute.assert_called_once()
+
+    def test_stale_value_served_while_another_worker_refreshes(self):
+        cache.set("k", CacheEntry("stale", time.time() - 1, 0.1), timeout=60)
+        cache.add("k:refresh-lock", 1)
+        compute = Mock(return_value="fresh")
+
+        self.assertEqual(get_or_compute("k", compute, 60), "stale")
+        compute.assert_not_called()
+
+    def test_stale_value_refreshed_by_lock_winner(self):
+        cache.set("k", CacheEntry("stale", time.time() - 1, 0.1), timeout=60)
+
+        self.assertEqual(get_or_compute("k", lambda: "fresh", 60), "fresh")
+        self.assertIsNone(cache.get("k:refresh-lock"))
+        self.assertEqual(cache.get("k").value, "fresh")
+
+    def test_early_expiration_refreshes_before_deadline(self):
+        cache.set("k", CacheEntry("old", time.time() + 5, 10.0), timeout=60)
+
+        with patch("project.caching.random.random", return_value=0.99):
+            self.assertEqual(get_or_compute("k", lambda: "new", 60), "new")
+        with patch("project.caching.random.random", return_value=0.0):
+            self.assertEqual(get_or_compute("k", lambda: "newer", 60), "new")
+
+    def test_cold_miss_waits_for_lock_holder(self):
+        cache.add("k:refresh-lock", 1)
+        compute = Mock(return_value="mine")
+
+        def finish_refresh(_seconds):
+            cache.set("k", CacheEntry("theirs", time.time() + 60, 0.1))
+
+        with patch("project.caching.time.sleep", side_effect=finish_refresh):
+            self.assertEqual(get_or_compute("k", compute, 60), "theirs")
+        compute.assert_not_called()
+
+    def test_errors_are_not_cached_and_release_lock(self):
+        with self.assertRaises(ValueError):
+            get_or_compute("k", Mock(side_effect=ValueError), 60)
+
+        self.assertIsNone(cache.get("k"))
+        self.assertIsNone(cache.get("k:refresh-lock"))
+
+    def test_delete_invalidates(self):
+        get_or_compute("k", lambda: "first", 60)
+        cache.delete("k")
+
+        self.assertEqual(get_or_compute("k", lambda: "second", 60), "second")
+
+    def test_run_once_skips_when_locked(self):
+        func = Mock()
+        cache.add("job:refresh-lock", 1)
+
+        self.assertFalse(run_once("job", func))
+        cache.delete("job:refresh-lock")
+        self.assertTrue(run_once("job", func))
+        func.assert_called_once()
@@ -0,0 +1,185 @@
+import io
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from certificates.tests.test_certificate_rendering import RENAMING_STORAGES
+from posts.models import Post
+from posts.tests.test_views import IN_MEMORY_STORAGES
+from project import images
+from project.media import build_file_url
+from users.models import UserProfile
+
+
+def upload(size=(3000, 2000), color="red", fmt="JPEG", exif=None):
+    buffer = io.BytesIO()
+    options = {"exif": exif} if exif is not None else {}
+    mode = "RGBA" if isinstance(color, tuple) and len(color) == 4 else "RGB"
+    Image.new(mode, size, color).save(buffer, fmt, **options)
+    return SimpleUploadedFile(
+        f"upload.{fmt.lower()}", buffer.getvalue(), content_type="image/jpeg"
+    )
+
+
+def open_stored(name):
+    from django.core.files.storage import default_storage
+
+    with default_storage.open(name, "rb") as file:
+        image = Image.open(io.BytesIO(file.read()))
+        image.load()
+    return image
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
+class ImageRenditionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="ada", password="pw")
+
+    def create_post(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(user=self.user, image=image)
+        post.refresh_from_db()
+        return post
+
+    def test_post_images_get_capped_webp_renditions_without_exif(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90° clockwise.
+        exif[0x010F] = "Secret Camera"
+        post = self.create_post(upload(exif=exif))
+
+        renditions = post.image_renditions
+        self.assertEqual(renditions["source"], post.image.name)
+        for rendition, size in images.RENDITIONS.items():
+            image = open_stored(renditions[rendition])
+            self.assertEqual(image.format, "WEBP")
+            # Orientation applied: portrait now, longer side capped.
+            self.assertEqual(max(image.size), min(size, 3000))
+            self.assertGreater(image.height, image.width)
+            self.assertNotIn("exif", image.info)
+
+        url = build_file_url(post.image, rendition="feed")
+        self.assertTrue(url.endswith(renditions["feed"]))
+
+    def test_small_and_transparent_images_are_not_upscaled(self):
+        post = self.create_post(
+            upload(size=(200, 100), color=(255, 0, 0, 128), fmt="PNG")
+        )
+
+        thumb = open_stored(post.image_renditions["thumb"])
+        self.assertEqual(thumb.size, (200, 100))
+        self.assertEqual(thumb.mode, "RGBA")
+
+    def test_original_is_served_until_renditions_match_it(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            post = Post.objects.create(user=self.user, image=upload())
+        self.assertEqual(
+            build_file_url(post.image, rendition="thumb"), build_file_url(post.image)
+        )
+
+        for callback in callbacks:
+            callback()
+        post.refresh_from_db()
+        self.assertNotEqual(
+            build_file_url(post.image, rendition="thumb"), build_file_url(post.image)
+        )
+
+        # A replaced image falls back to itself until re-rendered.
+        post.image = upload(size=(100, 100))
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        self.assertTrue(images.needs_renditions(post, "image"))
+        post.refresh_from_db()
+        self.assertEqual(post.image_renditions["source"], post.image.name)
+
+    def test_rerun_writes_only_missing_renditions_and_stale_saves_keep_them(self):
+        post = self.create_post(upload())
+        stale = Post.objects.get(pk=post.pk)
+        recorded = dict(post.image_renditions)
+        del recorded["full"]
+        Post.objects.filter(pk=post.pk).update(image_renditions=recorded)
+        post.refresh_from_db()
+
+        with patch.object(images, "encode_webp", return_value=b"webp") as encode:
+            self.assertTrue(images.render_renditions(post, "image"))
+        encode.assert_called_once()
+        self.assertEqual(post.image_renditions["thumb"], recorded["thumb"])
+        self.assertFalse(images.render_renditions(post, "image"))
+
+        stale.caption = "edited"
+        stale.save()
+        post.refresh_from_db()
+        self.assertEqual(post.image_renditions["source"], post.image.name)
+
+    def test_unreadable_upload_is_recorded_and_not_retried(self):
+        bogus = SimpleUploadedFile("x.jpg", b"not an image", content_type="image/jpeg")
+        post = self.create_post(bogus)
+
+        self.assertEqual(post.image_renditions["source"], post.image.name)
+        self.assertIn("error", post.image_renditions)
+        self.assertFalse(images.needs_renditions(post, "image"))
+        self.assertEqual(
+            build_file_url(post.image, rendition="feed"), build_file_url(post.image)
+        )
+
+    def test_profile_avatar_and_banner_are_rendered_after_commit(self):
+        profile = self.user.profile
+        profile.avatar = upload(size=(800, 800))
+        profile.banner = upload(size=(4000, 1000))
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+
+        profile = UserProfile.objects.get(pk=profile.pk)
+        self.assertEqual(
+            open_stored(profile.avatar_renditions["thumb"]).size, (320, 320)
+        )
+        self.assertEqual(
+            open_stored(profile.banner_renditions["full"]).size, (2048, 512)
+        )
+
+    def test_profile_saves_keep_renditions_and_skip_failed_avatars(self):
+        profile = self.user.profile
+        profile.avatar = SimpleUploadedFile("a.jpg", b"junk", content_type="image/jpeg")
+        profile.banner = upload(size=(800, 200))
+        with self.captureOnCommitCallbacks() as callbacks:
+            profile.save()
+        # Loaded before the rendition task finished.
+        stale = UserProfile.objects.get(pk=profile.pk)
+        for callback in callbacks:
+            callback()
+
+        # Saving it neither reverts the renditions nor queues the unreadable
+        # avatar again.
+        stale.bio = "edited"
+        stale.save()
+        profile.refresh_from_db()
+        self.assertEqual(profile.banner_renditions["source"], profile.banner.name)
+        self.assertIn("error", profile.avatar_renditions)
+        with self.captureOnCommitCallbacks() as callbacks:
+            profile.save()
+        self.assertEqual(callbacks, [])
+
+
+@override_settings(STORAGES=RENAMING_STORAGES)
+class RenamingStorageRenditionTests(TestCase):
+    """Cloudinary saves under its own names; those are what gets served."""
+
+    def test_renamed_renditions_are_served_and_not_rewritten(self):
+        user = User.objects.create_user(username="ada", password="pw")
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(user=user, image=upload(size=(400, 300)))
+        post.refresh_from_db()
+
+        feed = post.image_renditions["feed"]
+        self.assertNotEqual(feed, images.rendition_name(post.image.name, "feed"))
+        self.assertEqual(open_stored(feed).format, "WEBP")
+        self.assertTrue(build_file_url(post.image, rendition="feed").endswith(feed))
+
+        with patch.object(images, "encode_webp") as encode:
+            self.assertFalse(images.render_renditions(post, "image"))
+            post.caption = "edited"
+            with self.captureOnCommitCallbacks(execute=True):
+                post.save()
+        encode.assert_not_called()
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+from rest_framework.test import APIClient
+
+from auth.tasks import send_otp_email_task
+from learning.tasks import generate_ai_analysis_task, update_leaderboard_cache
+from notifications.tasks import send_push_notification_task
+from project.celery import app
+from project.task_results import (
+    REDACTED,
+    get_ephemeral_backend,
+    redact_task_arguments,
+)
+from project.tasks import cleanup_old_task_results
+
+
+class TaskArgumentRedactionTests(TestCase):
+    def test_sensitive_keyword_arguments_are_masked(self):
+        argsrepr, kwargsrepr = redact_task_arguments(
+            generate_ai_analysis_task,
+            (),
+            {"challenge_id": 1, "challenge_slug": "l1", "user_code": "x" * 5000},
+        )
+        self.assertIn(REDACTED, kwargsrepr)
+        self.assertNotIn("xxxx", kwargsrepr)
+        self.assertIn("'challenge_slug': 'l1'", kwargsrepr)
+
+    def test_sensitive_positional_arguments_are_masked(self):
+        argsrepr, _ = redact_task_arguments(
+            send_otp_email_task, ("user@example.com", "123456"), {}
+        )
+        self.assertIn("user@example.com", argsrepr)
+        self.assertNotIn("123456", argsrepr)
+
+    def test_long_arguments_are_truncated(self):
+        argsrepr, _ = redact_task_arguments(
+            send_push_notification_task, (1, "title", "b" * 5000), {}
+        )
+        self.assertLess(len(argsrepr), 400)
+
+
+class ResultBackendTieringTests(TestCase):
+    def test_high_volume_tasks_use_ephemeral_backend(self):
+        self.assertIsNot(generate_ai_analysis_task.backend, app.backend)
+        self.assertIs(
+            update_leaderboard_cache.backend, generate_ai_analysis_task.backend
+        )
+        self.assertIs(send_otp_email_task.backend, app.backend)
+
+    def test_status_view_finds_ephemeral_results(self):
+        get_ephemeral_backend().store_result(
+            "leaderboard-run", {"status": "success", "entries": 3}, "SUCCESS"
+        )
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(user=admin)
+
+        response = client.get(
+            reverse("task-status", kwargs={"task_id": "leaderboard-run"})
+        )
+
+        self.assertEqual(response.data["status"], "SUCCESS")
+        self.assertEqual(response.data["result"]["entries"], 3)
+
+
+class CleanupOldTaskResultsTests(TestCase):
+    def _create_results(self, count, age_days):
+        TaskResult.objects.bulk_create(
+            TaskResult(task_id=f"task-{age_days}-{index}", status="SUCCESS")
+            for index in range(count)
+        )
+        TaskResult.objects.filter(task_id__startswith=f"task-{age_days}-").update(
+            date_done=timezone.now() - timedelta(days=age_days)
+        )
+
+    @override_settings(CELERY_RESULT_CLEANUP_BATCH_SIZE=2)
+    def test_deletes_expired_results_in_batches(self):
+        self._create_results(5, age_days=10)
+        self._create_results(3, age_days=1)
+
+        summary = cleanup_old_task_results()
+
+        self.assertEqual(summary["deleted"], 5)
+        self.assertEqual(summary["batches"], 3)
+        self.assertEqual(TaskResult.objects.count(), 3)
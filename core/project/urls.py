@@ -6,7 +6,7 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 from project.health import HealthCheckView
-from project.views import TaskStatusView, TaskResultsListView
+from project.views import TaskQueueMetricsView, TaskStatusView, TaskResultsListView
 
 urlpatterns = [
     # Health check
@@ -28,6 +28,7 @@ urlpatterns = [
         "api/tasks/<str:task_id>/status/", TaskStatusView.as_view(), name="task-status"
     ),
     path("api/tasks/results/", TaskResultsListView.as_view(), name="task-results"),
+    path("api/tasks/queues/", TaskQueueMetricsView.as_view(), name="task-queues"),
     # Swagger Documentation routes
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
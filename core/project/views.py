@@ -11,6 +11,8 @@ from drf_spectacular.utils import (
     OpenApiParameter,
 )
 
+from project.task_results import get_ephemeral_backend
+
 
 class TaskStatusView(APIView):
     """
@@ -40,6 +42,13 @@ class TaskStatusView(APIView):
     )
     def get(self, request, task_id):
         result = AsyncResult(task_id)
+        if result.status == "PENDING":
+            # Unknown to the results table: AI and leaderboard tasks
+            # (EphemeralResultTask) store their results in the ephemeral
+            # backend instead.
+            ephemeral = AsyncResult(task_id, backend=get_ephemeral_backend())
+            if ephemeral.status != "PENDING":
+                result = ephemeral
 
         response_data = {
             "task_id": task_id,
@@ -133,3 +142,34 @@ class TaskResultsListView(APIView):
             },
             status=status.HTTP_200_OK,
         )
+
+
+class TaskQueueMetricsView(APIView):
+    """
+    Broker queue depth and task wait-time metrics per Celery queue.
+    Only accessible by admin/staff users.
+
+    GET /api/tasks/queues/
+    """
+
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        responses={
+            200: inline_serializer(
+                name="TaskQueueMetricsResponse",
+                fields={
+                    "queues": serializers.ListField(child=serializers.DictField()),
+                },
+            )
+        },
+        description="Report pending messages and average/max broker wait time for the default and AI task queues.",
+    )
+    def get(self, request):
+        from project.celery import app
+        from project.queue_metrics import get_queue_metrics
+
+        queues = [settings.CELERY_TASK_DEFAULT_QUEUE, settings.AI_TASK_QUEUE]
+        return Response(
+            {"queues": get_queue_metrics(app, queues)}, status=status.HTTP_200_OK
+        )
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class StoreConfig(AppConfig):
     name = "store"
+
+    def ready(self):
+        import store.signals  # noqa: F401
@@ -0,0 +1,146 @@
+"""
+Storefront catalog served from a versioned snapshot.
+
+The active catalog only changes when admins edit it, so its serialized items
+are cached in Redis under the current version token and kept per process as
+an immutable snapshot. A ``StoreItem`` save or delete publishes a new version;
+every process reloads on its next read. Each user's owned item ids are cached
+alongside and dropped when one of their purchases changes. Responses built
+from the snapshot carry a strong ETag derived from their content, so
+unchanged storefronts revalidate with a 304.
+"""
+
+import json
+import threading
+from dataclasses import dataclass
+from hashlib import sha256
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Purchase, StoreItem
+from .serializers import StoreItemSerializer
+
+CATALOG_VERSION_KEY = "store_catalog:version"
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+OWNED_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: str
+    # Serialized active items, newest first, without the per-user ``is_owned``.
+    items: tuple[dict, ...]
+    by_id: dict[int, dict]
+    digest: str
+
+
+_snapshot: CatalogSnapshot | None = None
+_snapshot_lock = threading.Lock()
+
+
+def _items_key(version: str) -> str:
+    return f"store_catalog:items:{version}"
+
+
+def _owned_key(user_id: int) -> str:
+    return f"store_owned:{user_id}"
+
+
+def _current_version() -> str:
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, uuid4().hex, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def invalidate_catalog() -> None:
+    """Publishes a new catalog version; every process reloads on its next read."""
+    cache.set(CATALOG_VERSION_KEY, uuid4().hex, timeout=None)
+
+
+def content_digest(*parts) -> str:
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+    return sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _load_snapshot(version: str) -> CatalogSnapshot:
+    items = cache.get(_items_key(version))
+    if items is None:
+        active = StoreItem.objects.filter(is_active=True).order_by("-created_at")
+        serialized = StoreItemSerializer(
+            active, many=True, context={"owned_item_ids": frozenset()}
+        ).data
+        items = [
+            {key: value for key, value in item.items() if key != "is_owned"}
+            for item in serialized
+        ]
+        cache.set(_items_key(version), items, timeout=CATALOG_CACHE_TIMEOUT)
+    return CatalogSnapshot(
+        version=version,
+        items=tuple(items),
+        by_id={item["id"]: item for item in items},
+        digest=content_digest(items),
+    )
+
+
+def get_catalog() -> CatalogSnapshot:
+    global _snapshot
+    version = _current_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = _load_snapshot(version)
+        return _snapshot
+
+
+def owned_item_ids(user) -> list[int]:
+    """
+    Ids of the items ``user`` bought, most recent first. Cached per user and
+    dropped whenever one of their purchases changes.
+    """
+    key = _owned_key(user.id)
+    owned = cache.get(key)
+    if owned is None:
+        owned = list(
+            Purchase.objects.filter(user=user)
+            .order_by("-purchased_at")
+            .values_list("item_id", flat=True)
+        )
+        cache.set(key, owned, timeout=OWNED_CACHE_TIMEOUT)
+    return owned
+
+
+def invalidate_owned_items(user_id: int) -> None:
+    key = _owned_key(user_id)
+    cache.delete(key)
+    # Again after commit, in case a concurrent read cached the old set while
+    # the purchase was still uncommitted.
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def with_ownership(items, owned_item_ids) -> list[dict]:
+    return [{**item, "is_owned": item["id"] in owned_item_ids} for item in items]
+
+
+def conditional_response(request, etag: str, build) -> Response:
+    """
+    Answers 304 when ``If-None-Match`` already names ``etag``; otherwise
+    calls ``build()`` for the body. Either way the client must revalidate.
+    """
+    etag = f'"{etag}"'
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(build(), status=status.HTTP_200_OK)
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
@@ -24,6 +24,10 @@ class StoreItemSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(bool)
     def get_is_owned(self, obj):
+        # Views that already know what the user owns pass it in to save a query.
+        owned_item_ids = self.context.get("owned_item_ids")
+        if owned_item_ids is not None:
+            return obj.id in owned_item_ids
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             return Purchase.objects.filter(user=request.user, item=obj).exists()
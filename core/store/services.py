@@ -0,0 +1,124 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from users.models import UserProfile
+from xpoint.services import XPService
+from .models import Purchase
+
+IDEMPOTENCY_TTL = 60 * 60 * 24
+# How long a key stays claimed by a request that is still running.
+IDEMPOTENCY_CLAIM_TTL = 30
+_IN_PROGRESS = "in_progress"
+
+# Category -> (profile column, item_data keys holding the value, default).
+COSMETIC_SLOTS = {
+    "THEME": ("active_theme", ("theme_key",), "vs-dark"),
+    "FONT": ("active_font", ("font_family",), "Fira Code"),
+    "EFFECT": ("active_effect", ("effect_key", "effect_type"), None),
+    "VICTORY": ("active_victory", ("victory_key", "animation_type"), "default"),
+}
+
+
+class AlreadyOwnedError(Exception):
+    pass
+
+
+class IdempotencyKeyReusedError(Exception):
+    pass
+
+
+class InsufficientXPError(Exception):
+    def __init__(self, shortage):
+        super().__init__(f"Insufficient XP. Need {shortage} more.")
+        self.shortage = shortage
+
+
+class StoreService:
+    SOURCE_PURCHASE = "store_purchase"
+
+    @staticmethod
+    def purchase(user, item):
+        """
+        Buys ``item`` for ``user`` in one transaction and returns the
+        remaining XP.
+
+        The purchase row is inserted first, so a concurrent duplicate blocks
+        on the ``(user, item)`` unique constraint and fails instead of being
+        charged again. The debit is one conditional UPDATE (see
+        ``XPService.add_xp``); if it finds too little XP the insert rolls back
+        with it.
+        """
+        try:
+            with transaction.atomic():
+                Purchase.objects.create(user=user, item=item)
+                if item.cost <= 0:
+                    return UserProfile.objects.values_list("xp", flat=True).get(
+                        user=user
+                    )
+                return XPService.add_xp(
+                    user,
+                    -item.cost,
+                    source=StoreService.SOURCE_PURCHASE,
+                    description=f"Purchased {item.name}",
+                )
+        except IntegrityError as exc:
+            raise AlreadyOwnedError("You already own this item.") from exc
+        except ValueError as exc:
+            xp = UserProfile.objects.values_list("xp", flat=True).get(user=user)
+            raise InsufficientXPError(max(0, item.cost - xp)) from exc
+
+    @staticmethod
+    def set_cosmetic(user, field, value):
+        """
+        Writes a single ``active_*`` profile column with one UPDATE, leaving
+        the rest of the row (OAuth tokens included) untouched, and drops the
+        cached public profile.
+        """
+        UserProfile.objects.filter(user=user).update(
+            **{field: value, "updated_at": timezone.now()}
+        )
+        if type(user).profile.is_cached(user):
+            setattr(user.profile, field, value)
+        cache.delete(f"profile:{user.username}")
+
+
+class IdempotencyStore:
+    """
+    Remembers the response to a client-supplied ``Idempotency-Key`` so a
+    retried request gets the original result instead of running again. The
+    key is stored with a ``fingerprint`` of the request it was first used
+    for, and reusing it for a different request is an error.
+    """
+
+    def __init__(self, scope, user_id, key, fingerprint):
+        self.cache_key = f"idempotency:{scope}:{user_id}:{key}"
+        self.fingerprint = fingerprint
+
+    def claim(self):
+        """
+        Returns ``(claimed, stored)``: ``claimed`` is True if this request
+        owns the key; otherwise ``stored`` is the earlier ``(status, data)``
+        or ``None`` while that request is still running. Raises
+        ``IdempotencyKeyReusedError`` if the key belongs to another request.
+        """
+        if cache.add(
+            self.cache_key,
+            (self.fingerprint, _IN_PROGRESS),
+            timeout=IDEMPOTENCY_CLAIM_TTL,
+        ):
+            return True, None
+        fingerprint, stored = cache.get(self.cache_key, (self.fingerprint, None))
+        if fingerprint != self.fingerprint:
+            raise IdempotencyKeyReusedError
+        return False, None if stored == _IN_PROGRESS else stored
+
+    def save(self, status_code, data):
+        cache.set(
+            self.cache_key,
+            (self.fingerprint, (status_code, data)),
+            timeout=IDEMPOTENCY_TTL,
+        )
+
+    def release(self):
+        cache.delete(self.cache_key)
@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import invalidate_catalog, invalidate_owned_items
+from .models import Purchase, StoreItem
+
+
+@receiver(post_save, sender=StoreItem)
+@receiver(post_delete, sender=StoreItem)
+def refresh_store_catalog(sender, instance, **kwargs):
+    """Publish a new catalog version whenever an item is added, edited or removed."""
+    _ = sender, instance, kwargs
+    # After commit, so no reader rebuilds the new version from the old rows.
+    transaction.on_commit(invalidate_catalog)
+
+
+@receiver(post_save, sender=Purchase)
+@receiver(post_delete, sender=Purchase)
+def refresh_owned_items(sender, instance, **kwargs):
+    _ = sender, kwargs
+    invalidate_owned_items(instance.user_id)
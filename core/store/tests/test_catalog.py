@@ -0,0 +1,103 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from store.catalog import get_catalog
+from store.models import Purchase, StoreItem
+
+
+class StoreCatalogTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="shopper", password="pw")
+        self.client.force_authenticate(user=self.user)
+        self.theme = StoreItem.objects.create(
+            name="Dracula",
+            cost=200,
+            category="THEME",
+            item_data={"theme_key": "dracula"},
+            icon_name="moon",
+        )
+        self.font = StoreItem.objects.create(
+            name="Mono",
+            cost=100,
+            category="FONT",
+            item_data={"font_family": "Monospace"},
+            icon_name="type",
+        )
+        Purchase.objects.create(user=self.user, item=self.font)
+
+    def test_listing_reads_the_snapshot(self):
+        url = reverse("store-item-list")
+        self.client.get(url)
+
+        # Catalog and owned ids are both cached.
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+
+        self.assertEqual(
+            {item["name"]: item["is_owned"] for item in response.data},
+            {"Dracula": False, "Mono": True},
+        )
+
+    def test_unchanged_catalog_revalidates_with_304(self):
+        url = reverse("store-item-list")
+        first = self.client.get(url)
+        self.assertIn("no-cache", first["Cache-Control"])
+        self.assertNotIn("no-store", first["Cache-Control"])
+
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Purchase.objects.create(user=self.user, item=self.theme)
+        third = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+
+    def test_item_changes_publish_a_new_snapshot(self):
+        version = get_catalog().version
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.theme.cost = 150
+            self.theme.save()
+            # Readers before the commit keep the old version.
+            self.assertEqual(get_catalog().version, version)
+        for callback in callbacks:
+            callback()
+
+        catalog = get_catalog()
+        self.assertNotEqual(catalog.version, version)
+        self.assertEqual(catalog.by_id[self.theme.id]["cost"], 150)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.font.delete()
+        self.assertNotIn(self.font.id, get_catalog().by_id)
+
+    def test_admin_duplicate_appears_in_catalog(self):
+        admin = User.objects.create_user(
+            username="admin", password="pw", is_staff=True, is_superuser=True
+        )
+        self.client.force_authenticate(user=admin)
+        self.client.post(f"/api/admin/store/items/{self.theme.id}/duplicate/")
+        duplicate = StoreItem.objects.get(name="Dracula Copy")
+        duplicate.is_active = True
+        with self.captureOnCommitCallbacks(execute=True):
+            duplicate.save()
+
+        self.assertIn(duplicate.id, get_catalog().by_id)
+
+    def test_combined_endpoint_returns_catalog_and_ownership(self):
+        response = self.client.get(reverse("store-catalog"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["owned_item_ids"], [self.font.id])
+        self.assertEqual(len(response.data["items"]), 2)
+        self.assertEqual(response.data["equipped_items"]["theme"], "vs-dark")
+
+        self.client.post(reverse("store-equip"), {"item_id": self.font.id})
+        response = self.client.get(
+            reverse("store-catalog"), HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
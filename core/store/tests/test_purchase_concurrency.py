@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from store.models import Purchase, StoreItem
+from store.views import PurchaseItemView
+from users.models import UserProfile
+from xpoint.models import XPTransaction
+
+PARALLEL_REQUESTS = 50
+# Retries per request when the in-memory test database reports a lock.
+MAX_LOCK_RETRIES = 200
+
+
+def table_locked(response):
+    """Whether ``response`` is a 500 from SQLite's "table is locked"."""
+    if response.status_code != 500 or not response.exc_info:
+        return False
+    exc = response.exc_info[1]
+    return isinstance(exc, OperationalError) and "locked" in str(exc)
+
+
+class ConcurrentPurchaseTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        # 50 requests from one user would otherwise trip the store throttle.
+        throttle = patch.object(PurchaseItemView, "throttle_classes", [])
+        throttle.start()
+        self.addCleanup(throttle.stop)
+        self.user = User.objects.create_user(username="buyer", password="pw")
+        UserProfile.objects.filter(user=self.user).update(xp=500)
+        self.item = StoreItem.objects.create(
+            name="Dracula", cost=200, category="THEME", icon_name="moon"
+        )
+        # Lock errors below are retried; keep their 500s out of the output.
+        # Other 500s still fail the status assertions.
+        request_logger = logging.getLogger("django.request")
+        self.addCleanup(request_logger.setLevel, request_logger.level)
+        request_logger.setLevel(logging.CRITICAL)
+        self.url = reverse("store-buy", kwargs={"pk": self.item.pk})
+
+    def fire(self, **headers):
+        barrier = threading.Barrier(PARALLEL_REQUESTS)
+        responses = []
+
+        def buy():
+            # Test clients share the global request-exception signal, so
+            # errors are returned as 500s rather than raised in whichever
+            # thread happens to be listening.
+            client = APIClient(raise_request_exception=False)
+            client.force_authenticate(user=self.user)
+            try:
+                barrier.wait()
+                response = client.post(self.url, **headers)
+                for _ in range(MAX_LOCK_RETRIES):
+                    # The in-memory test database fails with "table is
+                    # locked" where PostgreSQL would block; wait likewise.
+                    # Any other error is kept for the assertions.
+                    if not table_locked(response):
+                        break
+                    time.sleep(0.01)
+                    response = client.post(self.url, **headers)
+                responses.append(response)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy) for _ in range(PARALLEL_REQUESTS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(responses), PARALLEL_REQUESTS)
+        return responses
+
+    def assertChargedOnce(self):
+        self.assertEqual(UserProfile.objects.get(user=self.user).xp, 300)
+        self.assertEqual(Purchase.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(XPTransaction.objects.filter(user=self.user).count(), 1)
+
+    def test_parallel_purchases_charge_once(self):
+        responses = self.fire()
+
+        statuses = [response.status_code for response in responses]
+        self.assertEqual(statuses.count(201), 1)
+        self.assertEqual(statuses.count(400), PARALLEL_REQUESTS - 1)
+        self.assertEqual(
+            {r.data["error"] for r in responses if r.status_code == 400},
+            {"You already own this item."},
+        )
+        self.assertChargedOnce()
+
+    def test_parallel_retries_with_one_key_run_once(self):
+        responses = self.fire(HTTP_IDEMPOTENCY_KEY="double-click")
+
+        originals = [
+            r
+            for r in responses
+            if r.status_code == 201 and "Idempotent-Replayed" not in r
+        ]
+        self.assertEqual(len(originals), 1)
+        # Everyone else either saw the key in flight or got the replay.
+        self.assertTrue(all(r.status_code in (201, 409) for r in responses), responses)
+        self.assertChargedOnce()
@@ -1,17 +1,21 @@
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from rest_framework import status
 from rest_framework.test import APITestCase
 from store.models import StoreItem, Purchase
+from users.models import UserProfile
 
 
 class StoreTests(APITestCase):
     def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
         self.user = User.objects.create_user(username="store_user", password="password")
         # Profile is created by signal. Give them some XP.
         self.profile = self.user.profile
         self.profile.xp = 500
-        self.profile.save()
+        self.profile.save(update_fields=["xp"])
 
         self.client.force_authenticate(user=self.user)
 
@@ -60,7 +64,7 @@ class StoreTests(APITestCase):
     def test_insufficient_xp_fails(self):
         # Set XP lower than cost
         self.profile.xp = 50
-        self.profile.save()
+        self.profile.save(update_fields=["xp"])
 
         url = reverse("store-buy", kwargs={"pk": self.theme.id})
         response = self.client.post(url)
@@ -68,6 +72,46 @@ class StoreTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("Insufficient XP", response.data["error"])
 
+    def test_insufficient_xp_leaves_no_purchase(self):
+        self.profile.xp = 50
+        self.profile.save(update_fields=["xp"])
+
+        self.client.post(reverse("store-buy", kwargs={"pk": self.theme.id}))
+
+        self.assertFalse(Purchase.objects.filter(user=self.user).exists())
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.xp, 50)
+
+    def test_idempotency_key_replays_first_response(self):
+        url = reverse("store-buy", kwargs={"pk": self.theme.id})
+
+        first = self.client.post(url, HTTP_IDEMPOTENCY_KEY="checkout-1")
+        retry = self.client.post(url, HTTP_IDEMPOTENCY_KEY="checkout-1")
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.xp, 300)
+
+    def test_idempotency_key_reused_for_another_item_is_rejected(self):
+        self.client.post(
+            reverse("store-buy", kwargs={"pk": self.theme.id}),
+            HTTP_IDEMPOTENCY_KEY="checkout-1",
+        )
+
+        response = self.client.post(
+            reverse("store-buy", kwargs={"pk": self.font.id}),
+            HTTP_IDEMPOTENCY_KEY="checkout-1",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(
+            Purchase.objects.filter(user=self.user, item=self.font).exists()
+        )
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.xp, 300)
+
     def test_duplicate_purchase_fails(self):
         url = reverse("store-buy", kwargs={"pk": self.theme.id})
         # Buy first time
@@ -92,6 +136,20 @@ class StoreTests(APITestCase):
         self.profile.refresh_from_db()
         self.assertEqual(self.profile.active_theme, "dracula")
 
+    def test_equip_is_one_narrow_update(self):
+        Purchase.objects.create(user=self.user, item=self.theme)
+        url = reverse("store-equip")
+        self.client.post(url, {"item_id": self.theme.id}, format="json")
+        # Changed elsewhere after this request's profile was loaded.
+        UserProfile.objects.filter(user=self.user).update(xp=777)
+
+        # Item and ownership come from caches; only the UPDATE hits the DB.
+        with self.assertNumQueries(1):
+            self.client.post(url, {"item_id": self.theme.id}, format="json")
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.xp, 777)
+
     def test_equip_without_ownership_fails(self):
         url = reverse("store-equip")
         response = self.client.post(url, {"item_id": self.theme.id}, format="json")
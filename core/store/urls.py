@@ -4,6 +4,7 @@ from .views import (
     StoreItemViewSet,
     PurchaseItemView,
     PurchasedItemsView,
+    StoreCatalogView,
     ImageUploadView,
     EquipItemView,
     UnequipItemView,
@@ -14,6 +15,7 @@ router.register(r"items", StoreItemViewSet, basename="store-item")
 
 urlpatterns = [
     path("buy/<int:pk>/", PurchaseItemView.as_view(), name="store-buy"),
+    path("catalog/", StoreCatalogView.as_view(), name="store-catalog"),
     path("purchased/", PurchasedItemsView.as_view(), name="store-purchased"),
     path("upload/", ImageUploadView.as_view(), name="store-upload"),
     path("equip/", EquipItemView.as_view(), name="store-equip"),
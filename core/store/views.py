@@ -4,28 +4,70 @@ from rest_framework import viewsets, status, serializers
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from .models import StoreItem, Purchase
+from .catalog import (
+    conditional_response,
+    content_digest,
+    get_catalog,
+    owned_item_ids,
+    with_ownership,
+)
+from .models import StoreItem
 from .serializers import StoreItemSerializer
-from xpoint.services import XPService
+from .services import (
+    COSMETIC_SLOTS,
+    AlreadyOwnedError,
+    IdempotencyKeyReusedError,
+    IdempotencyStore,
+    InsufficientXPError,
+    StoreService,
+)
 from auth.throttles import StoreRateThrottle
 
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 
 from drf_spectacular.utils import extend_schema, OpenApiTypes, inline_serializer
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import never_cache
+from django.utils.cache import add_never_cache_headers
+
+
+def _equipped_items(profile):
+    return {
+        "theme": profile.active_theme,
+        "font": profile.active_font,
+        "effect": profile.active_effect,
+        "victory": profile.active_victory,
+    }
 
 
-@method_decorator(never_cache, name="dispatch")
 class StoreItemViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing store items (Themes, Fonts, Effects, etc.).
+    Players list the active catalog from the cached snapshot; staff see every
+    item straight from the database.
     """
 
     serializer_class = StoreItemSerializer
 
+    def list(self, request, *args, **kwargs):
+        if request.user.is_staff:
+            return super().list(request, *args, **kwargs)
+        catalog = get_catalog()
+        owned = owned_item_ids(request.user)
+        return conditional_response(
+            request,
+            content_digest(catalog.digest, sorted(owned)),
+            lambda: with_ownership(catalog.items, set(owned)),
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # Snapshot responses revalidate by ETag; everything else stays uncached.
+        if not response.has_header("ETag"):
+            add_never_cache_headers(response)
+        return response
+
     def get_queryset(self):
         if self.request.user.is_staff:
             return StoreItem.objects.all().order_by("-created_at")
@@ -59,42 +101,67 @@ class PurchaseItemView(APIView):
             ),
             400: OpenApiTypes.OBJECT,
             404: OpenApiTypes.OBJECT,
+            409: OpenApiTypes.OBJECT,
+            422: OpenApiTypes.OBJECT,
         },
-        description="Purchase a store item using user's accumulated XP.",
+        description=(
+            "Purchase a store item using user's accumulated XP. Send an "
+            "Idempotency-Key header to make retries safe: a repeated key replays "
+            "the first response for 24 hours, and reusing it for another item "
+            "is rejected with 422."
+        ),
     )
     def post(self, request, pk=None):
         item = get_object_or_404(StoreItem, pk=pk, is_active=True)
-        user = request.user
-
-        if Purchase.objects.filter(user=user, item=item).exists():
+        key = request.headers.get("Idempotency-Key", "").strip()
+        if not key:
+            return self.purchase(request, item)
+        if len(key) > 255:
             return Response(
-                {"error": "You already own this item."},
+                {"error": "Idempotency-Key is too long."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        idempotency = IdempotencyStore("store_purchase", request.user.id, key, item.pk)
         try:
-            remaining_xp = XPService.add_xp(
-                user,
-                -item.cost,
-                source="store_purchase",
-                description=f"Purchased {item.name}",
-            )
-        except ValueError:
-            user.profile.refresh_from_db()
-            shortage = max(0, item.cost - user.profile.xp)
+            claimed, stored = idempotency.claim()
+        except IdempotencyKeyReusedError:
             return Response(
-                {"error": f"Insufficient XP. Need {shortage} more."},
-                status=status.HTTP_400_BAD_REQUEST,
+                {"error": "Idempotency-Key was already used for another item."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
             )
+        if not claimed:
+            if stored is None:
+                return Response(
+                    {"error": "A request with this Idempotency-Key is in progress."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            response = Response(stored[1], status=stored[0])
+            response["Idempotent-Replayed"] = "true"
+            return response
 
-        Purchase.objects.create(user=user, item=item)
+        try:
+            response = self.purchase(request, item)
+        except Exception:
+            idempotency.release()
+            raise
+        idempotency.save(response.status_code, response.data)
+        return response
+
+    def purchase(self, request, item):
+        try:
+            remaining_xp = StoreService.purchase(request.user, item)
+        except (AlreadyOwnedError, InsufficientXPError) as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(
             {
                 "status": "success",
                 "message": f"Purchased {item.name}",
                 "remaining_xp": remaining_xp,
-                "item": StoreItemSerializer(item, context={"request": request}).data,
+                "item": StoreItemSerializer(
+                    item, context={"request": request, "owned_item_ids": {item.id}}
+                ).data,
             },
             status=status.HTTP_201_CREATED,
         )
@@ -120,30 +187,60 @@ class PurchasedItemsView(APIView):
         description="Get a list of all purchased items and the currently equipped cosmetics.",
     )
     def get(self, request):
-        purchases = (
-            Purchase.objects.select_related("item")
-            .filter(user=request.user, item__is_active=True)
-            .order_by("-purchased_at")
+        catalog = get_catalog()
+        owned = owned_item_ids(request.user)
+        equipped_items = _equipped_items(request.user.profile)
+        return conditional_response(
+            request,
+            content_digest(catalog.digest, owned, equipped_items),
+            lambda: {
+                "purchased_items": with_ownership(
+                    [catalog.by_id[i] for i in owned if i in catalog.by_id], set(owned)
+                ),
+                "equipped_items": equipped_items,
+            },
         )
-        items = [p.item for p in purchases]
-        serialized_items = StoreItemSerializer(
-            items, many=True, context={"request": request}
-        ).data
-
-        profile = request.user.profile
-        equipped_items = {
-            "theme": profile.active_theme,
-            "font": profile.active_font,
-            "effect": profile.active_effect,
-            "victory": profile.active_victory,
-        }
 
-        return Response(
-            {
-                "purchased_items": serialized_items,
+
+class StoreCatalogView(APIView):
+    """
+    API View returning everything the storefront needs in one request.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        responses={
+            200: inline_serializer(
+                name="StoreCatalogResponse",
+                fields={
+                    "items": StoreItemSerializer(many=True),
+                    "owned_item_ids": serializers.ListField(
+                        child=serializers.IntegerField()
+                    ),
+                    "equipped_items": serializers.DictField(),
+                },
+            ),
+            304: None,
+        },
+        description=(
+            "Active catalog with ownership flags, owned item ids and equipped "
+            "cosmetics. Send If-None-Match with the last ETag to get a 304 when "
+            "nothing changed."
+        ),
+    )
+    def get(self, request):
+        catalog = get_catalog()
+        owned = owned_item_ids(request.user)
+        equipped_items = _equipped_items(request.user.profile)
+        return conditional_response(
+            request,
+            content_digest(catalog.digest, owned, equipped_items),
+            lambda: {
+                "items": with_ownership(catalog.items, set(owned)),
+                "owned_item_ids": owned,
                 "equipped_items": equipped_items,
             },
-            status=status.HTTP_200_OK,
         )
 
 
@@ -198,94 +295,42 @@ class EquipItemView(APIView):
         description="Equip a purchased cosmetic item (Theme, Font, Effect, Victory animation).",
     )
     def post(self, request):
-        item_id = request.data.get("item_id")
-        item = get_object_or_404(StoreItem, pk=item_id, is_active=True)
-        user = request.user
+        try:
+            item = get_catalog().by_id.get(int(request.data.get("item_id")))
+        except (TypeError, ValueError):
+            item = None
+        if item is None:
+            raise Http404("Store item not found.")
 
-        if not Purchase.objects.filter(user=user, item=item).exists():
+        if item["id"] not in set(owned_item_ids(request.user)):
             return Response(
                 {"error": "You do not own this item."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if item.category == "THEME":
-            theme_key = item.item_data.get("theme_key")
-            if not theme_key:
-                return Response(
-                    {"error": "Invalid theme data."}, status=status.HTTP_400_BAD_REQUEST
-                )
-
-            user.profile.active_theme = theme_key
-            user.profile.save()
-            return Response(
-                {
-                    "status": "success",
-                    "message": f"Equipped {item.name}",
-                    "active_theme": theme_key,
-                },
-                status=status.HTTP_200_OK,
-            )
-
-        if item.category == "FONT":
-            font_family = item.item_data.get("font_family")
-            if not font_family:
-                return Response(
-                    {"error": "Invalid font data."}, status=status.HTTP_400_BAD_REQUEST
-                )
-            user.profile.active_font = font_family
-            user.profile.save()
-            return Response(
-                {
-                    "status": "success",
-                    "message": f"Equipped {item.name}",
-                    "active_font": font_family,
-                },
-                status=status.HTTP_200_OK,
-            )
-
-        if item.category == "EFFECT":
-            effect_key = item.item_data.get("effect_key") or item.item_data.get(
-                "effect_type"
-            )
-            if not effect_key:
-                return Response(
-                    {"error": "Invalid effect data."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            user.profile.active_effect = effect_key
-            user.profile.save()
+        if item["category"] not in COSMETIC_SLOTS:
             return Response(
-                {
-                    "status": "success",
-                    "message": f"Equipped {item.name}",
-                    "active_effect": effect_key,
-                },
-                status=status.HTTP_200_OK,
+                {"error": "This item cannot be equipped."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if item.category == "VICTORY":
-            victory_key = item.item_data.get("victory_key") or item.item_data.get(
-                "animation_type"
-            )
-            if not victory_key:
-                return Response(
-                    {"error": "Invalid victory data."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            user.profile.active_victory = victory_key
-            user.profile.save()
+        field, data_keys, _ = COSMETIC_SLOTS[item["category"]]
+        item_data = item["item_data"] or {}
+        value = next((item_data[k] for k in data_keys if item_data.get(k)), None)
+        if not value:
             return Response(
-                {
-                    "status": "success",
-                    "message": f"Equipped {item.name}",
-                    "active_victory": victory_key,
-                },
-                status=status.HTTP_200_OK,
+                {"error": f"Invalid {item['category'].lower()} data."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
+        StoreService.set_cosmetic(request.user, field, value)
         return Response(
-            {"error": "This item cannot be equipped."},
-            status=status.HTTP_400_BAD_REQUEST,
+            {
+                "status": "success",
+                "message": f"Equipped {item['name']}",
+                field: value,
+            },
+            status=status.HTTP_200_OK,
         )
 
 
@@ -310,22 +355,13 @@ class UnequipItemView(APIView):
     )
     def post(self, request):
         category = request.data.get("category")
-        user = request.user
-
-        if category == "THEME":
-            user.profile.active_theme = "vs-dark"
-        elif category == "FONT":
-            user.profile.active_font = "Fira Code"
-        elif category == "EFFECT":
-            user.profile.active_effect = None
-        elif category == "VICTORY":
-            user.profile.active_victory = "default"
-        else:
+        if category not in COSMETIC_SLOTS:
             return Response(
                 {"error": "Invalid category."}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        user.profile.save()
+        field, _, default = COSMETIC_SLOTS[category]
+        StoreService.set_cosmetic(request.user, field, default)
         return Response(
             {"status": "success", "message": f"Unequipped {category}"},
             status=status.HTTP_200_OK,
@@ -39,6 +39,8 @@ class UserProfileAdmin(admin.ModelAdmin):
         "created_at",
         "updated_at",
         "referral_code",
+        # Changed only through XPService, which keeps the ledger in step.
+        "xp",
     )
 
     # Group fields logically in the detail view
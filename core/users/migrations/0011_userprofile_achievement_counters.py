@@ -0,0 +1,61 @@
+# Generated by Django 5.0.9 on 2026-10-19 13:29
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, owner_field):
+    counts = queryset.values(owner_field).annotate(n=Count("id")).values("n")
+    return Coalesce(Subquery(counts[:1]), Value(0))
+
+
+def backfill_counters(apps, _schema_editor):
+    UserProfile = apps.get_model("users", "UserProfile")
+    UserProgress = apps.get_model("challenges", "UserProgress")
+    UserFollow = apps.get_model("users", "UserFollow")
+
+    UserProfile.objects.update(
+        challenges_completed=_count(
+            UserProgress.objects.filter(
+                user_id=OuterRef("user_id"), status="COMPLETED"
+            ),
+            "user_id",
+        ),
+        following_count=_count(
+            UserFollow.objects.filter(follower_id=OuterRef("user_id")),
+            "follower_id",
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "users",
+            "0010_rename_users_userf_followi_1f0cff_idx_users_userf_followi_46a4eb_idx_and_more",
+        ),
+        (
+            "challenges",
+            "0014_rename_challenge_u_user_id_047eb8_idx_challenges__user_id_3f4dac_idx_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="challenges_completed",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Challenges completed at least once."
+            ),
+        ),
+        migrations.AddField(
+            model_name="userprofile",
+            name="following_count",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Users this user follows."
+            ),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.9 on 2026-10-19 13:33
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# Orders of the campaign levels in challenges.levels.LEVELS when this
+# migration was written; frozen so the backfill does not follow later edits.
+LEVEL_ORDERS = range(1, 61)
+
+
+def backfill_global_levels(apps, _schema_editor):
+    UserProfile = apps.get_model("users", "UserProfile")
+    UserProgress = apps.get_model("challenges", "UserProgress")
+
+    completed = (
+        UserProgress.objects.filter(
+            user_id=OuterRef("user_id"),
+            status="COMPLETED",
+            challenge__created_for_user__isnull=True,
+            challenge__order__in=LEVEL_ORDERS,
+        )
+        .values("user_id")
+        .annotate(n=Count("challenge__order", distinct=True))
+        .values("n")
+    )
+    UserProfile.objects.update(
+        global_levels_completed=Coalesce(Subquery(completed[:1]), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0011_userprofile_achievement_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="global_levels_completed",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Certificate-track levels completed at least once."
+            ),
+        ),
+        migrations.RunPython(backfill_global_levels, migrations.RunPython.noop),
+    ]
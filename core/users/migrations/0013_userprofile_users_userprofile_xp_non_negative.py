@@ -0,0 +1,29 @@
+# Generated by Django 5.0.9 on 2026-10-19 13:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def clamp_negative_xp(apps, _schema_editor):
+    # The old read-modify-write path never allowed this, but the constraint
+    # must not fail on rows edited by hand.
+    UserProfile = apps.get_model("users", "UserProfile")
+    UserProfile.objects.filter(xp__lt=0).update(xp=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0012_userprofile_global_levels_completed"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(clamp_negative_xp, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="userprofile",
+            constraint=models.CheckConstraint(
+                check=models.Q(("xp__gte", 0)), name="users_userprofile_xp_non_negative"
+            ),
+        ),
+    ]
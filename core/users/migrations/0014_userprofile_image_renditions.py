@@ -0,0 +1,23 @@
+# Generated by Django 5.0.9 on 2026-10-19 14:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0013_userprofile_users_userprofile_xp_non_negative"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="avatar_renditions",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="userprofile",
+            name="banner_renditions",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -1,8 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from project.images import needs_renditions
+
 
 class UserProfile(models.Model):
     """
@@ -58,6 +60,9 @@ class UserProfile(models.Model):
         null=True,
         help_text="Profile background banner.",
     )
+    # Resized WebP copies of ``avatar``/``banner`` (see project.images).
+    avatar_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    banner_renditions = models.JSONField(default=dict, blank=True, editable=False)
     bio = models.TextField(
         max_length=500, blank=True, null=True, help_text="Short user biography."
     )
@@ -91,6 +96,17 @@ class UserProfile(models.Model):
     streak_freezes = models.IntegerField(
         default=0, help_text="Number of streak freezes available."
     )
+    # Counters maintained by progress/follow signals, so achievement and
+    # certificate rules never count rows.
+    challenges_completed = models.PositiveIntegerField(
+        default=0, help_text="Challenges completed at least once."
+    )
+    following_count = models.PositiveIntegerField(
+        default=0, help_text="Users this user follows."
+    )
+    global_levels_completed = models.PositiveIntegerField(
+        default=0, help_text="Certificate-track levels completed at least once."
+    )
     reward_cycle_start_date = models.DateField(
         null=True, blank=True, help_text="Start date of the current 7-day reward cycle."
     )
@@ -125,8 +141,31 @@ class UserProfile(models.Model):
             models.Index(fields=["-xp"]),
             models.Index(fields=["provider"]),
         ]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(xp__gte=0), name="users_userprofile_xp_non_negative"
+            ),
+        ]
+
+    # Only written by queryset updates (F() XP credits in xpoint.services, the
+    # progress/follow counter signals, the rendition task); saving an instance
+    # loaded earlier must not revert them.
+    UPDATE_ONLY_FIELDS = (
+        "xp",
+        "challenges_completed",
+        "following_count",
+        "global_levels_completed",
+        "avatar_renditions",
+        "banner_renditions",
+    )
 
     def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.UPDATE_ONLY_FIELDS
+            ]
         # Auto-generate unique referral code if missing
         if not self.referral_code:
             import random
@@ -194,3 +233,18 @@ def create_user_profile(sender, instance, created, **kwargs):
             provider_id=f"local_{instance.id}",
             bio="Administrator" if instance.is_superuser else "User",
         )
+
+
+@receiver(post_save, sender=UserProfile)
+def schedule_profile_image_renditions(sender, instance, **kwargs):
+    _ = sender, kwargs
+    fields = [
+        field for field in ("avatar", "banner") if needs_renditions(instance, field)
+    ]
+    if fields:
+        from .tasks import render_profile_images_task
+
+        profile_id = instance.pk
+        transaction.on_commit(
+            lambda: render_profile_images_task.delay(profile_id, fields)
+        )
@@ -42,11 +42,11 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(OpenApiTypes.URI)
     def get_avatar_url(self, obj):
-        return build_file_url(obj.avatar, self.context.get("request"))
+        return build_file_url(obj.avatar, self.context.get("request"), "thumb")
 
     @extend_schema_field(OpenApiTypes.URI)
     def get_banner_url(self, obj):
-        return build_file_url(obj.banner, self.context.get("request"))
+        return build_file_url(obj.banner, self.context.get("request"), "full")
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -109,10 +109,13 @@ class UserSummarySerializer(serializers.Serializer):
     def get_avatar_url(self, obj):
         if not hasattr(obj, "profile"):
             return None
-        return build_file_url(obj.profile.avatar, self.context.get("request"))
+        return build_file_url(obj.profile.avatar, self.context.get("request"), "thumb")
 
     @extend_schema_field(bool)
     def get_is_following(self, obj):
+        following_ids = self.context.get("following_ids")
+        if following_ids is not None:
+            return obj.id in following_ids
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             # Check if request.user is following obj (the user in the summary)
@@ -156,11 +159,11 @@ class PublicUserProfileSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(OpenApiTypes.URI)
     def get_avatar_url(self, obj):
-        return build_file_url(obj.avatar, self.context.get("request"))
+        return build_file_url(obj.avatar, self.context.get("request"), "thumb")
 
     @extend_schema_field(OpenApiTypes.URI)
     def get_banner_url(self, obj):
-        return build_file_url(obj.banner, self.context.get("request"))
+        return build_file_url(obj.banner, self.context.get("request"), "full")
 
 
 class PublicUserSerializer(serializers.ModelSerializer):
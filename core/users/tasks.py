@@ -0,0 +1,17 @@
+from celery import shared_task
+from django.core.cache import cache
+
+from project.images import render_renditions
+from .models import UserProfile
+
+
+@shared_task
+def render_profile_images_task(profile_id, fields):
+    """Makes the resized renditions of a profile's avatar and/or banner."""
+    profile = UserProfile.objects.select_related("user").filter(pk=profile_id).first()
+    if profile is None:
+        return {"status": "not_found", "profile_id": profile_id}
+    rendered = [field for field in fields if render_renditions(profile, field)]
+    if rendered:
+        cache.delete(f"profile:{profile.user.username}")
+    return {"status": "rendered", "fields": rendered}
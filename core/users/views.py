@@ -32,12 +32,14 @@ from .serializers import (
 
 
 from xpoint.services import XPService
+from learning.leaderboard import LeaderboardService
 from challenges.models import UserProgress
 
 
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
 
+from project.caching import get_or_compute
 from project.media import build_file_url
 
 
@@ -71,10 +73,10 @@ class CurrentUserView(APIView):
     serializer_class = UserSerializer
 
     def get(self, request):
-        return Response(
-            UserSerializer(request.user, context={"request": request}).data,
-            status=status.HTTP_200_OK,
-        )
+        data = UserSerializer(request.user, context={"request": request}).data
+        # Served from the leaderboard's XP histogram; no extra DB queries.
+        data["rank"] = LeaderboardService.get_rank_summary(request.user)
+        return Response(data, status=status.HTTP_200_OK)
 
 
 class ProfileUpdateView(APIView):
@@ -197,29 +199,25 @@ class ProfileDetailView(APIView):
         description="Get public profile details by username.",
     )
     def get(self, request, username):
-        # Try to get from cache first
-        cache_key = f"profile:{username}"
-        data = cache.get(cache_key)
-
-        if not data:
-            try:
-                user = User.objects.get(username=username)
-            except User.DoesNotExist:
-                return Response(
-                    {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
-                )
-
+        def build_profile():
+            user = User.objects.get(username=username)
             data = PublicUserSerializer(user, context={"request": request}).data
 
             # Add stats (redundant if serializer has them, but ensuring consistency)
             data["followers_count"] = user.followers.count()
             data["following_count"] = user.following.count()
+            return data
 
+        try:
             # Cache the public data for 5 minutes
-            cache.set(cache_key, data, 300)
-        else:
-            # Avoid mutating cached objects with request-specific flags.
-            data = dict(data)
+            data = get_or_compute(f"profile:{username}", build_profile, 300)
+        except User.DoesNotExist:
+            return Response(
+                {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        # Avoid mutating cached objects with request-specific flags.
+        data = dict(data)
 
         # Inject request-specific data (NEVER CACHE THIS)
         if request.user.is_authenticated:
@@ -322,7 +320,9 @@ class UserFollowersView(APIView):
                     "username": follower_user.username,
                     "first_name": follower_user.first_name,
                     "avatar_url": (
-                        build_file_url(profile.avatar, request) if profile else None
+                        build_file_url(profile.avatar, request, "thumb")
+                        if profile
+                        else None
                     ),
                     "is_following": follower_user.id in following_ids,
                 }
@@ -365,7 +365,9 @@ class UserFollowingView(APIView):
                     "username": following_user.username,
                     "first_name": following_user.first_name,
                     "avatar_url": (
-                        build_file_url(profile.avatar, request) if profile else None
+                        build_file_url(profile.avatar, request, "thumb")
+                        if profile
+                        else None
                     ),
                     "is_following": following_user.id in following_ids,
                 }
@@ -433,12 +435,14 @@ class RedeemReferralView(APIView):
             profile.referred_by = referrer_profile.user
             profile.save(update_fields=["referred_by", "updated_at"])
 
-            new_total_xp = XPService.add_xp(
-                request.user, 100, source=XPService.SOURCE_REFERRAL
-            )
-            referrer_new_total_xp = XPService.add_xp(
-                referrer_profile.user, 100, source=XPService.SOURCE_REFERRAL
-            )
+            balances = XPService.add_xp_bulk(
+                [
+                    (request.user.id, 100, XPService.SOURCE_REFERRAL),
+                    (referrer_profile.user_id, 100, XPService.SOURCE_REFERRAL),
+                ]
+            )["balances"]
+            new_total_xp = balances[request.user.id]
+            referrer_new_total_xp = balances[referrer_profile.user_id]
 
             # Profile detail is cached; invalidate both users so XP updates are visible immediately.
             cache.delete(f"profile:{request.user.username}")
@@ -498,7 +502,7 @@ class SuggestedUsersView(APIView):
                     "username": user.username,
                     "first_name": user.first_name,
                     "avatar_url": (
-                        build_file_url(profile.avatar, request)
+                        build_file_url(profile.avatar, request, "thumb")
                         if profile and profile.avatar
                         else None
                     ),
@@ -1 +1,24 @@
 """XP admin registrations."""
+
+from django.contrib import admin
+
+from .models import XPTransaction
+
+
+@admin.register(XPTransaction)
+class XPTransactionAdmin(admin.ModelAdmin):
+    """Read-only: the ledger is append-only and written by XPService."""
+
+    list_display = ("user", "amount", "source", "balance_after", "created_at")
+    list_filter = ("source", "created_at")
+    search_fields = ("user__username", "description")
+    list_select_related = ("user",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.9 on 2026-10-19 13:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="XPTransaction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("amount", models.IntegerField(help_text="Signed XP change.")),
+                ("source", models.CharField(blank=True, max_length=50)),
+                ("description", models.CharField(blank=True, max_length=255)),
+                (
+                    "balance_after",
+                    models.IntegerField(
+                        blank=True,
+                        help_text="Balance right after this change.",
+                        null=True,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="xp_transactions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at", "-id"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-created_at"],
+                        name="xpoint_xptr_user_id_62567a_idx",
+                    ),
+                    models.Index(
+                        fields=["source", "created_at"],
+                        name="xpoint_xptr_source_dab160_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def record_opening_balances(apps, _schema_editor):
+    # Seed the ledger so each user's transactions sum to their current XP.
+    UserProfile = apps.get_model("users", "UserProfile")
+    XPTransaction = apps.get_model("xpoint", "XPTransaction")
+
+    balances = (
+        UserProfile.objects.filter(xp__gt=0)
+        .values_list("user_id", "xp")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    batch = []
+    for user_id, xp in balances:
+        batch.append(
+            XPTransaction(
+                user_id=user_id,
+                amount=xp,
+                source="opening_balance",
+                balance_after=xp,
+            )
+        )
+        if len(batch) >= BATCH_SIZE:
+            XPTransaction.objects.bulk_create(batch)
+            batch = []
+    XPTransaction.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("xpoint", "0001_initial"),
+        ("users", "0013_userprofile_users_userprofile_xp_non_negative"),
+    ]
+
+    operations = [
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class XPTransaction(models.Model):
+    """
+    Append-only ledger of XP changes.
+
+    Every change to ``UserProfile.xp`` made through ``XPService`` is recorded
+    here, so a profile's balance equals the sum of its user's transactions.
+    ``XPService.reconcile_balances`` repairs drift from direct profile edits.
+    """
+
+    user = models.ForeignKey(
+        User, related_name="xp_transactions", on_delete=models.CASCADE
+    )
+    amount = models.IntegerField(help_text="Signed XP change.")
+    source = models.CharField(max_length=50, blank=True)
+    description = models.CharField(max_length=255, blank=True)
+    balance_after = models.IntegerField(
+        null=True, blank=True, help_text="Balance right after this change."
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(fields=["user", "-created_at"]),
+            models.Index(fields=["source", "created_at"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("XP transactions are append-only")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.amount:+d} XP ({self.source})"
@@ -1,48 +1,199 @@
 import logging
-from django.db import transaction
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+from learning.leaderboard import LeaderboardService
 from users.models import UserProfile
+from .models import XPTransaction
 
 logger = logging.getLogger(__name__)
 
+# Grants per UPDATE statement in add_xp_bulk (two bind parameters each).
+BULK_CHUNK_SIZE = 500
+
 
 class XPService:
     SOURCE_CHECK_IN = "check_in"
     SOURCE_PURCHASE = "purchase"
     SOURCE_REFERRAL = "referral"
     SOURCE_ADMIN = "admin_adjustment"
+    SOURCE_RECONCILIATION = "reconciliation"
 
     @staticmethod
     def add_xp(user, amount, source=None, description=None):
-        """Add XP to a user's profile."""
+        """
+        Apply a signed XP change and append it to the ledger.
+
+        The balance moves with one conditional F-expression UPDATE instead of
+        a locked read-modify-write; debits that would go below zero match no
+        row and raise ValueError. A CHECK constraint backs this up.
+        """
         if amount == 0:
             logger.warning(f"Attempted to add zero XP to user {user.username}")
             return user.profile.xp
 
-        try:
-            with transaction.atomic():
-                profile = UserProfile.objects.select_for_update().get(user=user)
+        profiles = UserProfile.objects.filter(user=user)
+        target = profiles.filter(xp__gte=-amount) if amount < 0 else profiles
+        new_total = None
+        # No savepoint: callers already inside a transaction roll back as one.
+        with transaction.atomic(savepoint=False):
+            if target.update(xp=F("xp") + amount):
+                new_total = profiles.values_list("xp", flat=True).get()
+                XPTransaction.objects.create(
+                    user=user,
+                    amount=amount,
+                    source=source or "",
+                    description=description or "",
+                    balance_after=new_total,
+                )
+                LeaderboardService.record_xp_change(user, amount, new_total)
 
-                new_total = profile.xp + amount
-                if new_total < 0:
-                    raise ValueError("Insufficient XP")
+        # Raised outside the atomic block so an outer transaction stays usable.
+        if new_total is None:
+            if amount < 0 and profiles.exists():
+                logger.info(f"Insufficient XP for user {user.username}: {amount}")
+                raise ValueError("Insufficient XP")
+            logger.error(f"UserProfile not found for user {user.username}")
+            raise UserProfile.DoesNotExist(f"No profile for user {user.pk}")
 
-                profile.xp = new_total
-                profile.save()
+        logger.info(
+            f"Added {amount} XP to user {user.username} (Source: {source}). Total: {new_total}"
+        )
+        return new_total
 
-                logger.info(
-                    f"Added {amount} XP to user {user.username} (Source: {source}). Total: {profile.xp}"
-                )
+    @staticmethod
+    def award_xp(user, amount, source=None, description=None):
+        """Credit-only variant of ``add_xp``; rejects zero or negative amounts."""
+        if amount <= 0:
+            raise ValueError("award_xp only credits positive amounts")
+        return XPService.add_xp(user, amount, source=source, description=description)
+
+    @staticmethod
+    def iter_add_xp_bulk(grants, description=None, chunk_size=BULK_CHUNK_SIZE):
+        """
+        Applies ``(user_id, amount, source)`` grants in chunks and yields a
+        progress dict after each one.
+
+        Every chunk is its own transaction: one ``UPDATE ... FROM (VALUES ...)``
+        moves all balances, one bulk INSERT writes the ledger rows, and the
+        leaderboard receives the whole chunk in one pipeline after commit.
+        Users without a profile, or whose net debit would overdraw them, are
+        reported in ``skipped`` and left untouched.
+        """
+        grants = [grant for grant in grants if grant[1]]
+        total = len(grants)
+        for start in range(0, total, chunk_size):
+            balances, skipped = XPService._apply_chunk(
+                grants[start : start + chunk_size], description or ""
+            )
+            yield {
+                "processed": min(start + chunk_size, total),
+                "total": total,
+                "balances": balances,
+                "skipped": skipped,
+            }
 
-                return profile.xp
+    @staticmethod
+    def add_xp_bulk(grants, description=None, chunk_size=BULK_CHUNK_SIZE):
+        """
+        Bulk variant of ``add_xp``. Returns ``{"balances": {user_id: xp},
+        "skipped": [user_id, ...]}`` once every chunk is applied.
+        """
+        balances, skipped = {}, []
+        for progress in XPService.iter_add_xp_bulk(grants, description, chunk_size):
+            balances.update(progress["balances"])
+            skipped.extend(progress["skipped"])
+        return {"balances": balances, "skipped": skipped}
 
-        except UserProfile.DoesNotExist:
-            logger.error(f"UserProfile not found for user {user.username}")
-            raise
-        except Exception as e:
-            logger.error(f"Failed to add XP to user {user.username}: {str(e)}")
-            raise
+    @staticmethod
+    def _apply_chunk(grants, description):
+        by_user = defaultdict(list)
+        for user_id, amount, source in grants:
+            by_user[int(user_id)].append((int(amount), source or ""))
+        net = {user_id: sum(a for a, _ in rows) for user_id, rows in by_user.items()}
+
+        table = connection.ops.quote_name(UserProfile._meta.db_table)
+        values = ", ".join(["(CAST(%s AS integer), CAST(%s AS integer))"] * len(net))
+        # Amounts are summed per user first: UPDATE ... FROM applies at most
+        # one source row to each target row.
+        sql = (
+            f"UPDATE {table} SET xp = xp + grants.column2 "
+            f"FROM (VALUES {values}) AS grants "
+            f"WHERE {table}.user_id = grants.column1 "
+            f"AND {table}.xp + grants.column2 >= 0 "
+            f"RETURNING user_id, xp"
+        )
+        params = [value for pair in net.items() for value in pair]
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                balances = dict(cursor.fetchall())
+
+            entries = []
+            for user_id, new_total in balances.items():
+                # Walk back from the final balance so every row records the
+                # balance right after it.
+                balance = new_total - net[user_id]
+                for amount, source in by_user[user_id]:
+                    balance += amount
+                    entries.append(
+                        XPTransaction(
+                            user_id=user_id,
+                            amount=amount,
+                            source=source,
+                            description=description,
+                            balance_after=balance,
+                        )
+                    )
+            XPTransaction.objects.bulk_create(entries)
+            LeaderboardService.record_xp_changes(
+                {user_id: (net[user_id], total) for user_id, total in balances.items()}
+            )
+
+        skipped = [user_id for user_id in net if user_id not in balances]
+        if skipped:
+            logger.info(f"Bulk XP grant skipped {len(skipped)} users")
+        return balances, skipped
+
+    @staticmethod
+    def reconcile_balances():
+        """
+        Compares every balance with its ledger sum and appends a
+        ``reconciliation`` transaction for each user that drifted (e.g. after
+        a direct profile edit). Returns the number of users corrected.
+        """
+        ledger_total = (
+            XPTransaction.objects.filter(user_id=OuterRef("user_id"))
+            .values("user_id")
+            .annotate(total=Sum("amount"))
+            .values("total")
+        )
+        drifted = (
+            UserProfile.objects.annotate(
+                ledger_total=Coalesce(Subquery(ledger_total[:1]), Value(0))
+            )
+            .exclude(xp=F("ledger_total"))
+            .values_list("user_id", "xp", "ledger_total")
+        )
+        corrections = [
+            XPTransaction(
+                user_id=user_id,
+                amount=xp - total,
+                source=XPService.SOURCE_RECONCILIATION,
+                description="Balance changed outside the ledger",
+                balance_after=xp,
+            )
+            for user_id, xp, total in drifted.iterator(chunk_size=1000)
+        ]
+        XPTransaction.objects.bulk_create(corrections, batch_size=1000)
+        if corrections:
+            logger.warning(f"Reconciled XP ledger drift for {len(corrections)} users")
+        return len(corrections)
 
     @staticmethod
     def get_user_xp(user):
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .services import XPService
+
+
+@shared_task
+def reconcile_xp_ledger_task():
+    """Append corrections for balances that drifted from the XP ledger."""
+    return {"status": "ok", "corrected": XPService.reconcile_balances()}
@@ -0,0 +1,136 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from learning.leaderboard import LeaderboardService
+from users.models import UserProfile
+from xpoint.models import XPTransaction
+from xpoint.services import XPService
+from xpoint.tasks import reconcile_xp_ledger_task
+
+
+class XPLedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="ada", password="pw")
+
+    def balance(self):
+        return UserProfile.objects.get(user=self.user).xp
+
+    def test_every_change_is_appended_with_the_running_balance(self):
+        XPService.add_xp(self.user, 100, source=XPService.SOURCE_CHECK_IN)
+        XPService.add_xp(self.user, -30, source=XPService.SOURCE_PURCHASE)
+
+        self.assertEqual(self.balance(), 70)
+        self.assertEqual(
+            list(
+                XPTransaction.objects.filter(user=self.user)
+                .order_by("id")
+                .values_list("amount", "source", "balance_after")
+            ),
+            [(100, "check_in", 100), (-30, "purchase", 70)],
+        )
+
+    def test_add_xp_costs_three_queries(self):
+        # UPDATE balance, SELECT new total, INSERT ledger row.
+        with self.assertNumQueries(3):
+            self.assertEqual(XPService.add_xp(self.user, 10, source="test"), 10)
+
+    def test_overdraft_is_rejected_without_a_ledger_row(self):
+        XPService.add_xp(self.user, 20)
+
+        with self.assertRaisesMessage(ValueError, "Insufficient XP"):
+            XPService.add_xp(self.user, -50, source=XPService.SOURCE_PURCHASE)
+
+        self.assertEqual(self.balance(), 20)
+        self.assertEqual(XPTransaction.objects.filter(user=self.user).count(), 1)
+
+    def test_database_rejects_negative_balances(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserProfile.objects.filter(user=self.user).update(xp=-1)
+
+    def test_transactions_are_append_only(self):
+        XPService.add_xp(self.user, 5)
+        entry = XPTransaction.objects.get(user=self.user)
+        entry.amount = 500
+
+        with self.assertRaises(ValueError):
+            entry.save()
+
+    def test_reconciliation_records_out_of_band_changes(self):
+        XPService.add_xp(self.user, 40)
+        UserProfile.objects.filter(user=self.user).update(xp=55)
+
+        self.assertEqual(reconcile_xp_ledger_task.run()["corrected"], 1)
+        correction = XPTransaction.objects.filter(user=self.user).first()
+        self.assertEqual(correction.source, XPService.SOURCE_RECONCILIATION)
+        self.assertEqual(correction.amount, 15)
+        self.assertEqual(correction.balance_after, 55)
+
+        # The ledger now sums to the balance, so a second pass is a no-op.
+        self.assertEqual(XPService.reconcile_balances(), 0)
+
+    def test_saving_a_stale_profile_keeps_balance_and_counters(self):
+        stale = UserProfile.objects.get(user=self.user)
+        XPService.add_xp(self.user, 40)
+        UserProfile.objects.filter(user=self.user).update(challenges_completed=2)
+
+        stale.bio = "edited"
+        stale.save()
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.bio, profile.xp), ("edited", 40))
+        self.assertEqual(profile.challenges_completed, 2)
+        self.assertEqual(XPService.reconcile_balances(), 0)
+
+
+class BulkXPTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.users = [
+            User.objects.create_user(username=f"player{i}", password="pw")
+            for i in range(4)
+        ]
+
+    def test_bulk_grants_write_ledger_and_leaderboard(self):
+        first, second, third, _ = self.users
+        XPService.add_xp(third, 5)
+        LeaderboardService.rebuild()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = XPService.add_xp_bulk(
+                [
+                    (first.id, 50, "event"),
+                    (second.id, 20, "event"),
+                    (first.id, 25, "bonus"),
+                    (third.id, -10, "correction"),
+                    (999999, 10, "event"),
+                ],
+                description="Launch week",
+            )
+
+        self.assertEqual(result["balances"], {first.id: 75, second.id: 20})
+        self.assertEqual(sorted(result["skipped"]), [third.id, 999999])
+        self.assertEqual(
+            list(
+                XPTransaction.objects.filter(user=first)
+                .order_by("id")
+                .values_list("amount", "source", "balance_after", "description")
+            ),
+            [(50, "event", 50, "Launch week"), (25, "bonus", 75, "Launch week")],
+        )
+        # The overdraft left the balance and ledger alone.
+        self.assertEqual(UserProfile.objects.get(user=third).xp, 5)
+        self.assertEqual(LeaderboardService.get_standing(first.id)["xp"], 75)
+
+    def test_each_chunk_costs_a_fixed_number_of_queries(self):
+        grants = [(user.id, 10, "event") for user in self.users]
+
+        # Per chunk: SAVEPOINT, UPDATE ... FROM VALUES, SELECT ranked users,
+        # INSERT ledger rows, RELEASE.
+        with self.assertNumQueries(10):
+            progress = list(XPService.iter_add_xp_bulk(grants, chunk_size=2))
+
+        self.assertEqual([p["processed"] for p in progress], [2, 4])
+        self.assertEqual(XPTransaction.objects.count(), 4)